@@ -0,0 +1,101 @@
+"""
+Frequency-aware gating of edge creation.
+
+Function words such as "the" or "of" fall in almost every text window, so
+each of their occurrences costs a full window of similarity computations and
+edge updates while adding little signal. A WordGraph with a ``gate`` still
+counts every occurrence of a saturated word on its node, but only links some
+of them, or none.
+"""
+
+import math
+
+# Common English function words, for use as ``FrequencyGate(stopwords=...)``
+FUNCTION_WORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can could did do does doing
+    down during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more
+    most my myself no nor not now of off on once only or other our ours
+    ourselves out over own same she should so some such than that the their
+    theirs them themselves then there these they this those through to too
+    under until up very was we were what when where which while who whom why
+    will with would you your yours yourself yourselves
+    """.split()
+)
+
+
+class FrequencyGate:
+    """
+    Decides which occurrences of a word create edges.
+
+    A word is saturated when it is one of ``stopwords``, when its inverse
+    document frequency in the ``idf`` table is below ``min_idf``, or when it
+    has occurred at least ``min_count`` times and makes up more than
+    ``max_share`` of the document. Only every ``keep_every``-th occurrence
+    of a saturated word is linked, by its running count, and none when
+    ``keep_every`` is 0.
+    """
+
+    def __init__(
+        self,
+        min_count: int | None = 20,
+        max_share: float = 0.01,
+        stopwords=(),
+        idf: dict | None = None,
+        min_idf: float = 0.0,
+        keep_every: int = 0,
+    ):
+        self.min_count = min_count
+        self.max_share = max_share
+        self.stopwords = frozenset(stopwords)
+        self.idf = idf
+        self.min_idf = min_idf
+        self.keep_every = keep_every
+
+    def saturated(self, word: str, count: int, total: int) -> bool:
+        if word in self.stopwords:
+            return True
+        if self.idf is not None and self.idf.get(word, math.inf) < self.min_idf:
+            return True
+        return (
+            self.min_count is not None
+            and count >= self.min_count
+            and count > self.max_share * total
+        )
+
+    def links(self, word: str, count: int, total: int) -> bool:
+        """
+        Whether the occurrence that brought *word* to *count* occurrences, in
+        a document of *total* tokens, should be linked.
+        """
+        if not self.saturated(word, count, total):
+            return True
+        return self.keep_every > 0 and count % self.keep_every == 0
+
+    def to_dict(self) -> dict:
+        return {
+            "min_count": self.min_count,
+            "max_share": self.max_share,
+            "stopwords": sorted(self.stopwords),
+            "idf": self.idf,
+            "min_idf": self.min_idf,
+            "keep_every": self.keep_every,
+        }
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "FrequencyGate":
+        return cls(**config)
+
+
+def idf_table(documents: list[list[str]]) -> dict[str, float]:
+    """
+    Inverse document frequencies, ``log(N / df)``, of the words in
+    *documents*, each given as a list of words.
+    """
+    frequencies = {}
+    for words in documents:
+        for word in set(words):
+            frequencies[word] = frequencies.get(word, 0) + 1
+    return {word: math.log(len(documents) / df) for word, df in frequencies.items()}
@@ -0,0 +1,184 @@
+import math
+import numpy as np
+
+
+def _js_hash(text: str) -> int:
+    """
+    Port of the frontend's ``simpleHash`` (32-bit signed, UTF-16 code units).
+    """
+    h = 0
+    for unit in text.encode("utf-16-le")[::2]:
+        h = ((h << 5) - h + unit) & 0xFFFFFFFF
+    return h - (1 << 32) if h >= (1 << 31) else h
+
+
+def lemma_position(lemma: str, width: float = 800, height: float = 600):
+    """
+    Same position the frontend's ``getPositionFromLemma`` gives a lemma.
+    """
+    h = _js_hash(lemma)
+    # JavaScript's % keeps the sign of the dividend
+    return ((h & 0xFFFF) % width, math.fmod(h >> 16, height))
+
+
+class IncrementalLayout:
+    """
+    Force-directed (Fruchterman-Reingold) layout that is kept up to date as a
+    WordGraph changes. Positions persist between updates; each update seeds new
+    nodes and relaxes only the new and affected nodes against the rest of the
+    graph, so its cost grows with the change rather than with the graph.
+    """
+
+    def __init__(
+        self,
+        ideal_length: float = 80.0,
+        iterations: int = 30,
+        max_active: int = 256,
+        lemma_seeding: bool = True,
+        width: float = 800,
+        height: float = 600,
+        chunk_size: int = 256,
+    ):
+        self.ideal_length = ideal_length
+        self.iterations = iterations
+        self.max_active = max_active
+        self.lemma_seeding = lemma_seeding
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self._index = {}
+        self._nodes = []
+        self._pos = np.zeros((0, 2))
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._index
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def position(self, node: str) -> dict:
+        x, y = self._pos[self._index[node]]
+        return {"x": float(x), "y": float(y)}
+
+    def positions(self) -> dict:
+        return {node: self.position(node) for node in self._nodes}
+
+    def _remove(self, node: str) -> None:
+        """Swap-remove a node's row."""
+        row = self._index.pop(node, None)
+        if row is None:
+            return None
+        last = len(self._nodes) - 1
+        if row != last:
+            moved = self._nodes[last]
+            self._nodes[row] = moved
+            self._pos[row] = self._pos[last]
+            self._index[moved] = row
+        self._nodes.pop()
+        self._pos = self._pos[:last]
+        return None
+
+    def prune(self, graph) -> None:
+        """Drop positions of nodes that are no longer in *graph*."""
+        for node in [n for n in self._nodes if not graph.has_node(n)]:
+            self._remove(node)
+        return None
+
+    def _jitter(self, node: str) -> np.ndarray:
+        # Deterministic offset so nodes seeded at the same spot can separate
+        h = _js_hash(node)
+        angle = (h & 0xFFFF) / 0xFFFF * 2 * math.pi
+        return np.array([math.cos(angle), math.sin(angle)]) * self.ideal_length * 0.1
+
+    def _seed(self, graph, node: str) -> np.ndarray:
+        if self.lemma_seeding:
+            data = graph.nodes[node].get("data")
+            lemmas = getattr(data, "lemmatized", None)
+            lemma = lemmas[0] if lemmas else node
+            return np.array(lemma_position(lemma, self.width, self.height)) + self._jitter(node)
+        neighbours = [
+            self._index[n]
+            for n in list(graph.successors(node)) + list(graph.predecessors(node))
+            if n in self._index
+        ]
+        if neighbours:
+            return self._pos[neighbours].mean(axis=0) + self._jitter(node)
+        return np.array([self.width / 2, self.height / 2]) + self._jitter(node) * 10
+
+    def update(self, graph, dirty_nodes=(), removed_nodes=()) -> list[str]:
+        """
+        Bring the layout up to date with *graph*. *dirty_nodes* are nodes that
+        were added or whose edges changed; *removed_nodes* have left the graph.
+        Returns the nodes whose positions changed.
+        """
+        for node in removed_nodes:
+            self._remove(node)
+        new_nodes, affected = [], []
+        for node in dict.fromkeys(dirty_nodes):
+            if not graph.has_node(node):
+                self._remove(node)
+            elif node in self._index:
+                affected.append(node)
+            else:
+                new_nodes.append(node)
+        if new_nodes:
+            seeds = np.array([self._seed(graph, node) for node in new_nodes])
+            for node in new_nodes:
+                self._index[node] = len(self._nodes)
+                self._nodes.append(node)
+            self._pos = np.vstack([self._pos, seeds])
+        # New nodes first; very large updates only relax up to max_active nodes
+        active = (new_nodes + affected)[: self.max_active]
+        if active and len(self._nodes) > 1:
+            self._relax([self._index[node] for node in active], graph)
+        return active
+
+    def _relax(self, active_rows: list[int], graph) -> None:
+        k = self.ideal_length
+        active_set = set(active_rows)
+        active_rows = np.array(active_rows)
+        # Edges touching an active node, as row pairs with their weights; an
+        # edge between two active nodes is collected once, from its source
+        sources, targets, weights = [], [], []
+        for row in active_rows:
+            node = self._nodes[row]
+            incoming = [
+                edge
+                for edge in graph.in_edges(node, data=True)
+                if self._index.get(edge[0]) not in active_set
+            ]
+            for u, v, data in list(graph.out_edges(node, data=True)) + incoming:
+                if u == v or u not in self._index or v not in self._index:
+                    continue
+                sources.append(self._index[u])
+                targets.append(self._index[v])
+                weights.append(float(data.get("weight", 1.0)))
+        sources, targets = np.array(sources, dtype=int), np.array(targets, dtype=int)
+        weights = np.array(weights)
+
+        temperature = k
+        cooling = temperature / (self.iterations + 1)
+        for _ in range(self.iterations):
+            displacement = np.zeros((len(active_rows), 2))
+            # Repulsion from every node, chunked to bound memory
+            for start in range(0, len(active_rows), self.chunk_size):
+                rows = active_rows[start : start + self.chunk_size]
+                delta = self._pos[rows, None, :] - self._pos[None, :, :]
+                dist2 = np.maximum((delta**2).sum(axis=2), 1e-2)
+                displacement[start : start + len(rows)] += (
+                    delta * (k * k / dist2)[:, :, None]
+                ).sum(axis=1)
+            # Attraction along edges, applied to the active endpoints only
+            if len(sources):
+                delta = self._pos[sources] - self._pos[targets]
+                dist = np.sqrt((delta**2).sum(axis=1, keepdims=True)) + 1e-9
+                force = delta * dist / k * weights[:, None]
+                total = np.zeros_like(self._pos)
+                np.add.at(total, targets, force)
+                np.add.at(total, sources, -force)
+                displacement += total[active_rows]
+            length = np.sqrt((displacement**2).sum(axis=1, keepdims=True)) + 1e-9
+            step = displacement / length * np.minimum(length, temperature)
+            self._pos[active_rows] += step
+            temperature -= cooling
+        return None
@@ -0,0 +1,205 @@
+"""
+Subgraph queries over a WordGraph for clients that cannot take the whole graph:
+ego-networks, the most frequent words, the subgraph of the current window and
+the lemma graph.
+Results are plain node/edge payloads in the same shape as ``jsonify`` and can be
+paginated and cached per graph version.
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+
+EDGE_TYPES = ("all", "temporal", "semantic")
+
+
+def _check_edge_type(edge_type: str):
+    if edge_type not in EDGE_TYPES:
+        raise ValueError("Edge type must be 'all', 'temporal' or 'semantic'")
+
+
+def _edge_matches(data: dict, edge_type: str, min_weight: float) -> bool:
+    if edge_type != "all" and data.get("type") != edge_type:
+        return False
+    return data.get("weight", 0) >= min_weight
+
+
+def _node_payload(graph, node: str) -> dict:
+    return {"id": node, "data": graph.nodes[node]["data"].to_dict()}
+
+
+def _induced_edges(graph, nodes, edge_type: str = "all", min_weight: float = 0.0):
+    """
+    Edges of *graph* with both endpoints in *nodes* that pass the filters.
+    """
+    edges = []
+    for u in nodes:
+        for _, v, k, data in graph.out_edges(u, keys=True, data=True):
+            if v in nodes and _edge_matches(data, edge_type, min_weight):
+                edges.append({"source": u, "target": v, "key": k, **data})
+    return edges
+
+
+def ego_network(
+    graph,
+    word: str,
+    hops: int = 1,
+    min_weight: float = 0.0,
+    edge_type: str = "all",
+):
+    """
+    Nodes within *hops* of *word*, following edges in both directions like
+    ``WordGraph.in_out_edges``, restricted to edges of *edge_type* whose
+    weight is at least *min_weight*. Nodes are ordered by distance, then by
+    value.
+    """
+    _check_edge_type(edge_type)
+    if not graph.has_node(word):
+        return {"nodes": [], "edges": []}
+    distance = {word: 0}
+    frontier = [word]
+    for hop in range(1, hops + 1):
+        next_frontier = []
+        for node in frontier:
+            neighbours = [
+                (v, data) for _, v, data in graph.out_edges(node, data=True)
+            ] + [(u, data) for u, _, data in graph.in_edges(node, data=True)]
+            for neighbour, data in neighbours:
+                if neighbour in distance or not _edge_matches(
+                    data, edge_type, min_weight
+                ):
+                    continue
+                distance[neighbour] = hop
+                next_frontier.append(neighbour)
+        frontier = next_frontier
+    ordered = sorted(
+        distance,
+        key=lambda n: (distance[n], -graph.nodes[n]["data"].get_value(), n),
+    )
+    return {
+        "nodes": [_node_payload(graph, n) for n in ordered],
+        "edges": _induced_edges(graph, distance, edge_type, min_weight),
+    }
+
+
+def top_nodes(graph, n: int = 50, edge_type: str = "all", min_weight: float = 0.0):
+    """
+    The *n* nodes with the highest ``WordNodeData.value`` and the edges among
+    them.
+    """
+    _check_edge_type(edge_type)
+    top = heapq.nlargest(
+        n,
+        graph.nodes,
+        key=lambda node: (graph.nodes[node]["data"].get_value(), node),
+    )
+    return {
+        "nodes": [_node_payload(graph, node) for node in top],
+        "edges": _induced_edges(graph, set(top), edge_type, min_weight),
+    }
+
+
+def window_subgraph(graph, edge_type: str = "all", min_weight: float = 0.0):
+    """
+    The subgraph induced by the words in the graph's current text window.
+    """
+    _check_edge_type(edge_type)
+    nodes = [n for n in dict.fromkeys(graph.window) if graph.has_node(n)]
+    return {
+        "nodes": [_node_payload(graph, node) for node in nodes],
+        "edges": _induced_edges(graph, set(nodes), edge_type, min_weight),
+    }
+
+
+def lemma_subgraph(view, lemma: str | None = None, min_weight: float = 0.0):
+    """
+    The lemma graph of a published ``GraphView``, or only *lemma* and its
+    neighbours, restricted to edges whose lemma similarity is at least
+    *min_weight*. Nodes are ordered by value.
+    """
+    edges = [
+        {"source": u, "target": v, **data}
+        for (u, v), data in view.lemma_edges.items()
+        if data.get("weight", 0) >= min_weight
+        and (lemma is None or lemma in (u, v))
+    ]
+    if lemma is None:
+        nodes = set(view.lemma_nodes)
+    elif lemma in view.lemma_nodes:
+        nodes = {lemma} | {e["source"] for e in edges} | {e["target"] for e in edges}
+    else:
+        nodes = set()
+    ordered = sorted(
+        nodes, key=lambda n: (n != lemma, -view.lemma_nodes[n]["data"].value, n)
+    )
+    return {
+        "nodes": [
+            {"id": n, "data": view.lemma_nodes[n]["data"].to_dict()} for n in ordered
+        ],
+        "edges": edges,
+    }
+
+
+def paginate(result: dict, page: int = 0, page_size: int = 500) -> dict:
+    """
+    Slice a query result. Nodes and edges are paged side by side so a client
+    can keep requesting pages until both lists are exhausted.
+    """
+    if page < 0 or page_size <= 0:
+        raise ValueError("Page must be >= 0 and page size > 0")
+    start, end = page * page_size, (page + 1) * page_size
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total_nodes": len(result["nodes"]),
+        "total_edges": len(result["edges"]),
+        "has_more": end < max(len(result["nodes"]), len(result["edges"])),
+        "payload": {
+            "nodes": result["nodes"][start:end],
+            "edges": result["edges"][start:end],
+        },
+    }
+
+
+class QueryCache:
+    """
+    Caches query results per scope (e.g. a session) for the current version of
+    that scope's graph. Any mutation bumps ``WordGraph.version``, which
+    invalidates the scope's entries on the next lookup.
+    """
+
+    def __init__(self, max_scopes: int = 1024, max_entries_per_scope: int = 32):
+        self.max_scopes = max_scopes
+        self.max_entries_per_scope = max_entries_per_scope
+        # scope -> (graph, version, OrderedDict of query key -> result)
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, scope, graph, key, compute):
+        version = graph.version
+        with self._lock:
+            cached = self._scopes.get(scope)
+            if cached is None or cached[0] is not graph or cached[1] != version:
+                cached = (graph, version, OrderedDict())
+                self._scopes[scope] = cached
+            self._scopes.move_to_end(scope)
+            entries = cached[2]
+            if key in entries:
+                self.hits += 1
+                entries.move_to_end(key)
+                return entries[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            entries[key] = result
+            if len(entries) > self.max_entries_per_scope:
+                entries.popitem(last=False)
+            if len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        return result
+
+    def invalidate(self, scope) -> None:
+        with self._lock:
+            self._scopes.pop(scope, None)
@@ -0,0 +1,268 @@
+"""
+Incremental word importance for a WordGraph: approximate PageRank kept up to
+date by local pushes, and exact weighted degree.
+
+PageRank is maintained as an estimate ``p`` and a residual ``r`` with the
+invariant ``r = (1 - d) + d * P^T p - p``, where ``P`` is the weighted
+transition matrix over the tracked edge types and ``d`` the damping factor.
+An edge change at ``u`` only perturbs the residuals of ``u``'s successors,
+and pushing a residual only touches the pushed node's successors, so the cost
+of an update grows with the change rather than with the graph. Mass that
+reaches a node without outgoing edges is dropped, and scores are normalised
+to sum to one when read.
+"""
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+
+def _out_weights(graph, node: str, edge_types) -> dict:
+    """Combined weight of *node*'s outgoing edges of *edge_types*, per target."""
+    weights = {}
+    if not graph.has_node(node):
+        return weights
+    for target, bundle in graph.adj[node].items():
+        if target == node:
+            continue
+        total = sum(
+            float(data.get("weight", 0.0))
+            for data in bundle.values()
+            if data.get("type") in edge_types
+        )
+        if total:
+            weights[target] = total
+    return weights
+
+
+def pagerank_reference(
+    graph,
+    damping: float = 0.85,
+    edge_types=("semantic", "temporal"),
+    tol: float = 1e-12,
+    max_iter: int = 1000,
+) -> dict:
+    """
+    Full power-iteration recompute of the PageRank the tracker approximates,
+    normalised to sum to one.
+    """
+    nodes = list(graph.nodes)
+    if not nodes:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    sources, targets, probabilities = [], [], []
+    for node in nodes:
+        out = _out_weights(graph, node, edge_types)
+        total = sum(out.values())
+        for target, weight in out.items():
+            if total > 0:
+                sources.append(index[node])
+                targets.append(index[target])
+                probabilities.append(weight / total)
+    sources, targets = np.array(sources, dtype=int), np.array(targets, dtype=int)
+    probabilities = np.array(probabilities)
+    scores = np.full(len(nodes), 1 - damping)
+    for _ in range(max_iter):
+        spread = np.zeros(len(nodes))
+        np.add.at(spread, targets, scores[sources] * probabilities)
+        new_scores = (1 - damping) + damping * spread
+        converged = np.abs(new_scores - scores).sum() < tol
+        scores = new_scores
+        if converged:
+            break
+    scores /= scores.sum()
+    return dict(zip(nodes, scores.tolist()))
+
+
+class RankTracker:
+    """
+    Keeps PageRank and weighted degree for a WordGraph's words.
+
+    The tracker attaches itself to the graph and is fed from its pending diff
+    sets whenever the diff is cleared (or on demand through ``update``), so it
+    sees every change without replaying the graph. A diff is acknowledged by
+    the graph version it was read at, so reading scores again before the next
+    write costs nothing, and feeding the same diff twice is harmless: each
+    touched node is resynchronised against the graph. ``attach`` moves the
+    tracker to a graph rebuilt from the one it tracked, whose diff describes
+    the rebuild (see ``WordGraph.diff_from``).
+    """
+
+    def __init__(
+        self,
+        graph,
+        damping: float = 0.85,
+        tol: float = 1e-4,
+        edge_types=("semantic", "temporal"),
+    ):
+        self.graph = graph
+        self.damping = damping
+        self.tol = tol
+        self.edge_types = tuple(edge_types)
+        # node -> estimate, residual, weighted degree, outgoing weights, their
+        # total and the sources pointing at it
+        self._p = {}
+        self._r = {}
+        self._degree = {}
+        self._out = {}
+        self._out_total = {}
+        self._in = {}
+        self._queue = deque()
+        self._queued = set()
+        self.pushes = 0
+        # Graph version of the last diff applied
+        self._version = None
+        self.rebuild()
+        graph.ranking = self
+
+    def attach(self, graph) -> None:
+        """Track *graph* from now on, starting from the graph tracked so far."""
+        if self.graph.ranking is self:
+            self.graph.ranking = None
+        self.graph = graph
+        self._version = None
+        graph.ranking = self
+        return None
+
+    def rebuild(self) -> None:
+        """Start over from the graph's current state."""
+        self._p, self._r, self._degree = {}, {}, {}
+        self._out, self._out_total, self._in = {}, {}, {}
+        self._queue, self._queued = deque(), set()
+        self._sync(self.graph.nodes, self.graph.nodes)
+        self._version = self.graph.version
+        return None
+
+    def update(self, graph=None) -> None:
+        """
+        Apply the graph's pending diff: nodes added or removed, and every node
+        whose outgoing edges were added, updated or removed.
+        """
+        graph = self.graph if graph is None else graph
+        if graph.version == self._version:
+            return None
+        nodes = set(graph._added_nodes) | set(graph._removed_nodes)
+        sources = set(nodes)
+        for edges in (graph._added_edges, graph._updated_edges, graph._removed_edges):
+            sources.update(u for u, _, _ in edges)
+        self._sync(nodes, sources)
+        self._version = graph.version
+        return None
+
+    def _sync(self, nodes, sources) -> None:
+        graph = self.graph
+        nodes = list(nodes)
+        sources = set(sources)
+        for node in nodes:
+            # Removing a node also drops the edges pointing at it, even when
+            # the node came back within the same diff
+            sources.update(self._in.get(node, ()))
+        for node in nodes:
+            if graph.has_node(node) and node not in self._p:
+                self._p[node] = 0.0
+                self._r[node] = 0.0
+                self._degree[node] = 0.0
+                self._out[node] = {}
+                self._out_total[node] = 0.0
+                self._in.setdefault(node, set())
+                self._add_residual(node, 1 - self.damping)
+        for source in sources:
+            self._resync_source(source)
+        for node in nodes:
+            if not graph.has_node(node) and node in self._p:
+                for store in (
+                    self._p,
+                    self._r,
+                    self._degree,
+                    self._out,
+                    self._out_total,
+                    self._in,
+                ):
+                    store.pop(node, None)
+                self._queued.discard(node)
+        return None
+
+    def _resync_source(self, source: str) -> None:
+        old = self._out.get(source)
+        if old is None:
+            return None
+        new = _out_weights(self.graph, source, self.edge_types)
+        if new == old:
+            return None
+        old_total, new_total = self._out_total[source], sum(new.values())
+        mass = self.damping * self._p[source]
+        for target in set(old) | set(new):
+            old_weight, new_weight = old.get(target, 0.0), new.get(target, 0.0)
+            if target not in new:
+                self._in.get(target, set()).discard(source)
+            elif target in self._in:
+                self._in[target].add(source)
+            if target in self._degree:
+                self._degree[target] += new_weight - old_weight
+            self._degree[source] += new_weight - old_weight
+            if target not in self._r or mass == 0:
+                continue
+            old_share = old_weight / old_total if old_total else 0.0
+            new_share = new_weight / new_total if new_total else 0.0
+            self._add_residual(target, mass * (new_share - old_share))
+        self._out[source] = new
+        self._out_total[source] = new_total
+        return None
+
+    def _add_residual(self, node: str, amount: float) -> None:
+        self._r[node] += amount
+        if abs(self._r[node]) > self.tol and node not in self._queued:
+            self._queued.add(node)
+            self._queue.append(node)
+        return None
+
+    def _push(self) -> None:
+        """Push residuals until every one is within ``tol``."""
+        p, r, tol = self._p, self._r, self.tol
+        queue, queued = self._queue, self._queued
+        while queue:
+            node = queue.popleft()
+            queued.discard(node)
+            residual = r.get(node, 0.0)
+            if abs(residual) <= tol:
+                continue
+            self.pushes += 1
+            p[node] += residual
+            r[node] = 0.0
+            total = self._out_total[node]
+            if total <= 0:
+                continue
+            share = self.damping * residual / total
+            for target, weight in self._out[node].items():
+                if target not in r:
+                    continue
+                value = r[target] + share * weight
+                r[target] = value
+                if abs(value) > tol and target not in queued:
+                    queued.add(target)
+                    queue.append(target)
+        return None
+
+    def pagerank(self) -> dict:
+        """Current PageRank estimate for every word, normalised to sum to one."""
+        self.update()
+        self._push()
+        total = sum(self._p.values())
+        if total <= 0:
+            return {}
+        return {node: score / total for node, score in self._p.items()}
+
+    def weighted_degree(self) -> dict:
+        self.update()
+        return dict(self._degree)
+
+    def top_k(self, k: int = 10, metric: str = "pagerank") -> list[tuple[str, float]]:
+        """The *k* highest scoring words as (word, score), best first."""
+        if metric == "pagerank":
+            scores = self.pagerank()
+        elif metric == "degree":
+            scores = self.weighted_degree()
+        else:
+            raise ValueError("Metric must be 'pagerank' or 'degree'")
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,410 @@
+"""
+Write-ahead operation log for a WordGraph.
+
+An attached graph logs every change it makes before applying it: node
+values, edges with their final weights, token and contribution bookkeeping,
+and the embeddings, context means and lemmas it resolved. Each operation
+ends with a commit record. A graph is rebuilt after a crash by applying the
+committed changes on top of the latest snapshot, with no model, lemmatizer
+or similarity pass involved. The log is compacted into a new snapshot every
+``compact_every`` operations.
+
+On disk a log directory holds ``snapshot.<gen>`` (a zlib-compressed pickle of
+the graph, absent for generation 0) and ``ops.<gen>.log``, the changes
+applied since that snapshot. Each record is a ``<BII`` header (record type,
+payload length, CRC32 of the payload) followed by its payload. On recovery a
+torn record at the tail of the log is dropped, and so are the changes of an
+operation that never committed. An operation that raises is aborted: its
+changes are dropped from replay and the graph, holding whatever part of them
+was applied, is snapshotted.
+"""
+
+import json
+import os
+import pickle
+import re
+import struct
+import zlib
+
+import numpy as np
+
+from .frequencyGate import FrequencyGate
+from .wordGraph import WordGraph
+
+_HEADER = struct.Struct("<BII")
+
+_CONFIG = 1
+_EMBED = 2
+_LEMMA = 3
+_CHANGE = 4
+_COMMIT = 5
+_CONTEXT = 6
+_ABORT = 7
+
+# Append-only: the position of a change in this tuple is its code on disk
+CHANGES = (
+    "tick",
+    "clear_window",
+    "checkpoint",
+    "undo",
+    "redo",
+    "rollback",
+    "_set_count",
+    "_put_edge",
+    "_drop_edge",
+    "_append_token",
+    "_insert_token",
+    "_set_token",
+    "_contribute",
+    "_delete_tokens",
+    "_extend_vocab",
+    "_clear_sentence",
+    "_close_paragraph",
+    "_resync_tail_context",
+)
+_CHANGE_CODES = {name: code for code, name in enumerate(CHANGES)}
+
+_LOG_PATTERN = re.compile(r"ops\.(\d+)\.log")
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+
+def _unpack_str(buffer: bytes, offset: int):
+    (length,) = _U32.unpack_from(buffer, offset)
+    offset += _U32.size
+    return buffer[offset : offset + length].decode("utf-8"), offset + length
+
+
+def _pack_value(value) -> bytes:
+    if value is None:
+        return b"n"
+    if isinstance(value, bool):
+        return b"b" + bytes([value])
+    if isinstance(value, (int, np.integer)):
+        return b"i" + _I64.pack(int(value))
+    if isinstance(value, (float, np.floating)):
+        return b"f" + _F64.pack(float(value))
+    if isinstance(value, str):
+        return b"s" + _pack_str(value)
+    raise TypeError(f"Cannot log argument of type {type(value).__name__}")
+
+
+def _unpack_value(buffer: bytes, offset: int):
+    tag = buffer[offset : offset + 1]
+    offset += 1
+    if tag == b"n":
+        return None, offset
+    if tag == b"b":
+        return bool(buffer[offset]), offset + 1
+    if tag == b"i":
+        return _I64.unpack_from(buffer, offset)[0], offset + _I64.size
+    if tag == b"f":
+        return _F64.unpack_from(buffer, offset)[0], offset + _F64.size
+    if tag == b"s":
+        return _unpack_str(buffer, offset)
+    raise ValueError(f"Unknown argument tag {tag!r}")
+
+
+def _encode_change(name: str, args: tuple) -> bytes:
+    # Changes are many and small; their arguments are plain Python values
+    return _U16.pack(_CHANGE_CODES[name]) + pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_change(payload: bytes):
+    (code,) = _U16.unpack_from(payload, 0)
+    return CHANGES[code], pickle.loads(payload[_U16.size :])
+
+
+def _encode_embedding(word: str, vector) -> bytes:
+    vector = np.ascontiguousarray(vector)
+    return (
+        _pack_str(word)
+        + _pack_str(vector.dtype.str)
+        + _U32.pack(vector.size)
+        + vector.tobytes()
+    )
+
+
+def _decode_embedding(payload: bytes):
+    word, offset = _unpack_str(payload, 0)
+    dtype, offset = _unpack_str(payload, offset)
+    (size,) = _U32.unpack_from(payload, offset)
+    offset += _U32.size
+    return word, np.frombuffer(payload, dtype=dtype, count=size, offset=offset).copy()
+
+
+def _encode_context(word: str, count: int, vector) -> bytes:
+    return _U32.pack(count) + _encode_embedding(word, vector)
+
+
+def _decode_context(payload: bytes):
+    (count,) = _U32.unpack_from(payload, 0)
+    word, vector = _decode_embedding(payload[_U32.size :])
+    return word, count, vector
+
+
+def _encode_lemmas(word: str, lemmas: list[str]) -> bytes:
+    return _pack_str(word) + _U32.pack(len(lemmas)) + b"".join(map(_pack_str, lemmas))
+
+
+def _decode_lemmas(payload: bytes):
+    word, offset = _unpack_str(payload, 0)
+    (count,) = _U32.unpack_from(payload, offset)
+    offset += _U32.size
+    lemmas = []
+    for _ in range(count):
+        lemma, offset = _unpack_str(payload, offset)
+        lemmas.append(lemma)
+    return word, lemmas
+
+
+def _read_records(path: str):
+    """
+    Yield ``(record type, payload, end offset)`` for every complete record,
+    stopping at a torn one.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        kind, length, checksum = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        offset = start + length
+        yield kind, payload, offset
+
+
+class OpLog:
+    """
+    Append-only operation log for a single WordGraph.
+
+    ``attach`` starts recording a graph; ``OpLog.recover`` rebuilds the graph
+    from a directory after a restart and keeps logging to it. Each commit is
+    handed to the operating system before the operation returns, so a crash
+    of the process loses no committed operation; with ``sync=True`` it is
+    also fsynced, so neither does a crash of the machine.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 10000, sync: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_every = compact_every
+        self.sync = sync
+        self.generation = self._latest_generation(directory)
+        self.graph = None
+        self.operations_since_snapshot = 0
+        self._file = None
+
+    @staticmethod
+    def _latest_generation(directory: str) -> int:
+        generations = [
+            int(match.group(1))
+            for match in map(_LOG_PATTERN.fullmatch, os.listdir(directory))
+            if match
+        ]
+        return max(generations, default=0)
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"ops.{generation}.log")
+
+    def _snapshot_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"snapshot.{generation}")
+
+    def _write(self, kind: int, payload: bytes) -> None:
+        self._file.write(_HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload)
+        return None
+
+    def attach(self, graph: WordGraph) -> None:
+        """
+        Start recording *graph*. A fresh log first records the graph's
+        configuration so recovery can recreate it.
+        """
+        path = self._log_path(self.generation)
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        self.graph = graph
+        graph.oplog = self
+        if fresh and self.generation == 0:
+            self._write(
+                _CONFIG,
+                _pack_value(graph.text_window_size)
+                + _pack_value(graph.semantic_threshold)
+                + _pack_value(graph.contextual)
+                + _pack_value(json.dumps(graph.gate.to_dict()) if graph.gate else None),
+            )
+        return None
+
+    def record(self, name: str, args) -> None:
+        """
+        Log a change the graph is about to apply by calling its method *name*
+        with *args*.
+        """
+        self._write(_CHANGE, _encode_change(name, args))
+        return None
+
+    def commit(self) -> None:
+        """
+        End the operation whose changes were just logged. Every change is
+        applied by now, so this is also where the log is compacted.
+        """
+        self._write(_COMMIT, b"")
+        if self.sync:
+            self.flush()
+        else:
+            self._file.flush()
+        self.operations_since_snapshot += 1
+        if self.compact_every and self.operations_since_snapshot >= self.compact_every:
+            self.compact()
+        return None
+
+    def abort(self) -> None:
+        """
+        Drop the changes of an operation that raised. The graph may hold
+        some of them, so it is snapshotted as it is; the changes are marked
+        aborted first, so replay leaves them out even if the snapshot fails.
+        """
+        self._write(_ABORT, b"")
+        self.compact()
+        return None
+
+    def record_embeddings(self, embeddings: dict) -> None:
+        for word, vector in embeddings.items():
+            self._write(_EMBED, _encode_embedding(word, vector))
+        return None
+
+    def record_contexts(self, contexts: dict) -> None:
+        """Log word -> (contexts seen, running mean) for contextual vectors."""
+        for word, (count, vector) in contexts.items():
+            self._write(_CONTEXT, _encode_context(word, count, vector))
+        return None
+
+    def record_lemmas(self, word: str, lemmas: list[str]) -> None:
+        self._write(_LEMMA, _encode_lemmas(word, lemmas))
+        return None
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return None
+
+    def compact(self) -> None:
+        """
+        Snapshot the graph as the next generation and start a new, empty log.
+        Older generations are removed once the snapshot is safely on disk.
+        """
+        self.flush()
+        next_generation = self.generation + 1
+        path = self._snapshot_path(next_generation)
+        payload = zlib.compress(pickle.dumps(self.graph, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._file.close()
+        old_generation, self.generation = self.generation, next_generation
+        self._file = open(self._log_path(next_generation), "ab")
+        self.operations_since_snapshot = 0
+        for stale in (self._log_path(old_generation), self._snapshot_path(old_generation)):
+            if os.path.exists(stale):
+                os.remove(stale)
+        return None
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+        if self.graph is not None and self.graph.oplog is self:
+            self.graph.oplog = None
+        self.graph = None
+        return None
+
+    def reset(self, graph: WordGraph) -> None:
+        """
+        Discard the log and snapshots and start recording *graph* from scratch.
+        """
+        self.close()
+        for name in os.listdir(self.directory):
+            if _LOG_PATTERN.fullmatch(name) or name.startswith("snapshot."):
+                os.remove(os.path.join(self.directory, name))
+        self.generation = 0
+        self.operations_since_snapshot = 0
+        self.attach(graph)
+        return None
+
+    @classmethod
+    def recover(
+        cls, directory: str, compact_every: int = 10000, sync: bool = False
+    ) -> "OpLog":
+        """
+        Rebuild the graph logged in *directory* from its latest snapshot and
+        log, and return an OpLog attached to it. The graph is ``oplog.graph``.
+        Replay applies the logged changes as they were resolved, never
+        running the models or a similarity pass.
+        """
+        oplog = cls(directory, compact_every=compact_every, sync=sync)
+        graph = None
+        snapshot = oplog._snapshot_path(oplog.generation)
+        if os.path.exists(snapshot):
+            with open(snapshot, "rb") as f:
+                graph = pickle.loads(zlib.decompress(f.read()))
+        log_path = oplog._log_path(oplog.generation)
+        if os.path.exists(log_path):
+            # Changes of the operation being read, applied once it commits
+            pending = []
+            committed = 0
+            for kind, payload, end in _read_records(log_path):
+                if kind == _CHANGE:
+                    pending.append(_decode_change(payload))
+                elif kind == _COMMIT:
+                    for name, args in pending:
+                        getattr(graph, name)(*args)
+                    pending = []
+                    oplog.operations_since_snapshot += 1
+                elif kind == _ABORT:
+                    pending = []
+                elif kind == _CONFIG:
+                    window_size, offset = _unpack_value(payload, 0)
+                    threshold, offset = _unpack_value(payload, offset)
+                    contextual, offset = _unpack_value(payload, offset)
+                    gate, offset = _unpack_value(payload, offset)
+                    graph = WordGraph(
+                        text_window_size=window_size,
+                        semantic_threshold=threshold,
+                        contextual=contextual,
+                        gate=FrequencyGate.from_dict(json.loads(gate)) if gate else None,
+                    )
+                elif kind == _EMBED:
+                    word, vector = _decode_embedding(payload)
+                    graph.embedding_memo[word] = vector
+                elif kind == _CONTEXT:
+                    word, count, vector = _decode_context(payload)
+                    graph.embedding_memo[word] = vector
+                    graph._context_counts[word] = count
+                elif kind == _LEMMA:
+                    word, lemmas = _decode_lemmas(payload)
+                    graph.lemma_memo[word] = lemmas
+                if not pending:
+                    committed = end
+            # Drop a record torn by the crash, and the changes of an operation
+            # it interrupted, so new records follow committed ones
+            with open(log_path, "r+b") as f:
+                f.truncate(committed)
+        if graph is None:
+            raise FileNotFoundError(f"No operation log in {directory}")
+        graph.clear_diff()
+        oplog.attach(graph)
+        return oplog
@@ -0,0 +1,384 @@
+"""
+A corpus graph partitioned across local worker processes.
+
+Words are assigned to shards by a stable hash. Each shard runs in its own
+process and holds a WordGraph slice with the words it owns and all of their
+outgoing edges; targets owned by another shard appear in the slice with a
+count of zero. A ``ShardedWordGraph`` coordinates the shards:
+
+- ``add_documents`` hands each document to a worker, which ingests it into
+  a fresh WordGraph and splits the result by owner. The owners then merge
+  their parts: word counts add up and an edge keeps its highest weight, so
+  the corpus graph matches a single WordGraph fed the same documents one
+  paragraph each, with the window reset in between.
+- ``propagate`` and ``ego_network`` expand one hop at a time, sending each
+  shard the part of the frontier it can answer and merging the replies.
+
+Documents are independent, so count-based frequency gating sees each
+document's counts rather than the corpus's. Text cannot be deleted.
+"""
+
+import multiprocessing
+import os
+import traceback
+import zlib
+
+import networkx as nx
+
+from . import graphQueries
+from .wordGraph import WordGraph, WordNodeData
+
+
+def shard_of(word: str, shards: int) -> int:
+    """The shard owning *word*; stable across processes, unlike ``hash``."""
+    return zlib.crc32(word.encode("utf-8")) % shards
+
+
+class GraphShard:
+    """
+    One partition of a sharded graph, living in a worker process. Workers
+    also ingest documents on the coordinator's behalf.
+    """
+
+    def __init__(self, index: int, shards: int, graph_options: dict):
+        self.index = index
+        self.shards = shards
+        self.graph_options = graph_options
+        self.graph = WordGraph(**graph_options)
+        # Shared by the throwaway graphs documents are ingested into
+        self._embedding_memo = {}
+        self._lemma_memo = {}
+
+    def build(self, documents: list[str]) -> list[dict]:
+        """
+        Ingest each document into a fresh graph and split it by owner: per
+        document, shard -> (node values and lemmas, edges as (source,
+        target, type, weight, creation)). Targets owned by another shard
+        come with a value of zero.
+        """
+        results = []
+        for text in documents:
+            graph = WordGraph(**self.graph_options)
+            graph.embedding_memo = self._embedding_memo
+            graph.lemma_memo = self._lemma_memo
+            graph.add_text(text, reset_window=True)
+            # The document ends here, so close its last sentence and paragraph
+            graph.semantic_update("paragraph")
+            parts = {}
+            for word, attributes in graph.nodes(data=True):
+                data = attributes["data"]
+                nodes, _ = parts.setdefault(shard_of(word, self.shards), ({}, []))
+                nodes[word] = (data.get_value(), data.lemmatized)
+            for u, v, data in graph.edges(data=True):
+                owner = shard_of(u, self.shards)
+                nodes, edges = parts.setdefault(owner, ({}, []))
+                if owner != shard_of(v, self.shards) and v not in nodes:
+                    nodes[v] = (0, graph.nodes[v]["data"].lemmatized)
+                edges.append((u, v, data["type"], data["weight"], data.get("creation")))
+            results.append(parts)
+        return results
+
+    def merge(self, parts: list[tuple]) -> None:
+        """Merge the parts of several documents, in document order."""
+        graph = self.graph
+        for nodes, edges in parts:
+            for word, (value, lemmatized) in nodes.items():
+                if graph.has_node(word):
+                    graph.nodes[word]["data"] += value
+                else:
+                    graph.add_node(word, data=WordNodeData(word, value, lemmatized))
+            for u, v, edge_type, weight, creation in edges:
+                key = graph._edge_key(u, v, edge_type)
+                if key is None:
+                    graph.add_edge(u, v, type=edge_type, weight=weight, creation=creation)
+                elif graph[u][v][key]["weight"] < weight:
+                    graph._set_edge_weight(u, v, key, weight)
+        graph.version += 1
+        # Nobody reads the slice's diffs, views or lemmas as it grows
+        graph.clear_diff()
+        graph._forget_changes()
+        return None
+
+    def node(self, word: str):
+        graph = self.graph
+        return graph.nodes[word].get("data") if graph.has_node(word) else None
+
+    def successors(self, word: str) -> list[str]:
+        return list(self.graph.successors(word))
+
+    def expand(self, items: list[tuple]) -> tuple:
+        """
+        One step of ``WordGraph.propagate`` for ``(node, fluid, paths)``
+        items: how many paths arrived, the nodes reached, and the items to
+        pass on to each neighbour.
+        """
+        graph = self.graph
+        arrived, reached, passed = 0, set(), []
+        for node, fluid, paths in items:
+            arrived += paths
+            reached.add(node)
+            for neighbour in graph.neighbors(node):
+                # Same weight as WordGraph.propagate: the last parallel edge's
+                weight = 0
+                for data in graph[node][neighbour].values():
+                    weight = data.get("weight", 0)
+                passed.append((neighbour, fluid * max(0, weight), paths))
+        return arrived, reached, passed
+
+    def neighbourhood(self, frontier: list[str], edge_type: str, min_weight: float) -> list[str]:
+        """
+        Neighbours of the frontier through this shard's edges, in either
+        direction, that pass the filters.
+        """
+        graph = self.graph
+        found = {}
+        for node in frontier:
+            if not graph.has_node(node):
+                continue
+            # Out-edges exist only for owned nodes; in-edges come from them
+            for _, v, data in graph.out_edges(node, data=True):
+                if graphQueries._edge_matches(data, edge_type, min_weight):
+                    found.setdefault(v)
+            for u, _, data in graph.in_edges(node, data=True):
+                if graphQueries._edge_matches(data, edge_type, min_weight):
+                    found.setdefault(u)
+        return list(found)
+
+    def subgraph(self, nodes: set, edge_type: str, min_weight: float) -> tuple:
+        """Payloads of the owned *nodes* and their edges within *nodes*."""
+        graph = self.graph
+        owned = [n for n in nodes if shard_of(n, self.shards) == self.index and graph.has_node(n)]
+        payloads = [graphQueries._node_payload(graph, n) for n in owned]
+        return payloads, _edges_into(graph, owned, nodes, edge_type, min_weight)
+
+    def stats(self) -> dict:
+        graph = self.graph
+        return {
+            "nodes": sum(1 for word in graph if shard_of(word, self.shards) == self.index),
+            "edges": graph.number_of_edges(),
+            "pid": os.getpid(),
+        }
+
+
+def _edges_into(graph, sources, targets, edge_type: str, min_weight: float) -> list[dict]:
+    edges = []
+    for u in sources:
+        for _, v, k, data in graph.out_edges(u, keys=True, data=True):
+            if v in targets and graphQueries._edge_matches(data, edge_type, min_weight):
+                edges.append({"source": u, "target": v, "key": k, **data})
+    return edges
+
+
+def _serve(connection, index: int, shards: int, graph_options: dict, encoder) -> None:
+    """Worker loop: run the shard's methods until told to stop."""
+    if encoder is not None:
+        from . import wordGraph
+
+        wordGraph.textUtils.set_encoder(encoder)
+    shard = GraphShard(index, shards, graph_options)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            reply = ("ok", getattr(shard, method)(*args))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+        connection.send(reply)
+    connection.close()
+
+
+class ShardWorkerError(RuntimeError):
+    """A shard's method raised in its worker process."""
+
+
+class ShardedWordGraph:
+    """
+    Coordinator of a word graph hash-partitioned across *shards* local
+    worker processes. Accepts the same options as WordGraph; *encoder*
+    replaces the sentence encoder in every worker, as ``set_encoder`` does.
+    Close it, or use it as a context manager, to stop the workers.
+    """
+
+    def __init__(
+        self,
+        shards: int | None = None,
+        encoder=None,
+        start_method: str | None = None,
+        **graph_options,
+    ):
+        self.shards = shards or os.cpu_count() or 1
+        context = multiprocessing.get_context(start_method)
+        self._connections = []
+        self._workers = []
+        for index in range(self.shards):
+            parent, child = context.Pipe()
+            worker = context.Process(
+                target=_serve,
+                args=(child, index, self.shards, graph_options, encoder),
+                daemon=True,
+            )
+            worker.start()
+            child.close()
+            self._connections.append(parent)
+            self._workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._connections, self._workers = [], []
+        return None
+
+    def _call(self, calls: dict) -> dict:
+        """
+        Run ``{shard: (method, args)}`` on the shards concurrently and return
+        ``{shard: result}``.
+        """
+        for index, request in calls.items():
+            self._connections[index].send(request)
+        results, error = {}, None
+        # Collect every reply, even after an error, so the pipes stay in step
+        for index in calls:
+            status, value = self._connections[index].recv()
+            if status == "error":
+                error = error or ShardWorkerError(f"Shard {index}: {value}")
+            else:
+                results[index] = value
+        if error is not None:
+            raise error
+        return results
+
+    def _call_all(self, method: str, *args) -> list:
+        results = self._call({index: (method, args) for index in range(self.shards)})
+        return [results[index] for index in range(self.shards)]
+
+    def _owner(self, word: str) -> int:
+        return shard_of(word, self.shards)
+
+    def add_text(self, text: str) -> None:
+        """Add *text* as one document."""
+        return self.add_documents([text])
+
+    def add_documents(self, documents: list[str]) -> None:
+        """
+        Ingest *documents* on all workers at once, then merge every part
+        into the shard that owns it, in document order.
+        """
+        assigned = {}
+        for position, text in enumerate(documents):
+            assigned.setdefault(position % self.shards, []).append(text)
+        built = self._call({index: ("build", (texts,)) for index, texts in assigned.items()})
+        parts = {}
+        for position in range(len(documents)):
+            worker = position % self.shards
+            document = built[worker][position // self.shards]
+            for index, part in document.items():
+                parts.setdefault(index, []).append(part)
+        self._call({index: ("merge", (owned,)) for index, owned in parts.items()})
+        return None
+
+    def node(self, word: str):
+        """The word's WordNodeData, or None if it is not in the graph."""
+        owner = self._owner(word)
+        return self._call({owner: ("node", (word,))})[owner]
+
+    def has_node(self, word: str) -> bool:
+        return self.node(word) is not None
+
+    def successors(self, word: str) -> list[str]:
+        owner = self._owner(word)
+        return self._call({owner: ("successors", (word,))})[owner]
+
+    def stats(self) -> list[dict]:
+        """Node and edge counts and the worker's pid, per shard."""
+        return self._call_all("stats")
+
+    def number_of_nodes(self) -> int:
+        return sum(shard["nodes"] for shard in self.stats())
+
+    def number_of_edges(self) -> int:
+        return sum(shard["edges"] for shard in self.stats())
+
+    def propagate(self, start: str, fluid: float, threshold: float = 0.5):
+        """
+        ``WordGraph.propagate`` across shards: the number of paths along which
+        at least *threshold* fluid arrives, and the nodes they reach. Paths
+        arriving at a node with the same fluid are expanded once.
+        """
+        if fluid < threshold:
+            return (0, set())
+        if not self.has_node(start):
+            raise nx.NetworkXError(f"The node {start} is not in the digraph.")
+        arrived, reached = 0, set()
+        level = {(start, fluid): 1}
+        while level:
+            calls = {}
+            for (node, node_fluid), paths in level.items():
+                calls.setdefault(self._owner(node), []).append((node, node_fluid, paths))
+            results = self._call({index: ("expand", (items,)) for index, items in calls.items()})
+            level = {}
+            for count, nodes, passed in results.values():
+                arrived += count
+                reached |= nodes
+                for node, node_fluid, paths in passed:
+                    # As in WordGraph.propagate, which recurses with the
+                    # default threshold, only the start uses *threshold*
+                    if node_fluid >= 0.5:
+                        level[node, node_fluid] = level.get((node, node_fluid), 0) + paths
+        return (arrived, reached)
+
+    def ego_network(
+        self,
+        word: str,
+        hops: int = 1,
+        min_weight: float = 0.0,
+        edge_type: str = "all",
+    ):
+        """
+        ``graphQueries.ego_network`` across shards. Nodes come in the same
+        order; edges are grouped by source in node order.
+        """
+        graphQueries._check_edge_type(edge_type)
+        if not self.has_node(word):
+            return {"nodes": [], "edges": []}
+        distance = {word: 0}
+        frontier = [word]
+        for hop in range(1, hops + 1):
+            if not frontier:
+                break
+            next_frontier = []
+            for found in self._call_all("neighbourhood", frontier, edge_type, min_weight):
+                for neighbour in found:
+                    if neighbour not in distance:
+                        distance[neighbour] = hop
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        nodes, edges = [], {}
+        for payloads, owned_edges in self._call_all(
+            "subgraph", set(distance), edge_type, min_weight
+        ):
+            nodes.extend(payloads)
+            for edge in owned_edges:
+                edges.setdefault(edge["source"], []).append(edge)
+        nodes.sort(key=lambda n: (distance[n["id"]], -n["data"]["value"], n["id"]))
+        return {
+            "nodes": nodes,
+            "edges": [edge for n in nodes for edge in edges.get(n["id"], [])],
+        }
@@ -6,14 +6,61 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tqdm import tqdm
 import textUtils
+import metrics
 import json
+import functools
+import threading
+from contextlib import contextmanager
 import numpy as np
+from collections import Counter, deque
 
 
 def sigmoid(x: float) -> float:
     return 1 / (1 + np.exp(-x))
 
 
+def _operation(method):
+    """
+    Marks a WordGraph method as an operation for the attached operation log.
+    The changes an operation makes are logged one by one before they are
+    applied, and the outermost operation commits them when it returns, so
+    recovery replays whole operations only. An operation that raises, or
+    contains one that raised, is aborted instead of committed.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.oplog is None:
+            return method(self, *args, **kwargs)
+        self._op_depth += 1
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException:
+            self._op_failed = True
+            raise
+        finally:
+            self._op_depth -= 1
+            if self._op_depth == 0:
+                failed, self._op_failed = self._op_failed, False
+                if failed:
+                    self.oplog.abort()
+                else:
+                    self.oplog.commit()
+        return result
+
+    return wrapper
+
+
+def _serialise(message_type: str, payload: dict) -> str:
+    """
+    Encode a payload message for the frontend, recording its size. Callers
+    time building and encoding the payload together as the json stage.
+    """
+    body = json.dumps({"type": message_type, "payload": payload}, cls=NodeEncoder)
+    metrics.observe("payload_size", len(body), {"type": message_type})
+    return body
+
+
 class NodeEncoder(json.JSONEncoder):
     """
     JSON encoder for WordNodeData and LemmaNodeData objects.
@@ -35,10 +82,12 @@ class WordNodeData:
     Data associated with a word node.
     """
 
-    def __init__(self, word, value: int):
+    def __init__(self, word, value: int, lemmatized: list[str] | None = None):
         self.word = word
         self.value = value
-        self.lemmatized = textUtils.lemmatize_text(word)
+        if lemmatized is None:
+            lemmatized = textUtils.lemmatize_text(word)
+        self.lemmatized = lemmatized
 
     def set_value(self, value: int):
         self.value = value
@@ -74,25 +123,35 @@ class WordNodeData:
 
 class LemmaNodeData:
     """
-    Data associated with a lemma node.
+    Data associated with a lemma node: how many distinct words map to the
+    lemma and the sum of their values.
     """
 
-    def __init__(self, lemma: str):
+    def __init__(self, lemma: str, count: int = 0, value: int = 0):
         self.lemma = lemma
+        self.count = count
+        self.value = value
 
     def __str__(self):
-        return "LemmaNode(" + self.lemma + ")"
+        return "LemmaNode(" + self.lemma + ", " + str(self.value) + ")"
 
     def __hash__(self):
         return hash(self.lemma)
 
     def to_dict(self):
-        return {"lemma": self.lemma}
+        return {"lemma": self.lemma, "count": self.count, "value": self.value}
 
 
 class LemmaGraph(nx.Graph):
     """
     Undirected graph representing the semantic connections between lemmas.
+
+    A WordGraph keeps it as a projection of its words: every word adds its
+    value to its lemma's node, and every semantic word pair adds to the edge
+    between their lemmas, so both can be taken back out when the word or the
+    pair goes away. An edge's ``weight`` is the similarity of the two lemmas;
+    ``count`` is the number of word pairs behind it and ``word_weight`` the
+    sum of their weights.
     """
 
     def __init__(self):
@@ -124,36 +183,1031 @@ class LemmaGraph(nx.Graph):
             raise ValueError("Edge does not exist")
         return None
 
+    def project_word(self, lemma: str, value: int) -> None:
+        self.add_lemma_node(lemma)
+        data = self.nodes[lemma]["data"]
+        data.count += 1
+        data.value += value
+        return None
+
+    def release_word(self, lemma: str, value: int) -> None:
+        data = self.nodes[lemma]["data"]
+        data.count -= 1
+        data.value -= value
+        if data.count <= 0:
+            self.remove_node(lemma)
+        return None
+
+    def project_pair(
+        self, lemma1: str, lemma2: str, word_weight: float, weight: float | None = None
+    ) -> None:
+        """
+        Adds a word pair to the edge between two lemmas. *weight* is only
+        needed when the edge is new.
+        """
+        if self.has_edge(lemma1, lemma2):
+            data = self[lemma1][lemma2]
+            data["count"] += 1
+            data["word_weight"] += word_weight
+        else:
+            self.add_edge(lemma1, lemma2, weight=weight, count=1, word_weight=word_weight)
+        return None
+
+    def release_pair(self, lemma1: str, lemma2: str, word_weight: float) -> None:
+        data = self[lemma1][lemma2]
+        data["count"] -= 1
+        data["word_weight"] -= word_weight
+        if data["count"] <= 0:
+            self.remove_edge(lemma1, lemma2)
+        return None
+
+
+class EdgeContribution:
+    """
+    The edges a pair of token occurrences added to the graph, shared by every
+    token they depend on so that removing any one undoes them exactly once.
+    """
+
+    __slots__ = ("edges", "active")
+
+    def __init__(self, edges: list[tuple]):
+        # Each entry is (source, target, edge type, weight)
+        self.edges = edges
+        self.active = True
+
+
+class Token:
+    """
+    A single occurrence of a word in the document.
+    """
+
+    __slots__ = ("word", "ends_sentence", "ends_paragraph", "contributions", "linked")
+
+    def __init__(
+        self, word: str, ends_sentence: bool = False, ends_paragraph: bool = False
+    ):
+        self.word = word
+        self.ends_sentence = ends_sentence
+        self.ends_paragraph = ends_paragraph
+        self.contributions = []
+        # False when the graph's gate kept this occurrence from creating edges
+        self.linked = True
+
+    def __repr__(self):
+        return "Token(" + self.word + ")"
+
+
+class TokenSequence:
+    """
+    Positional index over the token occurrences of a document.
+    Tokens live in bounded blocks, so locating a position costs O(n / block_size)
+    and deleting or inserting a span costs O(span + n / block_size).
+    """
+
+    # When set, a list that receives the inverse of every mutation
+    journal = None
+
+    def __init__(self, block_size: int = 64):
+        self.block_size = block_size
+        self._blocks = []
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def __reversed__(self):
+        for block in reversed(self._blocks):
+            yield from reversed(block)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Token index out of range")
+        # Most lookups are near the end of the document
+        last = self._blocks[-1]
+        offset = index - (self._length - len(last))
+        if offset >= 0:
+            return last[offset]
+        block_index, offset = self._locate(index)
+        return self._blocks[block_index][offset]
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """
+        Map a position in [0, len] to (block index, offset), walking from
+        whichever end of the sequence is closer.
+        """
+        if index == self._length:
+            if not self._blocks:
+                return (0, 0)
+            return (len(self._blocks) - 1, len(self._blocks[-1]))
+        if index < self._length // 2:
+            for block_index, block in enumerate(self._blocks):
+                if index < len(block):
+                    return (block_index, index)
+                index -= len(block)
+        else:
+            remaining = self._length - index
+            for block_index in range(len(self._blocks) - 1, -1, -1):
+                block = self._blocks[block_index]
+                if remaining <= len(block):
+                    return (block_index, len(block) - remaining)
+                remaining -= len(block)
+        raise IndexError("Token index out of range")
+
+    def append(self, token: Token) -> None:
+        if not self._blocks or len(self._blocks[-1]) >= self.block_size:
+            self._blocks.append([])
+        self._blocks[-1].append(token)
+        self._length += 1
+        if self.journal is not None:
+            self.journal.append(("delete", self._length - 1, self._length))
+
+    def tail(self, count: int) -> list[Token]:
+        """Return the last *count* tokens in document order."""
+        if count <= 0:
+            return []
+        result = []
+        for block in reversed(self._blocks):
+            need = count - len(result)
+            if need <= 0:
+                break
+            result.extend(reversed(block[-need:]))
+        result.reverse()
+        return result
+
+    def slice(self, start: int, end: int) -> list[Token]:
+        """Return the tokens in positions [start, end)."""
+        start, end = max(start, 0), min(end, self._length)
+        if start >= end:
+            return []
+        block_index, offset = self._locate(start)
+        result = []
+        while len(result) < end - start:
+            block = self._blocks[block_index]
+            result.extend(block[offset : offset + end - start - len(result)])
+            block_index += 1
+            offset = 0
+        return result
+
+    def insert(self, index: int, tokens: list[Token]) -> None:
+        """Insert *tokens* so that the first one ends up at position *index*."""
+        if not tokens:
+            return
+        if not 0 <= index <= self._length:
+            raise IndexError("Token index out of range")
+        if not self._blocks:
+            self._blocks.append([])
+        block_index, offset = self._locate(index)
+        block = self._blocks[block_index]
+        block[offset:offset] = tokens
+        if len(block) > 2 * self.block_size:
+            self._blocks[block_index : block_index + 1] = [
+                block[i : i + self.block_size]
+                for i in range(0, len(block), self.block_size)
+            ]
+        self._length += len(tokens)
+        if self.journal is not None:
+            self.journal.append(("delete", index, index + len(tokens)))
+
+    def delete(self, start: int, end: int) -> list[Token]:
+        """Remove and return the tokens in positions [start, end)."""
+        start, end = max(start, 0), min(end, self._length)
+        if start >= end:
+            return []
+        block_index, offset = self._locate(start)
+        removed = []
+        first = block_index
+        while len(removed) < end - start:
+            block = self._blocks[block_index]
+            take = block[offset : offset + end - start - len(removed)]
+            del block[offset : offset + len(take)]
+            removed.extend(take)
+            block_index += 1
+            offset = 0
+        self._length -= len(removed)
+        # Drop emptied blocks and fold the seam back together when it is small
+        self._blocks[first:block_index] = [
+            b for b in self._blocks[first:block_index] if b
+        ]
+        if first + 1 < len(self._blocks) and (
+            len(self._blocks[first]) + len(self._blocks[first + 1]) <= self.block_size
+        ):
+            self._blocks[first].extend(self._blocks.pop(first + 1))
+        if self.journal is not None:
+            self.journal.append(("insert", start, removed))
+        return removed
+
+    def rfind(self, words: list[str]) -> int:
+        """
+        Return the start position of the most recent contiguous occurrence of
+        *words*, or -1. Recent text is found in time proportional to its distance
+        from the end of the document.
+        """
+        if not words or len(words) > self._length:
+            return -1
+        target = list(reversed(words))
+        recent = deque(maxlen=len(words))
+        index = self._length
+        for token in reversed(self):
+            index -= 1
+            recent.append(token.word)
+            if len(recent) == len(words) and list(recent) == target:
+                return index
+        return -1
+
+
+class Journal:
+    """
+    Copy-on-write record of the graph state changed since a checkpoint.
+    The first time a node, an edge bundle, a reference count, a token or a
+    contribution is touched its previous value is saved, so a journal costs
+    O(changes) no matter how large the graph is. Token sequence mutations are
+    kept as their inverses. Applying a journal restores the saved state and
+    returns the journal that redoes it. The lemma graph is not journaled: it
+    is reprojected from the restored words.
+    """
+
+    def __init__(self, graph):
+        self.nodes = {}
+        self.edges = {}
+        self.refs = {}
+        self.tokens = {}
+        self.contributions = {}
+        self.sequence = []
+        # The window and open containers are bounded by the text window and
+        # the current paragraph, so they are copied whole
+        self.context = (
+            graph.time,
+            list(graph.window),
+            list(graph.sentence),
+            list(graph.paragraph),
+            dict(graph._paragraph_vocab),
+        )
+
+    def __bool__(self):
+        return bool(
+            self.nodes
+            or self.edges
+            or self.refs
+            or self.tokens
+            or self.contributions
+            or self.sequence
+        )
+
+    def save_node(self, graph, word: str) -> None:
+        if word not in self.nodes:
+            data = graph.nodes[word]["data"] if graph.has_node(word) else None
+            self.nodes[word] = None if data is None else (data.value, data.lemmatized)
+        return None
+
+    def save_edges(self, graph, u: str, v: str) -> None:
+        if (u, v) not in self.edges:
+            bundle = graph.get_edge_data(u, v)
+            self.edges[(u, v)] = (
+                None
+                if bundle is None
+                else {key: dict(data) for key, data in bundle.items()}
+            )
+        return None
+
+    def save_refs(self, graph, key: tuple) -> None:
+        if key not in self.refs:
+            refs = graph._edge_refs.get(key)
+            self.refs[key] = None if refs is None else Counter(refs)
+        return None
+
+    def save_token(self, token: Token) -> None:
+        if token not in self.tokens:
+            self.tokens[token] = (token.ends_sentence, list(token.contributions))
+        return None
+
+    def save_contribution(self, contribution: EdgeContribution) -> None:
+        if contribution not in self.contributions:
+            self.contributions[contribution] = contribution.active
+        return None
+
+    def apply(self, graph) -> "Journal":
+        """
+        Restore the saved state into *graph* and return the journal of what
+        was overwritten, recorded as a diff for the frontend.
+        """
+        inverse = Journal(graph)
+        graph._set_journal(inverse)
+        try:
+            for op in reversed(self.sequence):
+                if op[0] == "delete":
+                    graph.tokens.delete(op[1], op[2])
+                else:
+                    graph.tokens.insert(op[1], op[2])
+            for token, (ends_sentence, contributions) in self.tokens.items():
+                inverse.save_token(token)
+                token.ends_sentence = ends_sentence
+                token.contributions = list(contributions)
+            for contribution, active in self.contributions.items():
+                inverse.save_contribution(contribution)
+                contribution.active = active
+            for key, refs in self.refs.items():
+                inverse.save_refs(graph, key)
+                if refs is None:
+                    graph._edge_refs.pop(key, None)
+                else:
+                    graph._edge_refs[key] = Counter(refs)
+            self._restore_nodes(graph, inverse, present=True)
+            self._restore_edges(graph, inverse)
+            self._restore_nodes(graph, inverse, present=False)
+            (
+                graph.time,
+                window,
+                sentence,
+                paragraph,
+                vocab,
+            ) = self.context
+            graph.window = list(window)
+            graph.sentence = list(sentence)
+            graph.paragraph = list(paragraph)
+            graph._paragraph_vocab = dict(vocab)
+            graph.version += 1
+        finally:
+            graph._set_journal(None)
+        return inverse
+
+    def _restore_nodes(self, graph, inverse: "Journal", present: bool) -> None:
+        # Nodes are recreated before their edges and removed after them
+        for word, saved in self.nodes.items():
+            if (saved is not None) != present:
+                continue
+            inverse.save_node(graph, word)
+            if saved is None:
+                if graph.has_node(word):
+                    graph.remove_node(word)
+                    graph._added_nodes.discard(word)
+                    graph._updated_nodes.discard(word)
+                    graph._removed_nodes.add(word)
+            elif graph.has_node(word):
+                graph._touch_node(word)
+                data = graph.nodes[word]["data"]
+                data.value, data.lemmatized = saved
+                graph._updated_nodes.add(word)
+            else:
+                graph.add_node(word, data=WordNodeData(word, saved[0], saved[1]))
+                graph._removed_nodes.discard(word)
+                graph._added_nodes.add(word)
+        return None
+
+    def _restore_edges(self, graph, inverse: "Journal") -> None:
+        for (u, v), saved in self.edges.items():
+            inverse.save_edges(graph, u, v)
+            saved = saved or {}
+            current = graph.get_edge_data(u, v) or {}
+            for key in [key for key in current if key not in saved]:
+                graph.remove_edge(u, v, key)
+                graph._removed_edges.append((u, v, key))
+            for key, data in saved.items():
+                if graph.has_edge(u, v, key):
+                    graph._mark_edge(u, v, data.get("type"))
+                    attributes = graph[u][v][key]
+                    attributes.clear()
+                    attributes.update(data)
+                    graph._updated_edges.append((u, v, key))
+                else:
+                    graph.add_edge(u, v, key=key, **data)
+                    graph._added_edges.append((u, v, key))
+        return None
+
+
+class Checkpoint:
+    """
+    A named point in a graph's history and the journal of changes made since.
+    """
+
+    __slots__ = ("id", "name", "journal")
+
+    def __init__(self, checkpoint_id: int, name: str | None, journal: Journal):
+        self.id = checkpoint_id
+        self.name = name
+        self.journal = journal
+
+
+class GraphView:
+    """
+    Immutable view of a WordGraph at one version, for readers that must not
+    see a graph while it is being written. A new view is published after a
+    batch of changes, once somebody reads it; the view shares every node
+    entry and adjacency tuple that did not change with the view before it,
+    so publishing costs O(nodes) pointer copies plus the changed adjacency.
+    Exposes the read-only part of the graph API used by serialisation,
+    ``propagate`` and the subgraph queries, and the lemma graph as plain
+    mappings.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        time: int,
+        window,
+        nodes,
+        succ,
+        pred,
+        lemma_nodes=None,
+        lemma_edges=None,
+    ):
+        self.version = version
+        self.time = time
+        self.window = window
+        # node -> {"data": WordNodeData}, copied when the node changes
+        self.nodes = nodes
+        # node -> tuple of (neighbour, key, edge attributes)
+        self._succ = succ
+        self._pred = pred
+        # lemma -> {"data": LemmaNodeData} and sorted lemma pair -> attributes
+        self.lemma_nodes = {} if lemma_nodes is None else lemma_nodes
+        self.lemma_edges = {} if lemma_edges is None else lemma_edges
+
+    def has_node(self, node) -> bool:
+        return node in self.nodes
+
+    def has_edge(self, u, v, key=None) -> bool:
+        return any(
+            target == v and (key is None or k == key)
+            for target, k, _ in self._succ.get(u, ())
+        )
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return sum(len(edges) for edges in self._succ.values())
+
+    def get_window(self):
+        return list(self.window)
+
+    def get_edge_data(self, u, v, key=None):
+        bundle = {k: data for target, k, data in self._succ.get(u, ()) if target == v}
+        if key is not None:
+            return bundle.get(key)
+        return bundle or None
+
+    def neighbors(self, node):
+        return iter(dict.fromkeys(v for v, _, _ in self._succ[node]))
+
+    successors = neighbors
+
+    def predecessors(self, node):
+        return iter(dict.fromkeys(u for u, _, _ in self._pred[node]))
+
+    @staticmethod
+    def _edge_tuple(u, v, key, data, keys: bool, with_data):
+        edge = (u, v, key) if keys else (u, v)
+        if with_data is True:
+            return edge + (data,)
+        if with_data:
+            return edge + (data.get(with_data),)
+        return edge
+
+    def out_edges(self, node=None, keys: bool = False, data=False):
+        nodes = self._succ if node is None else (node,)
+        return [
+            self._edge_tuple(u, v, k, d, keys, data)
+            for u in nodes
+            for v, k, d in self._succ.get(u, ())
+        ]
+
+    edges = out_edges
+
+    def in_edges(self, node=None, keys: bool = False, data=False):
+        nodes = self._pred if node is None else (node,)
+        return [
+            self._edge_tuple(u, v, k, d, keys, data)
+            for v in nodes
+            for u, k, d in self._pred.get(v, ())
+        ]
+
+    def jsonify(self):
+        with metrics.stage("json"):
+            return self._jsonify()
+
+    def _jsonify(self):
+        nodes = [{"id": n, "data": d["data"]} for n, d in self.nodes.items()]
+        edges = [
+            {"source": u, "target": v, "key": k, **d}
+            for u, v, k, d in self.edges(keys=True, data=True)
+        ]
+        data = {
+            "nodes": nodes,
+            "edges": edges,
+            "lemma_nodes": [
+                {"id": lemma, "data": d["data"]} for lemma, d in self.lemma_nodes.items()
+            ],
+            "lemma_edges": [
+                {"source": u, "target": v, **d} for (u, v), d in self.lemma_edges.items()
+            ],
+        }
+        return _serialise("full", data)
+
 
 class WordGraph(nx.MultiDiGraph):
     """
     Multi-directional graph representing the semantic connections and temporal connections between words.
     """
 
-    def __init__(self, text_window_size: int = 30, semantic_threshold: float = 0.5):
+    # Journal of the open checkpoint; None until the first checkpoint
+    _journal = None
+    # Latest published GraphView; None until the first publish
+    _view = None
+    # Whether a writer batch ended since the latest view was published, and
+    # whether a reader asked for a newer view while a batch was running
+    _view_stale = False
+    _view_wanted = False
+    # Optional RankTracker fed with every diff before it is cleared
+    ranking = None
+    # Optional FrequencyGate deciding which occurrences create edges
+    gate = None
+    # Whether the lemma graph must be projected again from scratch
+    _lemmas_stale = False
+    # Whether an operation inside the outermost one being logged raised
+    _op_failed = False
+
+    def __init__(
+        self,
+        text_window_size: int = 30,
+        semantic_threshold: float = 0.5,
+        max_checkpoints: int = 64,
+        contextual: bool = False,
+        gate=None,
+    ):
         super().__init__()
-        self.lemma_graph = LemmaGraph()
+        self._reset_lemma_projection()
         self.text_window_size = text_window_size
         self.semantic_threshold = semantic_threshold
         self.time = 0
+        # Bumped on every mutation that shows up in a diff
+        self.version = 0
         self.embedding_memo = {}
+        # With contextual embeddings, a word's memo entry is the running mean
+        # of its vectors in every sentence added so far, over this many
+        self.contextual = contextual
+        self._context_counts = {}
+        self.gate = gate
+        self.lemma_memo = {}
+        # Optional OpLog recording every operation applied to the graph
+        self.oplog = None
+        self._op_depth = 0
         self.sentence = []
         self.paragraph = []
         self.window = []
+        # Words of the paragraph already linked to each other, mapped to the
+        # occurrence that introduced them
+        self._paragraph_vocab = {}
+        # Every token occurrence in document order, and how many occurrences
+        # currently vouch for each edge weight (keyed by (u, v, type))
+        self.tokens = TokenSequence()
+        self._edge_refs = {}
+        # Undo history: checkpoints oldest first, and the steps undone since
+        # the last change
+        self.max_checkpoints = max_checkpoints
+        self._checkpoints = []
+        self._redo = []
+        self._next_checkpoint = 0
+        self._restoring = False
+        # Nodes whose data or adjacency changed since the last published view
+        self._view_dirty = set()
+        # Held by writers so that views are only published between batches
+        self.write_lock = threading.RLock()
         self._added_nodes = set()
         self._updated_nodes = set()
+        self._removed_nodes = set()
         self._added_edges = []
         self._updated_edges = []
+        self._removed_edges = []
+
+    def _reset_lemma_projection(self) -> None:
+        """
+        Start the lemma graph over; everything in the word graph is projected
+        again on the next ``sync_lemmas``.
+        """
+        self.lemma_graph = LemmaGraph()
+        # word -> (lemma, value) and sorted word pair -> (lemma pair, weight)
+        # as last projected, so they can be taken back out
+        self._lemma_of = {}
+        self._lemma_pairs = {}
+        # Words and sorted word pairs changed since the last sync
+        self._lemma_dirty_words = set(self.nodes)
+        self._lemma_dirty_pairs = {
+            (u, v) if u <= v else (v, u)
+            for u, v, data in self.edges(data=True)
+            if data.get("type") == "semantic"
+        }
+        # Lemmas and lemma pairs changed since the last diff, and since the
+        # last published view
+        self._changed_lemma_nodes = set()
+        self._changed_lemma_edges = set()
+        self._lemma_view_dirty = set()
+        self._lemmas_stale = False
+        return None
+
+    def _forget_changes(self) -> None:
+        """
+        Drop what changed since the last view and lemma sync, after a bulk
+        load nobody follows incrementally: the next view is published in
+        full and the next sync projects the whole graph again.
+        """
+        self._view = None
+        self._view_dirty = set()
+        self._lemma_dirty_words, self._lemma_dirty_pairs = set(), set()
+        self._lemmas_stale = True
+        return None
+
+    def __getstate__(self):
+        # The operation log holds an open file; it is reattached on recovery.
+        # Views are republished in full on first use.
+        state = self.__dict__.copy()
+        state["oplog"] = None
+        state["_op_depth"] = 0
+        state.pop("write_lock", None)
+        state.pop("_view", None)
+        state.pop("_view_stale", None)
+        state.pop("_view_wanted", None)
+        state["_view_dirty"] = set()
+        state["_lemma_view_dirty"] = set()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.write_lock = threading.RLock()
+        if "_lemma_of" not in state:
+            # Pickled before the lemma graph was a projection
+            self._reset_lemma_projection()
+        if "contextual" not in state:
+            self.contextual = False
+            self._context_counts = {}
+
+    @contextmanager
+    def writer(self):
+        """
+        Context for a batch of changes: writers are serialised, and a new view
+        is published for readers after the batch ends. Views are published
+        lazily, by the next ``snapshot``, so batches nobody reads cost
+        nothing; a batch only publishes itself when a reader is waiting.
+        """
+        with self.write_lock:
+            try:
+                yield self
+            finally:
+                if self._view_wanted:
+                    self.publish()
+                else:
+                    self._view_stale = True
+
+    def snapshot(self) -> GraphView:
+        """
+        The latest view, published now if a batch ended since the last one.
+        Never blocks while a writer is active, except to publish the very
+        first view: the reader gets the previous view instead, and the
+        running batch publishes when it ends.
+        """
+        view = self._view
+        if view is None or self._view_stale:
+            if self.write_lock.acquire(blocking=view is None):
+                try:
+                    if self._view is None or self._view_stale:
+                        self.publish()
+                    view = self._view
+                finally:
+                    self.write_lock.release()
+            else:
+                self._view_wanted = True
+        return view
+
+    def publish(self) -> GraphView:
+        """
+        Publish a view of the current state, sharing everything that did not
+        change with the previous view. Call with ``write_lock`` held.
+        """
+        self.sync_lemmas()
+        previous = self._view
+        if previous is None:
+            nodes, succ, pred = {}, {}, {}
+            lemma_nodes, lemma_edges = {}, {}
+            dirty = self.nodes
+            lemma_dirty = list(self.lemma_graph.nodes) + [
+                (u, v) if u <= v else (v, u) for u, v in self.lemma_graph.edges
+            ]
+        else:
+            nodes = dict(previous.nodes)
+            succ = dict(previous._succ)
+            pred = dict(previous._pred)
+            lemma_nodes = dict(previous.lemma_nodes)
+            lemma_edges = dict(previous.lemma_edges)
+            dirty = self._view_dirty
+            lemma_dirty = self._lemma_view_dirty
+        for node in dirty:
+            if not self.has_node(node):
+                nodes.pop(node, None)
+                succ.pop(node, None)
+                pred.pop(node, None)
+                continue
+            data = self.nodes[node]["data"]
+            nodes[node] = {"data": WordNodeData(data.word, data.value, data.lemmatized)}
+            succ[node] = tuple(
+                (v, key, dict(attributes))
+                for v, bundle in self._succ[node].items()
+                for key, attributes in bundle.items()
+            )
+            pred[node] = tuple(
+                (u, key, dict(attributes))
+                for u, bundle in self._pred[node].items()
+                for key, attributes in bundle.items()
+            )
+        for item in lemma_dirty:
+            if isinstance(item, tuple):
+                if self.lemma_graph.has_edge(*item):
+                    lemma_edges[item] = dict(self.lemma_graph.edges[item])
+                else:
+                    lemma_edges.pop(item, None)
+            elif self.lemma_graph.has_node(item):
+                data = self.lemma_graph.nodes[item]["data"]
+                lemma_nodes[item] = {
+                    "data": LemmaNodeData(data.lemma, data.count, data.value)
+                }
+            else:
+                lemma_nodes.pop(item, None)
+        self._view_dirty = set()
+        self._lemma_view_dirty = set()
+        self._view_stale = self._view_wanted = False
+        view = GraphView(
+            self.version,
+            self.time,
+            tuple(self.window),
+            nodes,
+            succ,
+            pred,
+            lemma_nodes,
+            lemma_edges,
+        )
+        self._view = view
+        return view
+
+    def _ensure_embeddings(self, words) -> None:
+        """
+        Batch-encode any of *words* missing from the embedding memo.
+        """
+        unique = dict.fromkeys(words)
+        to_encode = [w for w in unique if w not in self.embedding_memo]
+        metrics.count("embedding_cache_hits", len(unique) - len(to_encode))
+        if not to_encode:
+            return None
+        metrics.count("embedding_cache_misses", len(to_encode))
+        encoded = textUtils.encode_batch(to_encode)
+        if self.oplog is not None:
+            self.oplog.record_embeddings(encoded)
+        self.embedding_memo.update(encoded)
+        return None
+
+    def _encode_in_context(self, sentences: list[str]) -> None:
+        """
+        Fold the contextual vectors of the words of *sentences* into the
+        embedding memo as running means, so later lookups are cache hits.
+        Words the model cut off keep whatever the memo has, and are encoded
+        on their own when first linked. Deleting text does not take its
+        contexts back out of the means.
+        """
+        # word -> (contexts seen, running mean)
+        updated = {}
+        memo, counts = self.embedding_memo, self._context_counts
+        for words in textUtils.encode_in_context(sentences):
+            for word, vector in words:
+                if vector is None:
+                    continue
+                n, mean = updated.get(word) or (counts.get(word, 0), memo.get(word))
+                # A vector encoded out of context is replaced, not averaged
+                updated[word] = (n + 1, vector if n == 0 else mean + (vector - mean) / (n + 1))
+        if self.oplog is not None and updated:
+            self.oplog.record_contexts(updated)
+        for word, (n, mean) in updated.items():
+            memo[word] = mean
+            counts[word] = n
+        return None
+
+    def _lemmatize(self, word: str) -> list[str]:
+        lemmas = self.lemma_memo.get(word)
+        if lemmas is not None:
+            metrics.count("lemma_cache_hits")
+        else:
+            metrics.count("lemma_cache_misses")
+            lemmas = textUtils.lemmatize_text(word)
+            if self.oplog is not None:
+                self.oplog.record_lemmas(word, lemmas)
+            self.lemma_memo[word] = lemmas
+        return lemmas
+
+    def _log(self, name: str, *args) -> None:
+        """
+        Log a change to the attached operation log before it is applied.
+        *name* is the method that applies it again on recovery, with *args*
+        resolved so that replaying it needs no model and no similarity pass.
+        """
+        if self.oplog is not None:
+            self.oplog.record(name, args)
+        return None
 
+    def _set_journal(self, journal) -> None:
+        self._journal = journal
+        self.tokens.journal = None if journal is None else journal.sequence
+        return None
+
+    def _journal_touch(self):
+        """The open journal, if any; a change also discards the redo steps."""
+        journal = self._journal
+        if journal is not None and self._redo and not self._restoring:
+            self._redo = []
+        return journal
+
+    def add_node(self, node_for_adding, **attr):
+        self._view_dirty.add(node_for_adding)
+        self._lemma_dirty_words.add(node_for_adding)
+        journal = self._journal_touch()
+        if journal is not None:
+            journal.save_node(self, node_for_adding)
+        return super().add_node(node_for_adding, **attr)
+
+    def remove_node(self, n):
+        if self.has_node(n):
+            self._lemma_dirty_words.add(n)
+            for neighbour in set(self._succ[n]) | set(self._pred[n]):
+                self._mark_edge(n, neighbour)
+            self._view_dirty.add(n)
+        journal = self._journal_touch()
+        if journal is not None and self.has_node(n):
+            journal.save_node(self, n)
+            for u, v in list(self.out_edges(n)) + list(self.in_edges(n)):
+                journal.save_edges(self, u, v)
+        return super().remove_node(n)
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        self._mark_edge(u_for_edge, v_for_edge, attr.get("type"))
+        journal = self._journal_touch()
+        if journal is not None:
+            for node in (u_for_edge, v_for_edge):
+                journal.save_node(self, node)
+            journal.save_edges(self, u_for_edge, v_for_edge)
+        return super().add_edge(u_for_edge, v_for_edge, key, **attr)
+
+    def remove_edge(self, u, v, key=None):
+        edge_type = None
+        if key is not None and self.has_edge(u, v, key):
+            edge_type = self[u][v][key].get("type")
+        self._mark_edge(u, v, edge_type)
+        journal = self._journal_touch()
+        if journal is not None:
+            journal.save_edges(self, u, v)
+        return super().remove_edge(u, v, key)
+
+    def _set_edge_weight(self, u: str, v: str, key, weight: float) -> None:
+        self._mark_edge(u, v, self[u][v][key].get("type"))
+        journal = self._journal_touch()
+        if journal is not None:
+            journal.save_edges(self, u, v)
+        self[u][v][key]["weight"] = weight
+        return None
+
+    def _mark_edge(self, u: str, v: str, edge_type: str | None = None) -> None:
+        """
+        Flags a changed edge for the next view and, unless it is known not to
+        be semantic, for the lemma projection.
+        """
+        self._view_dirty.update((u, v))
+        if edge_type is None or edge_type == "semantic":
+            self._lemma_dirty_pairs.add((u, v) if u <= v else (v, u))
+        return None
+
+    def _touch_node(self, word: str) -> None:
+        self._view_dirty.add(word)
+        self._lemma_dirty_words.add(word)
+        journal = self._journal_touch()
+        if journal is not None:
+            journal.save_node(self, word)
+        return None
+
+    def _touch_token(self, token: Token) -> None:
+        journal = self._journal_touch()
+        if journal is not None:
+            journal.save_token(token)
+        return None
+
+    @_operation
+    def checkpoint(self, name: str | None = None) -> int:
+        """
+        Mark the current state so it can be rolled back to. Costs O(changes
+        since the previous checkpoint); only the newest ``max_checkpoints``
+        checkpoints are kept.
+        """
+        self._log("checkpoint", name)
+        checkpoint = Checkpoint(self._next_checkpoint, name, Journal(self))
+        self._next_checkpoint += 1
+        self._checkpoints.append(checkpoint)
+        if len(self._checkpoints) > self.max_checkpoints:
+            self._checkpoints.pop(0)
+        self._redo = []
+        self._set_journal(checkpoint.journal)
+        return checkpoint.id
+
+    def checkpoints(self) -> list[tuple[int, str | None]]:
+        return [(checkpoint.id, checkpoint.name) for checkpoint in self._checkpoints]
+
+    def _step_back(self) -> bool:
+        """
+        Undo back to the newest checkpoint, or to the one before it when there
+        are no changes since.
+        """
+        if not self._checkpoints:
+            return False
+        top = self._checkpoints[-1]
+        if top.journal:
+            undone, target = None, top
+        elif len(self._checkpoints) > 1:
+            undone = self._checkpoints.pop()
+            target = self._checkpoints[-1]
+        else:
+            return False
+        self._restoring = True
+        try:
+            redo = target.journal.apply(self)
+        finally:
+            self._restoring = False
+        self._redo.append((undone, redo))
+        target.journal = Journal(self)
+        self._set_journal(target.journal)
+        return True
+
+    @_operation
+    def undo(self) -> bool:
+        """
+        Roll back to the previous checkpoint. Returns False if there is
+        nothing to undo.
+        """
+        self._log("undo")
+        return self._step_back()
+
+    @_operation
+    def redo(self) -> bool:
+        """
+        Reapply the last undone step. Returns False if there is nothing to
+        redo; any change made after undoing discards the redo steps.
+        """
+        self._log("redo")
+        if not self._redo:
+            return False
+        undone, journal = self._redo.pop()
+        self._restoring = True
+        try:
+            self._checkpoints[-1].journal = journal.apply(self)
+        finally:
+            self._restoring = False
+        if undone is not None:
+            undone.journal = Journal(self)
+            self._checkpoints.append(undone)
+        self._set_journal(self._checkpoints[-1].journal)
+        return True
+
+    @_operation
+    def rollback(self, target: int | str) -> None:
+        """
+        Restore the state of the checkpoint with the given id or name. The
+        steps rolled back can be redone one at a time.
+        """
+        matches = [
+            checkpoint
+            for checkpoint in self._checkpoints
+            if checkpoint.id == target or checkpoint.name == target
+        ]
+        if not matches:
+            raise KeyError(f"Unknown checkpoint: {target!r}")
+        checkpoint = matches[-1]
+        self._log("rollback", checkpoint.id)
+        while self._checkpoints[-1] is not checkpoint or checkpoint.journal:
+            self._step_back()
+        return None
+
+    @_operation
     def warm_up(self):
         # Warm up the nodes
         self.add_word_node("buffer")
         self.minus_word_node("buffer")
         self.add_semantic_edge("test", "exam", 1.0)
-        self.remove_edge("test", "exam")
+        self._drop_edge("test", "exam", "semantic")
         self.minus_word_node("test")
         self.minus_word_node("exam")
 
+    @_operation
+    def clear_window(self):
+        self._log("clear_window")
+        self.window = []
+
     def get_window(self):
         return self.window.copy()
 
@@ -161,7 +1215,92 @@ class WordGraph(nx.MultiDiGraph):
         return self.time
 
     def get_lemma_graph(self):
-        return self.lemma_graph.copy()
+        """A read-only view of the up-to-date lemma graph."""
+        self.sync_lemmas()
+        return self.lemma_graph.copy(as_view=True)
+
+    def sync_lemmas(self) -> None:
+        """
+        Bring the lemma graph up to date with the words and semantic word pairs
+        changed since the last sync. The previous projection of each is taken
+        back out before the current one is added, so removals propagate, and
+        the lemmas of new lemma edges are embedded in one batch.
+        """
+        if self._lemmas_stale:
+            self._reset_lemma_projection()
+        words, pairs = self._lemma_dirty_words, self._lemma_dirty_pairs
+        if not words and not pairs:
+            return None
+        with metrics.stage("edges"):
+            self._sync_lemmas(words, pairs)
+        return None
+
+    def _sync_lemmas(self, words: set, pairs: set) -> None:
+        self._lemma_dirty_words, self._lemma_dirty_pairs = set(), set()
+        lemma_graph = self.lemma_graph
+        nodes, edges = set(), set()
+        # Pairs are released before their words so no edge outlives a lemma
+        for pair in pairs:
+            projected = self._lemma_pairs.pop(pair, None)
+            if projected is not None:
+                lemma_graph.release_pair(*projected[0], projected[1])
+                edges.add(projected[0])
+        for word in words:
+            # The new projection goes in first so that a lemma whose only word
+            # changed keeps its node and the edges of its untouched pairs
+            projected = self._lemma_of.pop(word, None)
+            if self.has_node(word):
+                data = self.nodes[word]["data"]
+                lemma = data.lemmatized[0] if data.lemmatized else word
+                self._lemma_of[word] = (lemma, data.value)
+                lemma_graph.project_word(lemma, data.value)
+                nodes.add(lemma)
+            if projected is not None:
+                lemma_graph.release_word(*projected)
+                nodes.add(projected[0])
+        projections = []
+        for pair in pairs:
+            weight = self._pair_weight(*pair)
+            if weight is None:
+                continue
+            lemma1, lemma2 = self._lemma_of[pair[0]][0], self._lemma_of[pair[1]][0]
+            # Words that share a lemma do not link it to itself
+            if lemma1 == lemma2:
+                continue
+            lemmas = (lemma1, lemma2) if lemma1 <= lemma2 else (lemma2, lemma1)
+            self._lemma_pairs[pair] = (lemmas, weight)
+            projections.append((lemmas, weight))
+        similarities = self._lemma_similarities(
+            [lemmas for lemmas, _ in projections if not lemma_graph.has_edge(*lemmas)]
+        )
+        for lemmas, weight in projections:
+            lemma_graph.project_pair(*lemmas, weight, similarities.get(lemmas))
+            edges.add(lemmas)
+        self._changed_lemma_nodes |= nodes
+        self._changed_lemma_edges |= edges
+        self._lemma_view_dirty |= nodes | edges
+        return None
+
+    def _pair_weight(self, word1: str, word2: str) -> float | None:
+        """Weight of the semantic edge between two words, in either direction."""
+        for u, v in ((word1, word2), (word2, word1)):
+            key = self._edge_key(u, v, "semantic")
+            if key is not None:
+                return float(self[u][v][key]["weight"])
+        return None
+
+    def _lemma_similarities(self, pairs: list[tuple[str, str]]) -> dict:
+        """Cosine similarity of each lemma pair, from one batch of embeddings."""
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return {}
+        self._ensure_embeddings([lemma for pair in pairs for lemma in pair])
+        first = np.stack([self.embedding_memo[lemma1] for lemma1, _ in pairs])
+        second = np.stack([self.embedding_memo[lemma2] for _, lemma2 in pairs])
+        similarities = np.sum(first * second, axis=1) / (
+            np.linalg.norm(first, axis=1) * np.linalg.norm(second, axis=1)
+        )
+        return dict(zip(pairs, similarities.tolist()))
 
     def get_sentence(self):
         return self.sentence.copy()
@@ -169,25 +1308,46 @@ class WordGraph(nx.MultiDiGraph):
     def get_paragraph(self):
         return self.paragraph.copy()
 
+    @_operation
     def add_word_node(self, word: str) -> None:
         """
         Adds a word to the graph or increments its value if it already exists.
         """
-        if self.has_node(word):
-            self.nodes[word]["data"] += 1
-            self._updated_nodes.add(word)
-        else:
-            node_data = WordNodeData(word, 1)
-            self.add_node(word, data=node_data)
-            self._added_nodes.add(word)
+        data = self.get_word_node_data(word)
+        self._set_count(word, 1 if data is None else data.get_value() + 1)
         return None
 
+    @_operation
     def minus_word_node(self, word: str) -> None:
-        if self.has_node(word):
-            self.nodes[word]["data"] -= 1
-        if self.nodes[word]["data"].get_value() == 0:
-            # Node removal is not tracked in this diff implementation
-            self.remove_node(word)
+        if not self.has_node(word):
+            return None
+        self._set_count(word, self.nodes[word]["data"].get_value() - 1)
+        return None
+
+    def _set_count(self, word: str, value: int) -> None:
+        """
+        Sets a word's value; the node is added with its first occurrence and
+        removed with its last.
+        """
+        if not self.has_node(word):
+            if value <= 0:
+                return None
+            node_data = WordNodeData(word, value, self._lemmatize(word))
+            self._log("_set_count", word, value)
+            self.add_node(word, data=node_data)
+            self._added_nodes.add(word)
+        else:
+            self._log("_set_count", word, value)
+            self._touch_node(word)
+            if value <= 0:
+                self.remove_node(word)
+                self._added_nodes.discard(word)
+                self._updated_nodes.discard(word)
+                self._removed_nodes.add(word)
+            else:
+                self.nodes[word]["data"].set_value(value)
+                self._updated_nodes.add(word)
+        self.version += 1
         return None
 
     def get_word_node_data(self, word: str) -> None:
@@ -198,6 +1358,17 @@ class WordGraph(nx.MultiDiGraph):
             return self.nodes[word]["data"]
         return None
 
+    def _edge_key(self, u_of_edge: str, v_of_edge: str, edge_type: str):
+        """
+        Return the key of the edge of a given type between two nodes, or None.
+        """
+        if not self.has_edge(u_of_edge, v_of_edge):
+            return None
+        for key, edge_data in self[u_of_edge][v_of_edge].items():
+            if edge_data.get("type") == edge_type:
+                return key
+        return None
+
     def _has_edge_with_type(self, u_of_edge: str, v_of_edge: str, edge_type: str):
         """
         Check if an edge with a specific type exists between two nodes.
@@ -211,12 +1382,12 @@ class WordGraph(nx.MultiDiGraph):
                 return True
         return False
 
+    @_operation
     def add_semantic_edge(
         self,
         word1: str,
         word2: str,
         weight: float,
-        lemma_update: bool = True,
     ) -> None:
         """
         Adds a semantic edge between two words.
@@ -234,51 +1405,18 @@ class WordGraph(nx.MultiDiGraph):
         # Edge forms a loop, going both ways
         if weight < self.semantic_threshold:
             return
-
-        if self._has_edge_with_type(word1, word2, "semantic"):
-            self.update_semantic_edge(word1, word2, weight)
-        else:
-            edge_key = self.add_edge(
-                word1, word2, weight=weight, creation=self.time, type="semantic"
-            )
-            self._added_edges.append((word1, word2, edge_key))
-
-        if self._has_edge_with_type(word2, word1, "semantic"):
-            self.update_semantic_edge(word2, word1, weight)
-        else:
-            edge_key = self.add_edge(
-                word2, word1, weight=weight, creation=self.time, type="semantic"
-            )
-            self._added_edges.append((word2, word1, edge_key))
-
-        if lemma_update:
-            lemma1 = textUtils.lemmatize_text(word1)[0]
-            lemma2 = textUtils.lemmatize_text(word2)[0]
-            if lemma1 not in self.embedding_memo:
-                self.embedding_memo[lemma1] = textUtils.encode_text(lemma1)
-            if lemma2 not in self.embedding_memo:
-                self.embedding_memo[lemma2] = textUtils.encode_text(lemma2)
-            lemma_weight = textUtils.cosine_similarity(
-                self.embedding_memo[lemma1], self.embedding_memo[lemma2]
-            )
-            self.lemma_graph.add_lemma_edge(lemma1, lemma2, weight=lemma_weight)
+        self._put_edge(word1, word2, "semantic", weight)
+        self._put_edge(word2, word1, "semantic", weight)
         return None
 
+    @_operation
     def update_semantic_edge(self, word1: str, word2: str, weight: float):
-        if self._has_edge_with_type(word1, word2, "semantic"):
-            # In a multigraph, we need to find the key of the semantic edge
-            key_to_update = None
-            for key, data in self[word1][word2].items():
-                if data.get('type') == 'semantic':
-                    key_to_update = key
-                    break
-            if key_to_update is not None:
-                self[word1][word2][key_to_update]["weight"] = weight
-                self._updated_edges.append((word1, word2, key_to_update))
-        else:
+        if not self._has_edge_with_type(word1, word2, "semantic"):
             raise ValueError(f"Semantic edge does not exist between {word1} and {word2}")
+        self._put_edge(word1, word2, "semantic", weight)
         return None
 
+    @_operation
     def add_temporal_edge(self, word1: str, word2: str, weight: float = 1.0):
         """
         Adds a temporal edge between two words.
@@ -287,33 +1425,45 @@ class WordGraph(nx.MultiDiGraph):
             self.add_word_node(word1)
         if not self.has_node(word2):
             self.add_word_node(word2)
-        if self._has_edge_with_type(word1, word2, "temporal"):
-            # If edge exists, update it only if the new weight is higher
-            edge_data = None
-            for key, data in self[word1][word2].items():
-                if data.get('type') == 'temporal':
-                    edge_data = data
-                    break
-            if edge_data and edge_data["weight"] < weight:
-                self.update_temporal_edge(word1, word2, weight=weight)
-            return None
-        
-        edge_key = self.add_edge(word1, word2, type="temporal", creation=self.time, weight=weight)
-        self._added_edges.append((word1, word2, edge_key))
+        key = self._edge_key(word1, word2, "temporal")
+        # If edge exists, update it only if the new weight is higher
+        if key is None or self[word1][word2][key]["weight"] < weight:
+            self._put_edge(word1, word2, "temporal", weight)
         return None
 
+    @_operation
     def update_temporal_edge(self, word1: str, word2: str, weight: float):
-        if self._has_edge_with_type(word1, word2, "temporal"):
-            key_to_update = None
-            for key, data in self[word1][word2].items():
-                if data.get('type') == 'temporal':
-                    key_to_update = key
-                    break
-            if key_to_update is not None:
-                self[word1][word2][key_to_update]["weight"] = weight
-                self._updated_edges.append((word1, word2, key_to_update))
-        else:
+        if not self._has_edge_with_type(word1, word2, "temporal"):
             raise ValueError(f"Temporal edge does not exist between {word1} and {word2}")
+        self._put_edge(word1, word2, "temporal", weight)
+        return None
+
+    def _put_edge(self, u: str, v: str, edge_type: str, weight: float) -> None:
+        """
+        Adds the edge of a type from *u* to *v*, or sets its weight if there
+        is one.
+        """
+        weight = float(weight)
+        self._log("_put_edge", u, v, edge_type, weight)
+        key = self._edge_key(u, v, edge_type)
+        if key is None:
+            key = self.add_edge(u, v, weight=weight, creation=self.time, type=edge_type)
+            self._added_edges.append((u, v, key))
+        else:
+            self._set_edge_weight(u, v, key, weight)
+            self._updated_edges.append((u, v, key))
+        self.version += 1
+        return None
+
+    def _drop_edge(self, u: str, v: str, edge_type: str) -> None:
+        """Removes the edge of a type from *u* to *v*, if there is one."""
+        key = self._edge_key(u, v, edge_type)
+        if key is None:
+            return None
+        self._log("_drop_edge", u, v, edge_type)
+        self.remove_edge(u, v, key)
+        self._removed_edges.append((u, v, key))
+        self.version += 1
         return None
 
     def in_out_edges(self, word: str, mode: str = "all"):
@@ -329,10 +1479,12 @@ class WordGraph(nx.MultiDiGraph):
             result["out"] = [x for x in self.out_edges(word, keys=True) if self.get_edge_data(x[0], x[1], x[2]).get("type") == "semantic"]
         return result
 
+    @_operation
     def tick(self):
         """
         Ticks the graph forward by one time unit.
         """
+        self._log("tick")
         self.time += 1
         return None
 
@@ -342,17 +1494,30 @@ class WordGraph(nx.MultiDiGraph):
         yield_frames: bool = False,
         frame_step: int = 1,
         reset_window: bool = False,
+        copy_frames: bool = True,
     ):
         """
         Adds text to the graph.
         If yield_frames is True, this method is a generator that yields graph states.
         If yield_frames is False, this method runs to completion.
+        If copy_frames is False, the live graph is yielded instead of a copy, so a
+        consumer can read (and clear) the diff accumulated since the last frame.
+        With contextual embeddings, every sentence of the text is encoded once
+        up front and its words' vectors are folded into the embedding memo.
         """
         text_info = textUtils.extract_all_text_info(text)
         words = text_info["words"]
         ending_word_indices = text_info["sentence_ending_words"]
+        if self.contextual:
+            self._encode_in_context(text_info["sentences"])
         gen = self._graphUpdate(
-            words, ending_word_indices, yield_frames, frame_step, reset_window
+            words,
+            ending_word_indices,
+            yield_frames,
+            frame_step,
+            reset_window,
+            paragraph_ending_indices=text_info["paragraph_ending_words"],
+            copy_frames=copy_frames,
         )
         if yield_frames:
             return gen
@@ -370,6 +1535,8 @@ class WordGraph(nx.MultiDiGraph):
     ):
         """
         Deletes text from the graph.
+        The most recent occurrence of the text is removed from the document and
+        only the edges it contributed are undone.
         If yield_frames is True, this method is a generator that yields graph states.
         If yield_frames is False, this method runs to completion.
         """
@@ -384,6 +1551,391 @@ class WordGraph(nx.MultiDiGraph):
                 pass
             return None
 
+    def append_word(
+        self, word: str, ends_sentence: bool = False, ends_paragraph: bool = False
+    ) -> dict:
+        """
+        Fast path for live typing: adds a single, already tokenised word without
+        running it through ``extract_all_text_info``.
+        Returns the diff produced by this word only; the graph's pending diff
+        still accumulates it for the next ``jsonify_diff``.
+        """
+        word = word.strip().lower()
+        pending = (
+            self._added_nodes,
+            self._updated_nodes,
+            self._removed_nodes,
+            self._added_edges,
+            self._updated_edges,
+            self._removed_edges,
+            self._changed_lemma_nodes,
+            self._changed_lemma_edges,
+        )
+        self.clear_diff()
+        if word:
+            self._ingest_word(
+                word, ends_sentence=ends_sentence, ends_paragraph=ends_paragraph
+            )
+        diff = self._diff_payload()
+        self._added_nodes = (pending[0] - self._removed_nodes) | self._added_nodes
+        self._updated_nodes = (pending[1] - self._removed_nodes) | self._updated_nodes
+        self._removed_nodes = pending[2] | self._removed_nodes
+        self._added_edges = pending[3] + self._added_edges
+        self._updated_edges = pending[4] + self._updated_edges
+        self._removed_edges = pending[5] + self._removed_edges
+        self._changed_lemma_nodes = pending[6] | self._changed_lemma_nodes
+        self._changed_lemma_edges = pending[7] | self._changed_lemma_edges
+        return diff
+
+    @_operation
+    def _ingest_word(
+        self, word: str, ends_sentence: bool = False, ends_paragraph: bool = False
+    ) -> None:
+        """
+        Appends one token to the document, slides the text window forward and
+        links the token to everything still in the window.
+        """
+        if not metrics.active():
+            return self._ingest(word, ends_sentence, ends_paragraph)
+        added, updated = len(self._added_edges), len(self._updated_edges)
+        with metrics.stage("edges"):
+            self._ingest(word, ends_sentence, ends_paragraph)
+        metrics.count("words_ingested")
+        metrics.count("edges_added", len(self._added_edges) - added)
+        metrics.count("edges_updated", len(self._updated_edges) - updated)
+        return None
+
+    def _ingest(self, word: str, ends_sentence: bool, ends_paragraph: bool) -> None:
+        token = self._append_token(word, ends_sentence, ends_paragraph)
+        self.tick()
+        position = len(self.tokens) - 1
+        # The window is always the tail of the token sequence
+        self._link_token(token, self.tokens.tail(len(self.window))[:-1], position)
+        if ends_paragraph:
+            self.semantic_update("paragraph")
+        elif ends_sentence:
+            self.semantic_update("sentence")
+            # A singleton sentence stays open, so only record real closures
+            if self.sentence:
+                self._set_token(position, False, token.linked, token=token)
+        return None
+
+    def _append_token(self, word: str, ends_sentence: bool, ends_paragraph: bool) -> Token:
+        """
+        Appends an occurrence to the document; the window, open sentence and
+        paragraph move forward with it.
+        """
+        self._log("_append_token", word, ends_sentence, ends_paragraph)
+        token = Token(word, ends_sentence=ends_sentence, ends_paragraph=ends_paragraph)
+        self.tokens.append(token)
+        self.window.append(word)
+        self.sentence.append(word)
+        self.paragraph.append(word)
+
+        if len(self.window) > self.text_window_size:
+            self.window.pop(0)
+        return token
+
+    def _insert_token(self, position: int, word: str, ends_sentence: bool) -> Token:
+        """Inserts an occurrence into the document at *position*."""
+        self._log("_insert_token", position, word, ends_sentence)
+        token = Token(word, ends_sentence=ends_sentence)
+        self.tokens.insert(position, [token])
+        return token
+
+    def _set_token(
+        self, position: int, ends_sentence: bool, linked: bool, token: Token | None = None
+    ) -> None:
+        """
+        Sets the flags of the occurrence at *position*; callers holding it
+        pass it as *token* to skip the lookup.
+        """
+        self._log("_set_token", position, ends_sentence, linked)
+        if token is None:
+            token = self.tokens[position]
+        self._touch_token(token)
+        token.ends_sentence = ends_sentence
+        token.linked = linked
+        return None
+
+    def _link_token(self, token: Token, preceding: list[Token], position: int) -> None:
+        """
+        Counts the token's word and adds its semantic and temporal edges to the
+        *preceding* tokens, recording them as contributions of each pair. The
+        token is at *position* in the document, right after *preceding*.
+        """
+        word = token.word
+        self.add_word_node(word)
+        n = len(preceding)
+        linked = range(n)
+        if self.gate is not None:
+            if not self.gate.links(word, self.nodes[word]["data"].get_value(), len(self.tokens)):
+                self._set_token(position, token.ends_sentence, False, token=token)
+                metrics.count("occurrences_gated")
+                return None
+            linked = [i for i in linked if getattr(preceding[i], "linked", True)]
+        # Batch-encode any new tokens (current word + preceding window tokens)
+        self._ensure_embeddings([word] + [preceding[i].word for i in linked])
+        if linked:
+            # One vectorised similarity pass over the window instead of n calls
+            semantic_weights = textUtils.cosine_similarities(
+                self.embedding_memo[word],
+                np.stack([self.embedding_memo[preceding[i].word] for i in linked]),
+            )
+        for j, i in enumerate(linked):
+            prev = preceding[i]
+            # Gated tokens leave gaps, but weights still follow window distance
+            temporal_weight = sigmoid((n - i) / n)
+            self.add_semantic_edge(prev.word, word, weight=semantic_weights[j])
+            self.add_temporal_edge(prev.word, word, weight=temporal_weight)
+            edges = self._semantic_contribution(prev.word, word, semantic_weights[j])
+            edges.append((prev.word, word, "temporal", temporal_weight))
+            self._contribute((position - n + i, position), edges, tokens=(prev, token))
+        return None
+
+    def _semantic_contribution(self, word1: str, word2: str, weight: float):
+        """
+        The edge entries ``add_semantic_edge`` creates for a pair of words.
+        """
+        if word1 == word2 or weight < self.semantic_threshold:
+            return []
+        return [(word1, word2, "semantic", weight), (word2, word1, "semantic", weight)]
+
+    def _contribute(self, owners: tuple, edges: list[tuple], tokens=None) -> None:
+        """
+        Records *edges* as the contribution of the occurrences *owners* point
+        at: positions in the document, or words of the paragraph vocabulary
+        for the occurrence that brought them in. Callers holding the tokens
+        pass them as *tokens* to skip the lookup.
+        """
+        if not edges:
+            return None
+        edges = [(u, v, edge_type, float(weight)) for u, v, edge_type, weight in edges]
+        self._log("_contribute", owners, edges)
+        if tokens is None:
+            tokens = [
+                self.tokens[owner] if isinstance(owner, int) else self._paragraph_vocab[owner]
+                for owner in owners
+            ]
+        journal = self._journal_touch()
+        for u, v, edge_type, weight in edges:
+            if journal is not None:
+                journal.save_refs(self, (u, v, edge_type))
+            refs = self._edge_refs.setdefault((u, v, edge_type), Counter())
+            refs[weight] += 1
+        contribution = EdgeContribution(edges)
+        for token in tokens:
+            if journal is not None:
+                journal.save_token(token)
+            token.contributions.append(contribution)
+        return None
+
+    def _delete_tokens(self, start: int, end: int) -> tuple[list[Token], list[tuple]]:
+        """
+        Takes the occurrences in positions [start, end) out of the document,
+        along with every reference their contributions hold on edge weights,
+        and brings the window and open containers up to date. Returns the
+        removed tokens and the (u, v, type) of the edges that lost references.
+        """
+        self._log("_delete_tokens", start, end)
+        old_length = len(self.tokens)
+        removed = self.tokens.delete(start, end)
+        journal = self._journal_touch()
+        released = {}
+        for token in removed:
+            if journal is not None:
+                journal.save_token(token)
+            for contribution in token.contributions:
+                if not contribution.active:
+                    continue
+                if journal is not None:
+                    journal.save_contribution(contribution)
+                contribution.active = False
+                for u, v, edge_type, weight in contribution.edges:
+                    key = (u, v, edge_type)
+                    refs = self._edge_refs.get(key)
+                    if refs is None:
+                        continue
+                    if journal is not None:
+                        journal.save_refs(self, key)
+                    refs[weight] -= 1
+                    if refs[weight] <= 0:
+                        del refs[weight]
+                    if not refs:
+                        del self._edge_refs[key]
+                    released[key] = None
+            token.contributions = []
+        if removed:
+            self._update_tail_context(max(start, 0), removed, old_length)
+        return removed, list(released)
+
+    def _settle_edge(self, u: str, v: str, edge_type: str) -> None:
+        """
+        Brings an edge in line with the references left on it: the edge goes
+        away with its last reference and otherwise falls back to the strongest
+        remaining weight.
+        """
+        key = self._edge_key(u, v, edge_type)
+        if key is None:
+            return None
+        refs = self._edge_refs.get((u, v, edge_type))
+        if not refs:
+            self._drop_edge(u, v, edge_type)
+        elif self[u][v][key]["weight"] != max(refs):
+            self._put_edge(u, v, edge_type, max(refs))
+        return None
+
+    @_operation
+    def delete_span(self, start: int, end: int) -> None:
+        """
+        Deletes the token occurrences in positions [start, end) of the document,
+        undoing exactly their contribution to the graph. Runs in time
+        proportional to the span (plus the window when the span touches it).
+        """
+        removed, released = self._delete_tokens(start, end)
+        dropped = len(self._removed_edges)
+        with metrics.stage("edges"):
+            for u, v, edge_type in released:
+                self._settle_edge(u, v, edge_type)
+            for token in removed:
+                self.minus_word_node(token.word)
+        metrics.count("edges_removed", len(self._removed_edges) - dropped)
+        return None
+
+    @_operation
+    def replace_span(self, start: int, end: int, text: str) -> None:
+        """
+        Replaces the tokens in positions [start, end) with the tokens of *text*.
+        At the end of the document this is a regular append. In the middle, the
+        new tokens link to the window before them; tokens after the span keep
+        their existing edges.
+        """
+        at_tail = end >= len(self.tokens)
+        self.delete_span(start, end)
+        if at_tail:
+            self.add_text(text)
+            return None
+        text_info = textUtils.extract_all_text_info(text)
+        self.insert_words(start, text_info["words"], text_info["sentence_ending_words"])
+        return None
+
+    @_operation
+    def insert_words(self, position: int, words: list[str], ending_words=()) -> None:
+        """
+        Inserts already tokenised *words* before the token at *position*, as
+        ``replace_span`` inserts the words of its text; *ending_words* are the
+        indices of the words that end a sentence. At the end of the document
+        the words are appended.
+        """
+        ending_words = set(ending_words)
+        position = max(position, 0)
+        if position >= len(self.tokens):
+            for i, word in enumerate(words):
+                self._ingest_word(word, ends_sentence=i in ending_words)
+            return None
+        start = position
+        # Where the window and open paragraph began before the insert
+        reach = len(self.tokens) - max(len(self.window), len(self.paragraph))
+        paragraph_start = len(self.tokens) - len(self.paragraph)
+        for i, word in enumerate(words):
+            preceding = self.tokens.slice(
+                position - (self.text_window_size - 1), position
+            )
+            token = self._insert_token(position, word, i in ending_words)
+            self.tick()
+            self._link_token(token, preceding, position)
+            position += 1
+        if position > start and start >= reach:
+            # Only the window reaches back before the paragraph
+            self._resync_tail_context(paragraph_start if start >= paragraph_start else None)
+        return None
+
+    def _resync_tail_context(self, paragraph_start: int | None) -> None:
+        """
+        Recomputes the window after an insert that reached it, and the open
+        sentence and paragraph as well when the paragraph starting at
+        *paragraph_start* was reached; None leaves them be.
+        """
+        self._log("_resync_tail_context", paragraph_start)
+        if paragraph_start is None:
+            self._rebuild_window()
+        else:
+            self._rebuild_tail_context(paragraph_start)
+        return None
+
+    def _update_tail_context(self, start: int, removed: list[Token], old_length: int) -> None:
+        """
+        Brings the window, open sentence and paragraph up to date after the
+        tokens *removed* from position *start* on. They are suffixes of the
+        document, so their starts follow from their lengths, and a deletion
+        at the end of the document only revisits the sentences it reopens.
+        """
+        end = start + len(removed)
+        paragraph_start = old_length - len(self.paragraph)
+        sentence_start = old_length - len(self.sentence)
+        if end < paragraph_start:
+            # The paragraph and the token that opened it are untouched
+            if end > old_length - len(self.window):
+                self._rebuild_window()
+        elif start >= sentence_start:
+            del self.sentence[start - sentence_start : end - sentence_start]
+            del self.paragraph[start - paragraph_start : end - paragraph_start]
+            self._rebuild_window()
+        elif start >= paragraph_start and end == old_length:
+            # Backspacing over a sentence end reopens the sentence it closed;
+            # what the deleted and reopened words brought to the paragraph
+            # vocabulary was its first occurrence, so it goes
+            reopened = []
+            for token in reversed(self.tokens):
+                if len(reopened) == start - paragraph_start or token.ends_sentence:
+                    break
+                reopened.append(token)
+            reopened.reverse()
+            vocab = self._paragraph_vocab
+            for token in reopened + removed:
+                if vocab.get(token.word) is token:
+                    del vocab[token.word]
+            del self.paragraph[start - paragraph_start :]
+            self.sentence = [token.word for token in reopened]
+            self._rebuild_window()
+        elif start >= paragraph_start:
+            self._rebuild_tail_context(paragraph_start)
+        else:
+            # The paragraph lost its start or the break before it
+            self._rebuild_tail_context()
+        return None
+
+    def _rebuild_window(self) -> None:
+        self.window = [
+            token.word for token in self.tokens.tail(self.text_window_size)
+        ]
+        return None
+
+    def _rebuild_tail_context(self, paragraph_start: int | None = None) -> None:
+        """
+        Recomputes the window, open sentence and paragraph from the end of the
+        document. The paragraph starts at *paragraph_start* when it is known
+        and is otherwise found by walking back to the last paragraph break.
+        """
+        self._rebuild_window()
+        if paragraph_start is None:
+            paragraph_start = len(self.tokens)
+            for token in reversed(self.tokens):
+                if token.ends_paragraph:
+                    break
+                paragraph_start -= 1
+        paragraph = self.tokens.slice(paragraph_start, len(self.tokens))
+        sentence_start = len(paragraph)
+        while sentence_start > 0 and not paragraph[sentence_start - 1].ends_sentence:
+            sentence_start -= 1
+        merged = paragraph[:sentence_start]
+        self.paragraph = [token.word for token in paragraph]
+        self.sentence = self.paragraph[sentence_start:]
+        self._paragraph_vocab = {}
+        for i in self._linked_positions(self.paragraph[:sentence_start], merged):
+            self._paragraph_vocab.setdefault(merged[i].word, merged[i])
+        return None
+
     def _graphUpdate(
         self,
         words: list[str],
@@ -391,104 +1943,219 @@ class WordGraph(nx.MultiDiGraph):
         yield_frames: bool = False,
         frame_step: int = 1,
         reset_window: bool = False,
-        mode: str = "add"
+        mode: str = "add",
+        paragraph_ending_indices: list[int] | None = None,
+        copy_frames: bool = True,
     ):
         if mode == "add":
             if reset_window:
-                self.window = []
+                self.clear_window()
             if yield_frames:
-                yield self.copy()  # Yield the initial empty graph
+                yield self.copy() if copy_frames else self  # Yield the initial graph
             step = 0
             current_index = 0
             for word in words:
                 step += 1
-                self.add_word_node(word)
-                self.window.append(word)
-                self.sentence.append(word)
-
-                if len(self.window) > self.text_window_size:
-                    self.window.pop(0)
-                self.tick()
-                # Batch-encode any new tokens (current word + existing window tokens)
-                to_encode = [
-                    tok for tok in [word] + self.window if tok not in self.embedding_memo
-                ]
-                if to_encode:
-                    self.embedding_memo.update(textUtils.encode_batch(to_encode))
-                n = len(self.window) - 1
-                for i in range(n):
-                    prev = self.window[i]
-                    semantic_weight = textUtils.cosine_similarity(
-                        self.embedding_memo[prev], self.embedding_memo[word]
-                    )
-                    temporal_weight = sigmoid((n - i) / n)
-                    self.add_semantic_edge(prev, word, weight=semantic_weight)
-                    self.add_temporal_edge(prev, word, weight=temporal_weight)
-                if ending_word_indices and current_index == ending_word_indices[0]:
-                    self.semantic_update("sentence")
+                ends_sentence = bool(
+                    ending_word_indices and current_index == ending_word_indices[0]
+                )
+                if ends_sentence:
                     ending_word_indices.pop(0)
+                ends_paragraph = bool(
+                    paragraph_ending_indices
+                    and current_index == paragraph_ending_indices[0]
+                )
+                if ends_paragraph:
+                    paragraph_ending_indices.pop(0)
+                self._ingest_word(
+                    word, ends_sentence=ends_sentence, ends_paragraph=ends_paragraph
+                )
                 if yield_frames and step % frame_step == 0:
-                    yield self.copy()  # Yield a copy of the graph at each frame step
+                    # Yield the graph at each frame step
+                    yield self.copy() if copy_frames else self
                 current_index += 1
         elif mode == "delete":
-            for word in words:
-                if word not in self.nodes():
-                    continue
-                edges = self.in_out_edges(word, mode="temporal")
-                for edge in edges["in"] + edges["out"]:
-                    try:
-                        self.remove_edge(edge[0], edge[1], edge[2])
-                    except nx.NetworkXError:
-                        pass
-                self.minus_word_node(word)
-                try:
-                    self.window.remove(word)
-                except ValueError:
-                    pass
-                try:
-                    self.sentence.remove(word)
-                except ValueError:
-                    pass
-                try:
-                    self.paragraph.remove(word)
-                except ValueError:
-                    pass
-                if yield_frames:
-                    yield self.copy()
-
+            # Prefer the most recent contiguous occurrence of the whole text,
+            # falling back to the most recent occurrence of each word.
+            start = self.tokens.rfind(words)
+            if start >= 0:
+                positions = list(range(start + len(words) - 1, start - 1, -1))
+                for position in positions:
+                    self.delete_span(position, position + 1)
+                    if yield_frames:
+                        yield self.copy()
+            else:
+                for word in words:
+                    position = self.tokens.rfind([word])
+                    if position < 0:
+                        continue
+                    self.delete_span(position, position + 1)
+                    if yield_frames:
+                        yield self.copy()
+
+    @_operation
     def semantic_update(self, mode: str):
-        """Create semantic edges between **all** tokens currently stored in
+        """Create semantic edges between the tokens currently stored in
         ``self.sentence`` or ``self.paragraph``
 
         This is a lightweight helper that can be called after you finish
-        collecting a sentence or paragraph in a live-streaming scenario.  It
-        performs three steps:
+        collecting a sentence or paragraph in a live-streaming scenario.
+        Sentence mode links every pair in the sentence and then merges it into
+        the paragraph. Paragraph mode closes the open sentence, merges what is
+        left and starts a new paragraph; earlier sentences were already linked
+        as they closed, so closing a paragraph is never a quadratic pass.
         """
         if mode not in ("sentence", "paragraph"):
             raise ValueError("Mode must be 'sentence' or 'paragraph'")
 
-        tokens = self.sentence if mode == "sentence" else self.paragraph
+        if mode == "paragraph":
+            self.semantic_update("sentence")
+            # A singleton sentence is left open by the sentence pass
+            if self.sentence:
+                self._merge_into_paragraph(
+                    self.sentence, self._tail_occurrences(self.sentence)
+                )
+            self._close_paragraph()
+            return
+
+        tokens = self.sentence
         # Nothing to do for a singleton or empty container.
         if len(tokens) < 2:
             return
 
+        # The container is a suffix of the document; attribute each pair's
+        # edges to its occurrences, and to the token that closed the container,
+        # when the two still line up.
+        occurrences = self._tail_occurrences(tokens)
+        linked = self._linked_positions(tokens, occurrences)
+        base = len(self.tokens) - len(tokens)
+
         # Batch-encode any unseen tokens to minimise model calls.
-        to_encode = [tok for tok in tokens if tok not in self.embedding_memo]
-        if to_encode:
-            self.embedding_memo.update(textUtils.encode_batch(to_encode))
+        self._ensure_embeddings([tokens[i] for i in linked])
 
         # Add semantic edges between each unique unordered pair.
-        for i in range(len(tokens)):
-            for j in range(i + 1, len(tokens)):
+        for a, i in enumerate(linked):
+            for j in linked[a + 1 :]:
                 w1, w2 = tokens[i], tokens[j]
                 weight = textUtils.cosine_similarity(
                     self.embedding_memo[w1], self.embedding_memo[w2]
                 )
                 self.add_semantic_edge(w1, w2, weight=weight)
+                if occurrences is not None:
+                    self._contribute(
+                        (base + i, base + j, base + len(tokens) - 1),
+                        self._semantic_contribution(w1, w2, weight),
+                        tokens=(occurrences[i], occurrences[j], occurrences[-1]),
+                    )
+
+        self._merge_into_paragraph(tokens, occurrences)
+        self._clear_sentence()
+
+    def _clear_sentence(self) -> None:
+        """Closes the open sentence; its words stay in the paragraph."""
+        self._log("_clear_sentence")
+        self.sentence = []
+        return None
+
+    def _close_paragraph(self) -> None:
+        """Closes the open sentence and paragraph."""
+        self._log("_close_paragraph")
+        self.sentence = []
+        self.paragraph = []
+        self._paragraph_vocab = {}
+        return None
+
+    def _linked_positions(self, words: list[str], occurrences: list[Token] | None):
+        """
+        Positions in a container of the occurrences that create edges. When
+        the occurrences are unknown, words are judged by their current counts.
+        """
+        if self.gate is None:
+            return list(range(len(words)))
+        if occurrences is not None:
+            return [i for i, token in enumerate(occurrences) if getattr(token, "linked", True)]
+        total = len(self.tokens)
+        return [
+            i
+            for i, word in enumerate(words)
+            if not self.has_node(word)
+            or not self.gate.saturated(word, self.nodes[word]["data"].get_value(), total)
+        ]
+
+    def _tail_occurrences(self, words: list[str]):
+        """
+        The token occurrences behind a suffix container such as the sentence,
+        or None if the container no longer lines up with the document.
+        """
+        occurrences = self.tokens.tail(len(words))
+        if [token.word for token in occurrences] != words:
+            return None
+        return occurrences
+
+    def _merge_into_paragraph(
+        self, words: list[str], occurrences: list[Token] | None
+    ) -> None:
+        """
+        Links a finished sentence to the paragraph's running vocabulary.
+        Only words new to the paragraph are compared, against the distinct
+        words seen so far, in one matrix product.
+        """
+        # Words new to the paragraph, and where they are in the sentence
+        new_words = {}
+        for i in self._linked_positions(words, occurrences):
+            word = words[i]
+            if word not in self._paragraph_vocab and word not in new_words:
+                new_words[word] = i
+        if not new_words:
+            return None
+        base = len(self.tokens) - len(words)
+        vocab = list(self._paragraph_vocab)
+        if vocab:
+            self._ensure_embeddings(list(new_words) + vocab)
+            new_matrix = np.stack([self.embedding_memo[w] for w in new_words])
+            vocab_matrix = np.stack([self.embedding_memo[w] for w in vocab])
+            new_matrix = new_matrix / np.linalg.norm(new_matrix, axis=1, keepdims=True)
+            vocab_matrix = vocab_matrix / np.linalg.norm(
+                vocab_matrix, axis=1, keepdims=True
+            )
+            weights = new_matrix @ vocab_matrix.T
+            for a, w1 in enumerate(new_words):
+                for b, w2 in enumerate(vocab):
+                    weight = weights[a, b]
+                    if weight < self.semantic_threshold:
+                        continue
+                    self.add_semantic_edge(w1, w2, weight=weight)
+                    if occurrences is None or self._paragraph_vocab[w2] is None:
+                        continue
+                    # The vocabulary word stands for the occurrence it came with
+                    i = new_words[w1]
+                    self._contribute(
+                        (base + i, w2, base + len(words) - 1),
+                        self._semantic_contribution(w1, w2, weight),
+                        tokens=(occurrences[i], self._paragraph_vocab[w2], occurrences[-1]),
+                    )
+        self._extend_vocab(
+            tuple(
+                (word, None if occurrences is None else base + i)
+                for word, i in new_words.items()
+            ),
+            tokens=[None if occurrences is None else occurrences[i] for i in new_words.values()],
+        )
+        return None
+
+    def _extend_vocab(self, entries: tuple, tokens=None) -> None:
+        """
+        Adds ``(word, position)`` entries to the paragraph vocabulary, each
+        word standing for the occurrence at its position, or for none when it
+        is None. Callers holding the tokens pass them as *tokens*.
+        """
+        self._log("_extend_vocab", entries)
+        if tokens is None:
+            tokens = [None if position is None else self.tokens[position] for _, position in entries]
+        for (word, _), token in zip(entries, tokens):
+            self._paragraph_vocab[word] = token
+        return None
 
-        # Optionally clear the lists here after processing – leave to caller.
-        self.sentence = [] if mode == "sentence" else self.sentence
-        self.paragraph = [] if mode == "paragraph" else self.paragraph
     def propagate(self, start: str, fluid: float, threshold: float = 0.5):
         if fluid < threshold:
             return (0, set())
@@ -513,28 +2180,153 @@ class WordGraph(nx.MultiDiGraph):
             explored_nodes.update(res[1])
 
         return (num_nodes, explored_nodes)
-    def jsonify_diff(self):
-        """Get the JSON representation of the diff."""
+    def _diff_payload(self, layout=None):
+        """Build the diff payload from the pending diff sets.
+        Each node and edge is listed once, with its final state: an entry
+        added and later updated is sent as added, and one removed and added
+        back is sent as added only. With an ``IncrementalLayout``, node
+        entries carry positions and nodes the layout moved are listed under
+        ``moved_nodes``.
+        """
+        # The edge lists gain an entry per change; keep the first of each
+        added_edges = [e for e in dict.fromkeys(self._added_edges) if self.has_edge(*e)]
+        listed_edges = set(added_edges)
+        updated_edges = [
+            e for e in dict.fromkeys(self._updated_edges)
+            if e not in listed_edges and self.has_edge(*e)
+        ]
+        removed_edges = [e for e in dict.fromkeys(self._removed_edges) if not self.has_edge(*e)]
+        updated_nodes = self._updated_nodes - self._added_nodes
+        moved = []
+        if layout is not None:
+            dirty = set(self._added_nodes)
+            for u, v, _ in added_edges + updated_edges:
+                dirty.add(u)
+                dirty.add(v)
+            with metrics.stage("layout"):
+                moved = layout.update(self, dirty, self._removed_nodes)
+        def node_entry(n):
+            entry = {'id': n, 'data': self.nodes[n]['data']}
+            if layout is not None:
+                entry['position'] = layout.position(n)
+            return entry
+        def edge_entry(u, v, k):
+            return {'source': u, 'target': v, 'key': k, **self.get_edge_data(u, v, k)}
+        # Entries removed again within the same diff are skipped
         diff = {
-            'added_nodes': [{'id': n, 'data': self.nodes[n]['data']} for n in self._added_nodes],
-            'updated_nodes': [{'id': n, 'data': self.nodes[n]['data']} for n in self._updated_nodes],
-            'added_edges': [{'source': u, 'target': v, 'key': k, **self.get_edge_data(u, v, k)} for u, v, k in self._added_edges],
-            'updated_edges': [{'source': u, 'target': v, 'key': k, **self.get_edge_data(u, v, k)} for u, v, k in self._updated_edges],
+            'added_nodes': [node_entry(n) for n in self._added_nodes if self.has_node(n)],
+            'updated_nodes': [node_entry(n) for n in updated_nodes if self.has_node(n)],
+            'removed_nodes': [{'id': n} for n in self._removed_nodes if not self.has_node(n)],
+            'added_edges': [edge_entry(*e) for e in added_edges],
+            'updated_edges': [edge_entry(*e) for e in updated_edges],
+            'removed_edges': [{'source': u, 'target': v, 'key': k} for u, v, k in removed_edges],
+        }
+        if layout is not None:
+            listed = self._added_nodes | self._updated_nodes
+            diff['moved_nodes'] = [{'id': n, 'position': layout.position(n)} for n in moved if n not in listed]
+        diff.update(self._lemma_diff_payload())
+        return diff
+
+    def _lemma_diff_payload(self):
+        """Lemma nodes and edges changed since the last diff, as upserts and removals."""
+        self.sync_lemmas()
+        lemma_graph = self.lemma_graph
+        return {
+            'lemma_nodes': [{'id': n, 'data': lemma_graph.nodes[n]['data']} for n in self._changed_lemma_nodes if lemma_graph.has_node(n)],
+            'lemma_edges': [{'source': u, 'target': v, **lemma_graph.edges[u, v]} for u, v in self._changed_lemma_edges if lemma_graph.has_edge(u, v)],
+            'removed_lemma_nodes': [{'id': n} for n in self._changed_lemma_nodes if not lemma_graph.has_node(n)],
+            'removed_lemma_edges': [{'source': u, 'target': v} for u, v in self._changed_lemma_edges if not lemma_graph.has_edge(u, v)],
         }
-        return json.dumps({"type": "diff", "payload": diff}, cls=NodeEncoder)
 
-    def jsonify(self):
+    def jsonify_diff(self, layout=None):
+        """Get the JSON representation of the diff."""
+        with metrics.stage("json"):
+            diff = self._diff_payload(layout)
+            return _serialise("diff", diff)
+
+    def jsonify(self, layout=None):
+        with metrics.stage("json"):
+            return self._jsonify(layout)
+
+    def _jsonify(self, layout=None):
         # node_link_data is not suitable for MultiDiGraph, build manually
-        nodes = [{'id': n, 'data': d['data']} for n, d in self.nodes(data=True)]
+        if layout is not None:
+            layout.prune(self)
+            with metrics.stage("layout"):
+                layout.update(self, self.nodes)
+            nodes = [{'id': n, 'data': d['data'], 'position': layout.position(n)} for n, d in self.nodes(data=True)]
+        else:
+            nodes = [{'id': n, 'data': d['data']} for n, d in self.nodes(data=True)]
         edges = [{'source': u, 'target': v, 'key': k, **d} for u, v, k, d in self.edges(keys=True, data=True)]
-        data = {'nodes': nodes, 'edges': edges}
-        return json.dumps({"type": "full", "payload": data}, cls=NodeEncoder)
+        self.sync_lemmas()
+        lemma_nodes = [{'id': n, 'data': d['data']} for n, d in self.lemma_graph.nodes(data=True)]
+        lemma_edges = [{'source': u, 'target': v, **d} for u, v, d in self.lemma_graph.edges(data=True)]
+        data = {'nodes': nodes, 'edges': edges, 'lemma_nodes': lemma_nodes, 'lemma_edges': lemma_edges}
+        return _serialise("full", data)
+
+    def diff_from(self, previous: "WordGraph") -> None:
+        """
+        Replace the pending diff with the changes that turn *previous* into
+        this graph, for a graph rebuilt from scratch: only what differs is
+        sent and laid out again, and what the rebuild dropped is removed.
+        """
+        old_nodes = previous.nodes
+        self._added_nodes = {n for n in self.nodes if n not in old_nodes}
+        self._removed_nodes = {n for n in old_nodes if not self.has_node(n)}
+        self._updated_nodes = set()
+        for n, attributes in self.nodes(data=True):
+            old = old_nodes[n]["data"] if n in old_nodes else None
+            data = attributes["data"]
+            if old is not None and (old.value, old.lemmatized) != (data.value, data.lemmatized):
+                self._updated_nodes.add(n)
+        old_edges = {
+            (u, v, k): (data.get("type"), data.get("weight"))
+            for u, v, k, data in previous.edges(keys=True, data=True)
+        }
+        self._added_edges, self._updated_edges = [], []
+        for u, v, k, data in self.edges(keys=True, data=True):
+            old = old_edges.pop((u, v, k), None)
+            if old is None or old[0] != data.get("type"):
+                self._added_edges.append((u, v, k))
+            elif old[1] != data.get("weight"):
+                self._updated_edges.append((u, v, k))
+        self._removed_edges = list(old_edges)
+        self.sync_lemmas()
+        previous.sync_lemmas()
+        old_lemmas, lemma_graph = previous.lemma_graph, self.lemma_graph
+        self._changed_lemma_nodes = {
+            n for n in old_lemmas.nodes if not lemma_graph.has_node(n)
+        }
+        for n, attributes in lemma_graph.nodes(data=True):
+            data = attributes["data"]
+            old = old_lemmas.nodes[n]["data"] if old_lemmas.has_node(n) else None
+            if old is None or (old.count, old.value) != (data.count, data.value):
+                self._changed_lemma_nodes.add(n)
+        self._changed_lemma_edges = {
+            (u, v) if u <= v else (v, u)
+            for u, v in old_lemmas.edges
+            if not lemma_graph.has_edge(u, v)
+        }
+        for u, v, attributes in lemma_graph.edges(data=True):
+            if not old_lemmas.has_edge(u, v) or old_lemmas.edges[u, v] != attributes:
+                self._changed_lemma_edges.add((u, v) if u <= v else (v, u))
+        return None
 
     def clear_diff(self):
+        if self.ranking is not None:
+            self.ranking.update(self)
         self._added_nodes = set()
         self._updated_nodes = set()
+        self._removed_nodes = set()
         self._added_edges = []
         self._updated_edges = []
+        self._removed_edges = []
+        self._changed_lemma_nodes = set()
+        self._changed_lemma_edges = set()
+
+# Readers run the same propagation over a published view
+GraphView.propagate = WordGraph.propagate
+
 
 def main():
     graph = WordGraph()
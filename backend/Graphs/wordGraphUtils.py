@@ -1,16 +1,15 @@
-import os, sys, pathlib
+import os, sys
 import threading
 import tty, termios, time
 
-# Ensure project root on path so that `import dreaming_hawk` works when this file
-# is executed directly from its subdirectory.
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[2]
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
+# Add the parent directory to the system path to find textUtils and Graphs,
+# also when this file is executed directly from its subdirectory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from dreaming_hawk import textUtils, wordGraph as WordGraphModule
+import textUtils
+from Graphs import wordGraph as WordGraphModule
 
 # Re-export for brevity
 parse_text = textUtils.parse_text
@@ -21,82 +20,243 @@ import networkx as nx
 import matplotlib.pyplot as plt
 
 import matplotlib.animation as animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
+import numpy as np
 
 
-def visualizeWordGraph(wg: "WordGraph", ax, pos):
-    ax.clear()
-    ax.set_title("Word Graph")
-    ax.set_xticks([])
-    ax.set_yticks([])
-    has_semantic = False
-    has_temporal = False
-    for u, v, data in wg.edges(data=True):
-        x1, y1 = pos[u]
-        x2, y2 = pos[v]
-        if data.get("type") == "temporal":
-            ax.annotate(
-                "",
-                xy=(x2, y2),
-                xytext=(x1, y1),
-                arrowprops=dict(
-                    arrowstyle="->",
-                    color="red",
-                    linestyle="dashed",
-                    linewidth=1.0,
-                ),
-                zorder=1,
-            )
-            has_temporal = True
-        elif data.get("type") == "semantic":  # Semantic edge
-            ax.plot(
-                [x1, x2],
-                [y1, y2],
-                color="blue",
-                linestyle="solid",
-                linewidth=1.5,
-                zorder=1,
-            )
-            # Draw edge weight
-            mid_x, mid_y = (x1 + x2) / 2, (y1 + y2) / 2
-            ax.text(
-                mid_x,
-                mid_y,
-                f"{data['weight']:.2f}",
-                fontsize=7,
-                color="darkgreen",
-                ha="center",
-                va="center",
-                bbox=dict(
-                    facecolor="white",
-                    alpha=0.5,
-                    edgecolor="none",
-                    boxstyle="round,pad=0.1",
-                ),
-            )
-            has_semantic = True
-    # Draw nodes and labels
-    if wg.nodes():  # Check if there are nodes to draw
-        node_sizes = [wg.nodes[n]["data"].get_value() * 30 for n in wg.nodes()]
-        node_x = [pos[n][0] for n in wg.nodes()]
-        node_y = [pos[n][1] for n in wg.nodes()]
-        ax.scatter(node_x, node_y, s=node_sizes, color="skyblue", zorder=2, ec="black")
-    for node in wg.nodes():
-        x, y = pos[node]
-        # Ensure font remains readable but proportional to node value
-        fontsize = max(6, wg.nodes[node]["data"].get_value() + 4)
-        ax.text(x, y, node, ha="center", va="center", fontsize=fontsize, weight="bold")
-    # Create and display legend
-    legend_elements = []
-    if any("weight" in d for _, _, d in wg.edges(data=True)):
-        legend_elements.append(Line2D([0], [0], color="blue", lw=1.5, label="Semantic"))
-    if any(d.get("type") == "temporal" for _, _, d in wg.edges(data=True)):
-        legend_elements.append(
-            Line2D([0], [0], color="red", linestyle="dashed", lw=1.0, label="Temporal")
+class _RowBuffer:
+    """
+    Growable NumPy array whose rows are addressed by key; removal swaps the
+    last row into the freed slot so every operation is O(1).
+    """
+
+    def __init__(self, row_shape: tuple):
+        self._rows = np.zeros((16, *row_shape))
+        self._index = {}
+        self._keys = []
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set(self, key, row) -> None:
+        index = self._index.get(key)
+        if index is None:
+            index = len(self._keys)
+            if index == len(self._rows):
+                self._rows = np.concatenate([self._rows, np.zeros_like(self._rows)])
+            self._index[key] = index
+            self._keys.append(key)
+        self._rows[index] = row
+
+    def remove(self, key) -> None:
+        index = self._index.pop(key, None)
+        if index is None:
+            return
+        last = len(self._keys) - 1
+        if index != last:
+            moved = self._keys[last]
+            self._keys[index] = moved
+            self._rows[index] = self._rows[last]
+            self._index[moved] = index
+        self._keys.pop()
+
+    def array(self) -> np.ndarray:
+        return self._rows[: len(self._keys)]
+
+
+class WordGraphRenderer:
+    """
+    Draws a WordGraph with a fixed set of artists: one LineCollection for
+    semantic edges, one dashed LineCollection plus one PolyCollection of
+    arrowheads for temporal edges, and one scatter for nodes. Frames only
+    update the data arrays of those artists from the graph's diff, instead of
+    clearing the axes and creating artists per edge.
+    """
+
+    def __init__(self, ax, pos, show_weights: bool = False):
+        self.ax = ax
+        self.pos = pos
+        self.show_weights = show_weights
+        ax.set_title("Word Graph")
+        ax.set_xticks([])
+        ax.set_yticks([])
+        self._semantic = LineCollection(
+            [], colors="blue", linestyles="solid", linewidths=1.5, zorder=1
+        )
+        self._temporal = LineCollection(
+            [], colors="red", linestyles="dashed", linewidths=1.0, zorder=1
+        )
+        self._heads = PolyCollection([], facecolors="red", edgecolors="none", zorder=1)
+        for collection in (self._semantic, self._temporal, self._heads):
+            ax.add_collection(collection)
+        self._scatter = ax.scatter(
+            np.zeros(0), np.zeros(0), s=np.zeros(0), color="skyblue", zorder=2, ec="black"
+        )
+        self._nodes = _RowBuffer((3,))  # x, y, size
+        self._semantic_segments = _RowBuffer((2, 2))
+        self._temporal_segments = _RowBuffer((2, 2))
+        self._labels = {}
+        self._weight_labels = {}
+        self._edge_types = {}
+        self._legend_types = set()
+        if pos:
+            xy = np.array(list(pos.values()))
+            margin = (xy.max(axis=0) - xy.min(axis=0)) * 0.05 + 0.1
+            ax.set_xlim(xy[:, 0].min() - margin[0], xy[:, 0].max() + margin[0])
+            ax.set_ylim(xy[:, 1].min() - margin[1], xy[:, 1].max() + margin[1])
+        self._head_length = 0.012 * max(
+            np.ptp(ax.get_xlim()), np.ptp(ax.get_ylim())
         )
 
-    if legend_elements:
-        ax.legend(handles=legend_elements)
+    def artists(self) -> list:
+        return [self._semantic, self._temporal, self._heads, self._scatter] + list(
+            self._labels.values()
+        ) + list(self._weight_labels.values())
+
+    def draw(self, wg: "WordGraph") -> None:
+        """Draw the full current state of *wg*."""
+        nodes = [{"id": n, "data": d["data"]} for n, d in wg.nodes(data=True)]
+        edges = [
+            {"source": u, "target": v, "key": k, **d}
+            for u, v, k, d in wg.edges(keys=True, data=True)
+        ]
+        self.apply_diff({"added_nodes": nodes, "added_edges": edges})
+
+    def apply_diff(self, diff: dict) -> None:
+        """
+        Update the artists from a diff payload as built by
+        ``WordGraph._diff_payload``.
+        """
+        semantic_dirty = temporal_dirty = nodes_dirty = False
+        for edge in diff.get("removed_edges", []):
+            key = (edge["source"], edge["target"], edge["key"])
+            edge_type = self._edge_types.pop(key, None)
+            if edge_type == "temporal":
+                self._temporal_segments.remove(key)
+                temporal_dirty = True
+            elif edge_type == "semantic":
+                self._semantic_segments.remove(key)
+                label = self._weight_labels.pop(key, None)
+                if label is not None:
+                    label.remove()
+                semantic_dirty = True
+        for node in diff.get("removed_nodes", []):
+            self._nodes.remove(node["id"])
+            label = self._labels.pop(node["id"], None)
+            if label is not None:
+                label.remove()
+            nodes_dirty = True
+        for node in diff.get("added_nodes", []) + diff.get("updated_nodes", []):
+            word, value = node["id"], node["data"].get_value()
+            x, y = self.pos[word]
+            self._nodes.set(word, (x, y, value * 30))
+            # Ensure font remains readable but proportional to node value
+            fontsize = max(6, value + 4)
+            label = self._labels.get(word)
+            if label is None:
+                self._labels[word] = self.ax.text(
+                    x, y, word, ha="center", va="center", fontsize=fontsize, weight="bold"
+                )
+            else:
+                label.set_fontsize(fontsize)
+            nodes_dirty = True
+        for edge in diff.get("added_edges", []) + diff.get("updated_edges", []):
+            u, v = edge["source"], edge["target"]
+            key = (u, v, edge["key"])
+            self._edge_types[key] = edge["type"]
+            segment = (self.pos[u], self.pos[v])
+            if edge["type"] == "temporal":
+                self._temporal_segments.set(key, segment)
+                temporal_dirty = True
+            elif edge["type"] == "semantic":
+                # Semantic edges come in pairs; draw each pair once
+                if u > v:
+                    continue
+                self._semantic_segments.set(key, segment)
+                if self.show_weights:
+                    self._set_weight_label(key, segment, edge["weight"])
+                semantic_dirty = True
+        if semantic_dirty:
+            self._semantic.set_segments(self._semantic_segments.array())
+        if temporal_dirty:
+            segments = self._temporal_segments.array()
+            self._temporal.set_segments(segments)
+            self._heads.set_verts(self._arrowheads(segments))
+        if nodes_dirty:
+            rows = self._nodes.array()
+            self._scatter.set_offsets(rows[:, :2])
+            self._scatter.set_sizes(rows[:, 2])
+        self._update_legend()
+
+    def _set_weight_label(self, key, segment, weight: float) -> None:
+        text = f"{weight:.2f}"
+        label = self._weight_labels.get(key)
+        if label is not None:
+            label.set_text(text)
+            return
+        mid_x, mid_y = (np.asarray(segment[0]) + np.asarray(segment[1])) / 2
+        self._weight_labels[key] = self.ax.text(
+            mid_x,
+            mid_y,
+            text,
+            fontsize=7,
+            color="darkgreen",
+            ha="center",
+            va="center",
+            bbox=dict(
+                facecolor="white",
+                alpha=0.5,
+                edgecolor="none",
+                boxstyle="round,pad=0.1",
+            ),
+        )
+
+    def _arrowheads(self, segments: np.ndarray) -> np.ndarray:
+        """Triangles at the target end of every segment, computed in one pass."""
+        if not len(segments):
+            return np.zeros((0, 3, 2))
+        tips = segments[:, 1]
+        direction = tips - segments[:, 0]
+        length = np.linalg.norm(direction, axis=1, keepdims=True)
+        direction = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+        normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+        base = tips - direction * self._head_length
+        width = normal * self._head_length * 0.4
+        return np.stack([tips, base + width, base - width], axis=1)
+
+    def _update_legend(self) -> None:
+        present = set()
+        if len(self._semantic_segments):
+            present.add("semantic")
+        if len(self._temporal_segments):
+            present.add("temporal")
+        if present == self._legend_types:
+            return
+        self._legend_types = present
+        legend_elements = []
+        if "semantic" in present:
+            legend_elements.append(Line2D([0], [0], color="blue", lw=1.5, label="Semantic"))
+        if "temporal" in present:
+            legend_elements.append(
+                Line2D([0], [0], color="red", linestyle="dashed", lw=1.0, label="Temporal")
+            )
+        if legend_elements:
+            self.ax.legend(handles=legend_elements)
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+
+
+def visualizeWordGraph(wg: "WordGraph", ax, pos):
+    ax.clear()
+    renderer = WordGraphRenderer(ax, pos, show_weights=True)
+    renderer.draw(wg)
+    return renderer
 
 
 def _precompute_layout(graph: "WordGraph"):
@@ -137,7 +297,14 @@ def monitor_input_by_word(graph: "WordGraph"):
                         break
                     # sys.stdout.write(f'\rWord completed: {current_word}\n')
                     sys.stdout.flush()
-                    graph.add_text(current_word)
+                    # Live typing goes through the single-word fast path; only
+                    # the cheap word regex runs per keystroke.
+                    tokens = textUtils.split_text(current_word, mode="words")
+                    ends_sentence = current_word[-1] in ".!?"
+                    for i, token in enumerate(tokens):
+                        graph.append_word(
+                            token, ends_sentence=ends_sentence and i == len(tokens) - 1
+                        )
                     current_word = ""
                 sys.stdout.write(char)
                 sys.stdout.flush()
@@ -182,22 +349,85 @@ def animateGraphBuilding(text_path: str, window_size: int, frame_step: int):
     wg_final.add_text(text=text, yield_frames=False)
     pos = _precompute_layout(wg_final)
 
-    # Create a fresh graph for the animation stream.
+    # Create a fresh graph for the animation stream. Frames are the live graph,
+    # so each one carries only the diff since the previous frame.
     wg_anim = WordGraph(text_window_size=window_size)
-    frame_gen = wg_anim.add_text(text=text, yield_frames=True, frame_step=frame_step)
+    frame_gen = wg_anim.add_text(
+        text=text, yield_frames=True, frame_step=frame_step, copy_frames=False
+    )
 
     fig, ax = plt.subplots(figsize=(10, 8))
+    renderer = WordGraphRenderer(ax, pos)
 
     def update(frame_graph):
-        visualizeWordGraph(frame_graph, ax, pos)
+        renderer.apply_diff(frame_graph._diff_payload())
+        frame_graph.clear_diff()
+        return renderer.artists()
 
     ani = animation.FuncAnimation(
-        fig, update, frames=frame_gen, repeat=False, interval=30
+        fig,
+        update,
+        frames=frame_gen,
+        repeat=False,
+        interval=30,
+        cache_frame_data=False,
     )
     plt.show()
     return wg_final
 
 
+def renderGraphBuilding(
+    text_path: str,
+    window_size: int,
+    frame_step: int,
+    output: str,
+    fps: int = 30,
+    dpi: int = 100,
+):
+    """
+    Headless version of ``animateGraphBuilding``. Writes a video or GIF when
+    *output* has a file extension, otherwise a directory of numbered PNG
+    frames. Returns the number of frames written.
+    """
+    with open(text_path, "r") as f:
+        text = f.read()
+    wg_final = WordGraph(text_window_size=window_size)
+    wg_final.add_text(text=text, yield_frames=False)
+    pos = _precompute_layout(wg_final)
+
+    wg_anim = WordGraph(text_window_size=window_size)
+    frame_gen = wg_anim.add_text(
+        text=text, yield_frames=True, frame_step=frame_step, copy_frames=False
+    )
+    # Draw on an Agg canvas directly so no display or GUI backend is needed
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    renderer = WordGraphRenderer(ax, pos)
+
+    _, extension = os.path.splitext(output)
+    frames = 0
+    if extension:
+        if extension.lower() == ".gif":
+            writer = animation.PillowWriter(fps=fps)
+        else:
+            writer = animation.FFMpegWriter(fps=fps)
+        with writer.saving(fig, output, dpi):
+            for frame_graph in frame_gen:
+                renderer.apply_diff(frame_graph._diff_payload())
+                frame_graph.clear_diff()
+                writer.grab_frame()
+                frames += 1
+    else:
+        os.makedirs(output, exist_ok=True)
+        for frame_graph in frame_gen:
+            renderer.apply_diff(frame_graph._diff_payload())
+            frame_graph.clear_diff()
+            fig.savefig(os.path.join(output, f"frame_{frames:05d}.png"), dpi=dpi)
+            frames += 1
+    return frames
+
+
 def main():
     wg = WordGraph(text_window_size=5)
     with open("/Users/tcong/dreaming-hawk/TrainingTexts/ChalmersPaper.txt", "r") as f:
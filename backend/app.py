@@ -1,9 +1,19 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import contextlib
 import json
+import os
+import metrics
+import textUtils
 # Fix the import path to use relative import instead of absolute
-from Graphs.wordGraph import WordGraph
+from Graphs.wordGraph import WordGraph, NodeEncoder
+from Graphs import graphQueries
+from Graphs.graphLayout import IncrementalLayout
+from Graphs.graphRanking import RankTracker
+from sessionManager import SessionManager, new_session_id
+from updateScheduler import UpdateScheduler
 
 app = FastAPI()
 app.add_middleware(
@@ -14,51 +24,387 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# This global instance will be used by HTTP endpoints, but WebSocket will create its own.
-global_wg = WordGraph(text_window_size=30)
+# Encode whole sentences and pool per-word vectors instead of encoding words alone
+CONTEXTUAL_EMBEDDINGS = os.environ.get("CONTEXTUAL_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+
+query_cache = graphQueries.QueryCache()
+
+# Graphs are addressed by session; idle or overflowing sessions spill to disk.
+# Their changes are logged ahead as they are made, so a restarted server picks
+# sessions up where it crashed. Cached query results go with the graph they
+# were computed on.
+sessions = SessionManager(
+    spill_dir=os.environ.get("SESSION_SPILL_DIR"),
+    max_memory_bytes=int(os.environ.get("SESSION_MEMORY_CAP_MB", "256")) * 1024 * 1024,
+    idle_seconds=float(os.environ.get("SESSION_IDLE_SECONDS", "600")),
+    text_window_size=30,
+    semantic_threshold=0.5,
+    contextual=CONTEXTUAL_EMBEDDINGS,
+    log_operations=os.environ.get("SESSION_OPLOG", "1").lower() in ("1", "true", "yes"),
+    on_release=query_cache.invalidate,
+)
+
+# /ws sends at most one frame per budget; a debounce waits for typing pauses
+WS_FRAME_BUDGET_MS = float(os.environ.get("WS_FRAME_BUDGET_MS", "50"))
+WS_DEBOUNCE_MS = float(os.environ.get("WS_DEBOUNCE_MS", "0"))
+WS_MAX_DELAY_MS = float(os.environ.get("WS_MAX_DELAY_MS", "250"))
+
+
+@contextlib.contextmanager
+def use_session(session_id: str):
+    """
+    The session's graph, leased for the request so that no other request
+    spills it while this one reads or writes it. Sessions are only created by
+    POST /sessions and /ws, so an unknown ID is a 404.
+    """
+    with contextlib.ExitStack() as stack:
+        try:
+            wg = stack.enter_context(sessions.lease(session_id, create=False))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        yield wg
+
+@app.on_event("shutdown")
+def flush_sessions():
+    sessions.flush()
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.post("/sessions")
+def create_session():
+    session_id = new_session_id()
+    sessions.get(session_id)
+    return {"session_id": session_id}
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    with use_session(session_id):
+        sessions.drop(session_id)
+    return {"status": "ok"}
+
 @app.post("/reset")
-def reset():
-    global global_wg
-    global_wg = WordGraph(text_window_size=30)
+def reset(session_id: str):
+    with use_session(session_id):
+        sessions.reset(session_id)
     return {"status": "ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    graphs = sessions.resident_graphs()
+    gauges = {
+        "resident_sessions": ("Sessions held in memory.", len(graphs)),
+        "resident_bytes": ("Estimated size of the sessions held in memory.", sessions.resident_bytes()),
+        "graph_nodes": ("Word nodes across resident sessions.", sum(g.number_of_nodes() for g in graphs)),
+        "graph_edges": ("Edges across resident sessions.", sum(g.number_of_edges() for g in graphs)),
+    }
+    return Response(
+        content=metrics.registry.render(gauges),
+        media_type="text/plain; version=0.0.4",
+    )
+
+def traced(enabled: bool):
+    """A per-request trace when *enabled*, else a context that yields None."""
+    return metrics.trace() if enabled else contextlib.nullcontext()
+
+def document_tokens(text: str) -> list[tuple[str, bool, bool]]:
+    """The (word, ends sentence, ends paragraph) tokens of a client's text."""
+    info = textUtils.extract_all_text_info(text)
+    sentence_ends = set(info["sentence_ending_words"])
+    paragraph_ends = set(info["paragraph_ending_words"])
+    return [
+        (word, i in sentence_ends, i in paragraph_ends) for i, word in enumerate(info["words"])
+    ]
+
+def graph_tokens(wg: WordGraph) -> list[tuple[str, bool, bool]]:
+    """The tokens a graph holds, in the form of ``document_tokens``."""
+    return [(token.word, token.ends_sentence, token.ends_paragraph) for token in wg.tokens]
+
+def apply_edit(wg: WordGraph, previous: list, tokens: list) -> None:
+    """
+    Bring a graph holding the *previous* tokens to *tokens*. Only the tokens
+    between their common prefix and suffix change: those deleted are removed
+    by position and the new ones inserted there, or appended at the end of
+    the text, so an edit costs as much as the words it touches.
+    """
+    start = 0
+    limit = min(len(previous), len(tokens))
+    while start < limit and previous[start] == tokens[start]:
+        start += 1
+    end, new_end = len(previous), len(tokens)
+    while end > start and new_end > start and previous[end - 1] == tokens[new_end - 1]:
+        end -= 1
+        new_end -= 1
+    if start < end:
+        wg.delete_span(start, end)
+    inserted = tokens[start:new_end]
+    if end == len(previous):
+        for word, ends_sentence, ends_paragraph in inserted:
+            wg.append_word(word, ends_sentence=ends_sentence, ends_paragraph=ends_paragraph)
+    elif inserted:
+        wg.insert_words(
+            start,
+            [word for word, _, _ in inserted],
+            [i for i, (_, ends_sentence, _) in enumerate(inserted) if ends_sentence],
+        )
+    return None
+
 @app.post("/add_text")
-def add_text(text: str):
-    global_wg.add_text(text)
+def add_text(session_id: str, text: str, trace: bool = False):
+    with use_session(session_id) as wg:
+        with traced(trace) as request_trace, wg.writer():
+            wg.add_text(text)
+            # HTTP clients read the graph by query rather than by diff, so
+            # the diff is only kept until a ranking tracker has seen it
+            wg.clear_diff()
+        sessions.touch(session_id)
+    if request_trace is not None:
+        return {"status": "ok", "trace": request_trace.to_dict()}
     return {"status": "ok"}
 
+@app.post("/checkpoint")
+def create_checkpoint(session_id: str, name: str | None = None):
+    with use_session(session_id) as wg:
+        with wg.writer():
+            checkpoint_id = wg.checkpoint(name)
+        sessions.touch(session_id)
+    return {"checkpoint": checkpoint_id}
+
+def history_step(session_id: str, step) -> Response:
+    """Apply an undo/redo step and return the resulting diff."""
+    with use_session(session_id) as wg:
+        with wg.writer():
+            wg.clear_diff()
+            try:
+                step(wg)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            body = wg.jsonify_diff()
+            wg.clear_diff()
+        sessions.touch(session_id)
+    return Response(content=body, media_type="application/json")
+
+@app.post("/undo")
+def undo(session_id: str):
+    return history_step(session_id, lambda wg: wg.undo())
+
+@app.post("/redo")
+def redo(session_id: str):
+    return history_step(session_id, lambda wg: wg.redo())
+
+@app.post("/rollback")
+def rollback(session_id: str, checkpoint: str):
+    target = int(checkpoint) if checkpoint.isdigit() else checkpoint
+    return history_step(session_id, lambda wg: wg.rollback(target))
+
 @app.get("/get_graph")
-def get_json_representation():
-    return global_wg.jsonify()
+def get_json_representation(session_id: str):
+    # Served from the latest published view, so it never waits for or sees
+    # a half-applied add_text
+    with use_session(session_id) as wg:
+        return wg.snapshot().jsonify()
+
+def run_query(session_id: str, key: tuple, compute, page: int, page_size: int):
+    """Run a subgraph query through the per-version cache and return one page."""
+    # The cache is filled under the lease, after which a spill would clear it
+    with use_session(session_id) as graph:
+        wg = graph.snapshot()
+        try:
+            result = query_cache.get_or_compute(session_id, wg, key, lambda: compute(wg))
+            page_data = graphQueries.paginate(result, page=page, page_size=page_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    body = {"type": "subgraph", "version": wg.version, **page_data}
+    return Response(content=json.dumps(body, cls=NodeEncoder), media_type="application/json")
+
+@app.get("/graph/ego")
+def get_ego_network(
+    session_id: str,
+    word: str,
+    hops: int = 1,
+    min_weight: float = 0.0,
+    edge_type: str = "all",
+    page: int = 0,
+    page_size: int = 500,
+):
+    word = word.lower()
+    return run_query(
+        session_id,
+        ("ego", word, hops, min_weight, edge_type),
+        lambda wg: graphQueries.ego_network(wg, word, hops, min_weight, edge_type),
+        page,
+        page_size,
+    )
+
+@app.get("/graph/top")
+def get_top_nodes(
+    session_id: str,
+    n: int = 50,
+    min_weight: float = 0.0,
+    edge_type: str = "all",
+    page: int = 0,
+    page_size: int = 500,
+):
+    return run_query(
+        session_id,
+        ("top", n, min_weight, edge_type),
+        lambda wg: graphQueries.top_nodes(wg, n, edge_type, min_weight),
+        page,
+        page_size,
+    )
+
+@app.get("/graph/window")
+def get_window_subgraph(
+    session_id: str,
+    min_weight: float = 0.0,
+    edge_type: str = "all",
+    page: int = 0,
+    page_size: int = 500,
+):
+    return run_query(
+        session_id,
+        ("window", min_weight, edge_type),
+        lambda wg: graphQueries.window_subgraph(wg, edge_type, min_weight),
+        page,
+        page_size,
+    )
+
+@app.get("/graph/lemmas")
+def get_lemma_subgraph(
+    session_id: str,
+    lemma: str | None = None,
+    min_weight: float = 0.0,
+    page: int = 0,
+    page_size: int = 500,
+):
+    lemma = lemma.lower() if lemma is not None else None
+    return run_query(
+        session_id,
+        ("lemmas", lemma, min_weight),
+        lambda wg: graphQueries.lemma_subgraph(wg, lemma, min_weight),
+        page,
+        page_size,
+    )
+
+@app.get("/graph/rank")
+def get_ranking(session_id: str, k: int = 20, metric: str = "pagerank"):
+    with use_session(session_id) as wg, wg.write_lock:
+        # The tracker is fed from the graph's diffs, so it is read between writers
+        tracker = wg.ranking or RankTracker(wg)
+        try:
+            top = tracker.top_k(k, metric=metric)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "type": "ranking",
+        "metric": metric,
+        "version": wg.version,
+        "words": [{"id": word, "score": score} for word, score in top],
+    }
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, session_id: str | None = None):
     await websocket.accept()
-    # Each client gets its own graph instance to manage state.
-    wg = WordGraph(text_window_size=30, semantic_threshold=0.5)
-    try:
-        while True:
-            raw_data = await websocket.receive_text()
-            data = json.loads(raw_data)
+    # Positions are computed here and warm-started across updates, so the
+    # client does not need to lay the graph out itself.
+    layout = IncrementalLayout()
+    # Without a session id each client gets its own throwaway graph; with one,
+    # the graph outlives the connection and is restored on reconnect. Clients
+    # pick their own ids here, so an unknown one starts a new session.
+    if session_id is not None:
+        try:
+            with sessions.lease(session_id) as wg, wg.write_lock:
+                initial = wg.jsonify(layout=layout) if wg.number_of_nodes() else None
+        except ValueError:
+            await websocket.close(code=1008)
+            return
+        if initial is not None:
+            await websocket.send_text(initial)
+    else:
+        wg = WordGraph(
+            text_window_size=30, semantic_threshold=0.5, contextual=CONTEXTUAL_EMBEDDINGS
+        )
 
-            # Reset the graph and then add the text to avoid incrementing counts
-            wg = WordGraph(text_window_size=30, semantic_threshold=0.5)
-            wg.add_text(data["text"], yield_frames=False, reset_window=True)
+    # The graph as last brought up to date here: (graph, version, tokens)
+    document = None
 
-            # Get the JSON representation of the diff
-            json_diff = wg.jsonify_diff()
-            print(json_diff)
-            await websocket.send_text(json_diff)
+    def update(data: dict):
+        if session_id is None:
+            return build(wg, data)
+        # Leased so the memory cap cannot spill the session mid-update
+        with sessions.lease(session_id) as graph:
+            return build(graph, data)
 
-            # Clear the diff for the next update
-            wg.clear_diff()
+    def build(graph: WordGraph, data: dict):
+        nonlocal document
+        # Clients opt in to a timing breakdown, sent after the diff
+        with traced(data.get("trace", False)) as request_trace:
+            tokens = document_tokens(data["text"])
+            with graph.writer():
+                if document is not None and document[0] is graph and document[1] == graph.version:
+                    previous = document[2]
+                else:
+                    # Edited by another request or restored since; a sentence
+                    # of one word is not marked as ended in the graph, so this
+                    # may replace a little more than was edited
+                    previous = graph_tokens(graph)
+                try:
+                    apply_edit(graph, previous, tokens)
+                except Exception as e:
+                    print(f"Rebuilding after a failed edit: {e}")
+                    metrics.count("ws_rebuilds")
+                    # Within the same graph, so its checkpoints survive
+                    graph.delete_span(0, len(graph.tokens))
+                    graph.add_text(data["text"], reset_window=True)
+                # Get the JSON representation of the diff
+                json_diff = graph.jsonify_diff(layout=layout)
+                # Clear the diff for the next update
+                graph.clear_diff()
+                document = (graph, graph.version, tokens)
+        if session_id is not None:
+            sessions.touch(session_id)
+        return json_diff, request_trace
+
+    # Messages are read while an update is being built, so one that arrives
+    # meanwhile replaces any older message still waiting
+    scheduler = UpdateScheduler(
+        frame_interval=WS_FRAME_BUDGET_MS / 1000,
+        debounce=WS_DEBOUNCE_MS / 1000,
+        max_delay=WS_MAX_DELAY_MS / 1000,
+    )
+
+    async def receive():
+        try:
+            while True:
+                scheduler.submit(json.loads(await websocket.receive_text()))
+        finally:
+            scheduler.close()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while (data := await scheduler.next()) is not None:
+            metrics.count("ws_messages_superseded", scheduler.dropped)
+            json_diff, request_trace = await run_in_threadpool(update, data)
+            await websocket.send_text(json_diff)
+            if "seq" in data:
+                # Tells the client which of its messages the diff covers
+                await websocket.send_text(
+                    json.dumps({"type": "ack", "seq": data["seq"], "superseded": scheduler.dropped})
+                )
+            if request_trace is not None:
+                await websocket.send_text(
+                    json.dumps({"type": "trace", "payload": request_trace.to_dict()})
+                )
+            scheduler.sent()
+        # Surface why the receiver stopped
+        await receiver
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
         print(f"An error occurred: {e}")
-        await websocket.close(code=1011)
\ No newline at end of file
+        await websocket.close(code=1011)
+    finally:
+        receiver.cancel()
@@ -0,0 +1,116 @@
+from backend import app, sessionManager
+from backend.Graphs import wordGraph
+from fastapi.testclient import TestClient
+import json
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    sessions = sessionManager.SessionManager(
+        spill_dir=str(tmp_path), text_window_size=30, semantic_threshold=0.5
+    )
+    monkeypatch.setattr(app, "sessions", sessions)
+    monkeypatch.setattr(app, "WS_FRAME_BUDGET_MS", 0)
+    return TestClient(app.app)
+
+
+def _send(ws, text: str, seq: int) -> dict:
+    ws.send_text(json.dumps({"text": text, "seq": seq}))
+    diff = json.loads(ws.receive_text())
+    assert json.loads(ws.receive_text()) == {"type": "ack", "seq": seq, "superseded": 0}
+    return diff
+
+
+def _state(wg):
+    return (
+        {n: wg.nodes[n]["data"].get_value() for n in wg.nodes},
+        sorted(
+            (u, v, k, round(d["weight"], 6))
+            for u, v, k, d in wg.edges(keys=True, data=True)
+        ),
+    )
+
+
+def test_ws_applies_typing_as_edits(client, monkeypatch):
+    text = "The blue bird sings. Birds sing at dawn.\n\nA red fish"
+    appended = []
+    # The app's graph class, imported the way app.py imports it
+    append_word = app.WordGraph.append_word
+
+    def counting_append_word(self, word, *args, **kwargs):
+        appended.append(word)
+        return append_word(self, word, *args, **kwargs)
+
+    monkeypatch.setattr(app.WordGraph, "append_word", counting_append_word)
+    with client.websocket_connect("/ws?session_id=typing") as ws:
+        for end in range(1, len(text) + 1):
+            before = len(appended)
+            _send(ws, text[:end], end)
+            # Only the word being typed is redone on each keystroke, and the
+            # one before it when a sentence end moves onto the new word
+            assert len(appended) - before <= 2
+        assert appended[-1] == "fish"
+        graph = app.sessions.get("typing")
+        before = len(appended)
+        _send(ws, text[:-4], 0)
+        assert len(appended) == before
+    fresh = wordGraph.WordGraph(text_window_size=30, semantic_threshold=0.5)
+    fresh.add_text(text[:-4])
+    assert app.sessions.get("typing") is graph
+    assert _state(graph) == _state(fresh)
+
+
+def test_ws_deletes_and_inserts_by_position(client, monkeypatch):
+    deleted = []
+    delete_span = app.WordGraph.delete_span
+
+    def recording_delete_span(self, start, end):
+        deleted.append((start, end))
+        return delete_span(self, start, end)
+
+    monkeypatch.setattr(app.WordGraph, "delete_span", recording_delete_span)
+    monkeypatch.setattr(app.WordGraph, "add_text", lambda *args, **kwargs: pytest.fail("rebuilt"))
+    text = "Owls hunt at night. Hawks hunt by day. Both sleep."
+    with client.websocket_connect("/ws?session_id=editing") as ws:
+        for end in range(1, len(text) + 1):
+            _send(ws, text[:end], end)
+        graph = app.sessions.get("editing")
+        deleted.clear()
+        # Deleting the middle sentence removes exactly its words
+        _send(ws, "Owls hunt at night. Both sleep.", 0)
+        assert deleted == [(4, 8)]
+        assert [token.word for token in graph.tokens] == ["owls", "hunt", "at", "night", "both", "sleep"]
+        _send(ws, "Owls hunt at dark night. Both sleep.", 1)
+        assert deleted == [(4, 8)]
+        assert [token.word for token in graph.tokens][3:5] == ["dark", "night"]
+    assert app.sessions.get("editing") is graph
+
+
+def test_ws_edits_keep_the_session_history(client, monkeypatch):
+    with client.websocket_connect("/ws?session_id=history") as ws:
+        _send(ws, "Owls hunt at night.", 0)
+        checkpoint = client.post("/checkpoint", params={"session_id": "history"}).json()
+        _send(ws, "Owls hunt at night. Hawks hunt by day.", 1)
+        _send(ws, "Owls hunt at night. Hawks hunt.", 2)
+        assert client.get("/graph/ego", params={"session_id": "history", "word": "hawks"}).json()["payload"]["nodes"]
+
+        undone = json.loads(client.post("/undo", params={"session_id": "history"}).text)
+        assert {node["id"] for node in undone["payload"]["removed_nodes"]} >= {"hawks"}
+        graph = app.sessions.get("history")
+        assert [token.word for token in graph.tokens] == ["owls", "hunt", "at", "night"]
+        assert graph.checkpoints() == [(checkpoint["checkpoint"], None)]
+        # The editor carries on from the restored graph
+        _send(ws, "Owls hunt at night. Hawks hunt.", 3)
+        assert [token.word for token in graph.tokens][4:] == ["hawks", "hunt"]
+        assert json.loads(client.post("/redo", params={"session_id": "history"}).text)["payload"]
+
+        # A failed edit is redone from scratch within the same graph
+        def failing_edit(*args):
+            raise RuntimeError("edit failed")
+
+        monkeypatch.setattr(app, "apply_edit", failing_edit)
+        _send(ws, "Owls sleep.", 4)
+        assert app.sessions.get("history") is graph
+        assert [token.word for token in graph.tokens] == ["owls", "sleep"]
+        assert graph.checkpoints() == [(checkpoint["checkpoint"], None)]
@@ -0,0 +1,71 @@
+from backend.Graphs import wordGraph, graphLayout
+import json
+
+
+def test_lemma_position_matches_frontend_hash():
+    # Values computed with the frontend's getPositionFromLemma
+    assert graphLayout.lemma_position("a") == (97, 0)
+    x, y = graphLayout.lemma_position("consciousness")
+    assert 0 <= x < 800 and -600 < y < 600
+
+
+def test_layout_warm_starts_and_relaxes_only_changes():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    layout = graphLayout.IncrementalLayout(lemma_seeding=False)
+    wg.add_text("red fish blue fish")
+    wg.jsonify_diff(layout=layout)
+    wg.clear_diff()
+    before = layout.positions()
+    wg.add_text("green frog")
+    payload = json.loads(wg.jsonify_diff(layout=layout))["payload"]
+    assert {n["id"] for n in payload["added_nodes"]} == {"green", "frog"}
+    assert all("position" in n for n in payload["added_nodes"])
+    # Nodes untouched by the update keep their positions
+    untouched = set(before) - {"blue", "fish", "green", "frog"}
+    for node in untouched:
+        assert layout.position(node) == before[node]
+
+
+def test_layout_drops_removed_nodes():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    layout = graphLayout.IncrementalLayout()
+    wg.add_text("one two three")
+    wg.jsonify(layout=layout)
+    wg.clear_diff()
+    wg.delete_text("three")
+    wg.jsonify_diff(layout=layout)
+    assert "three" not in layout and len(layout) == 2
+
+
+def test_rebuilt_graphs_only_move_what_changed():
+    # /ws rebuilds the graph from the whole text on every message
+    layout = graphLayout.IncrementalLayout(lemma_seeding=False)
+    previous = wordGraph.WordGraph(text_window_size=2)
+    text = "red fish blue fish one fish two fish old fish new fish"
+    previous.add_text(text, reset_window=True)
+    previous.jsonify(layout=layout)
+    previous.clear_diff()
+    before = layout.positions()
+    wg = wordGraph.WordGraph(text_window_size=2)
+    wg.add_text(text + " green frog", reset_window=True)
+    wg.diff_from(previous)
+    payload = json.loads(wg.jsonify_diff(layout=layout))["payload"]
+    assert {n["id"] for n in payload["added_nodes"]} == {"green", "frog"}
+    assert {n["id"] for n in payload["updated_nodes"]} == set()
+    assert {(e["source"], e["target"]) for e in payload["added_edges"]} >= {
+        ("fish", "green"),
+        ("green", "frog"),
+    }
+    # Only nodes linked to the new words are relaxed
+    untouched = set(before) - {"fish", "new", "green", "frog"}
+    assert untouched
+    for node in untouched:
+        assert layout.position(node) == before[node]
+    # Text the rebuild dropped is removed from the client and the layout
+    shorter = wordGraph.WordGraph(text_window_size=2)
+    shorter.add_text("red fish blue fish", reset_window=True)
+    shorter.diff_from(wg)
+    payload = json.loads(shorter.jsonify_diff(layout=layout))["payload"]
+    assert {n["id"] for n in payload["removed_nodes"]} == {"one", "two", "old", "new", "green", "frog"}
+    assert {n["id"] for n in payload["updated_nodes"]} == {"fish"}
+    assert "frog" not in layout and len(layout) == 3
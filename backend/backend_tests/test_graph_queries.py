@@ -0,0 +1,47 @@
+from backend.Graphs import wordGraph, graphQueries
+import pytest
+
+
+def _graph():
+    wg = wordGraph.WordGraph(text_window_size=2)
+    wg.add_text("red fish blue fish one fish two fish")
+    return wg
+
+
+def test_ego_network_hops():
+    wg = _graph()
+    one_hop = graphQueries.ego_network(wg, "red", hops=1, edge_type="temporal")
+    assert [n["id"] for n in one_hop["nodes"]] == ["red", "fish"]
+    two_hops = graphQueries.ego_network(wg, "red", hops=2, edge_type="temporal")
+    assert {n["id"] for n in two_hops["nodes"]} == {"red", "fish", "blue", "one", "two"}
+    assert all(e["type"] == "temporal" for e in two_hops["edges"])
+    with pytest.raises(ValueError):
+        graphQueries.ego_network(wg, "red", edge_type="lexical")
+
+
+def test_top_nodes_and_window():
+    wg = _graph()
+    top = graphQueries.top_nodes(wg, n=1)
+    assert top["nodes"][0]["id"] == "fish"
+    assert top["nodes"][0]["data"]["value"] == 4
+    window = graphQueries.window_subgraph(wg)
+    assert [n["id"] for n in window["nodes"]] == ["two", "fish"]
+
+
+def test_paginate():
+    result = {"nodes": list(range(5)), "edges": list(range(3))}
+    page = graphQueries.paginate(result, page=1, page_size=2)
+    assert page["payload"] == {"nodes": [2, 3], "edges": [2]}
+    assert page["has_more"]
+    assert not graphQueries.paginate(result, page=2, page_size=2)["has_more"]
+
+
+def test_query_cache_invalidates_on_mutation():
+    wg = _graph()
+    cache = graphQueries.QueryCache()
+    compute = lambda: graphQueries.top_nodes(wg, n=3)
+    first = cache.get_or_compute("s", wg, ("top", 3), compute)
+    assert cache.get_or_compute("s", wg, ("top", 3), compute) is first
+    wg.add_text("fish")
+    assert cache.get_or_compute("s", wg, ("top", 3), compute) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
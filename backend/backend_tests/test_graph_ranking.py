@@ -0,0 +1,68 @@
+from backend.Graphs import wordGraph, graphRanking
+import pytest
+
+corpus = [
+    "The blue bird sings over the quiet hills.",
+    "Birds sing at dawn and the hills answer.\n\n",
+    "A red fish swims under the blue water. The fish sings too.",
+]
+
+
+# Tight enough that the bound below holds whatever the embeddings
+TOL = 1e-7
+
+
+def _check(wg, tracker):
+    scores = tracker.pagerank()
+    reference = graphRanking.pagerank_reference(wg)
+    assert set(scores) == set(wg.nodes)
+    # Residuals within tol leave at most n * tol / (1 - d) of unnormalised
+    # mass unpushed, out of at least n * (1 - d)
+    bound = 2 * tracker.tol / (1 - tracker.damping) ** 2
+    assert max(abs(scores[n] - reference[n]) for n in reference) <= bound
+    degree = tracker.weighted_degree()
+    for node in wg.nodes:
+        expected = sum(
+            d["weight"] for u, v, d in wg.in_edges(node, data=True) if u != v
+        ) + sum(d["weight"] for u, v, d in wg.out_edges(node, data=True) if u != v)
+        assert abs(degree[node] - expected) < 1e-6
+
+
+def test_incremental_ranking_matches_full_recompute():
+    wg = wordGraph.WordGraph(text_window_size=4)
+    tracker = graphRanking.RankTracker(wg, tol=TOL)
+    for text in corpus:
+        wg.add_text(text)
+        _check(wg, tracker)
+        wg.clear_diff()
+    wg.checkpoint()
+    wg.delete_span(2, 6)
+    _check(wg, tracker)
+    wg.undo()
+    wg.clear_diff()
+    _check(wg, tracker)
+    top = tracker.top_k(3)
+    assert len(top) == 3 and top[0][1] >= top[1][1] >= top[2][1]
+    assert tracker.top_k(1, metric="degree")[0][0] in wg.nodes
+
+
+def test_tracker_follows_rebuilt_graphs():
+    wg = wordGraph.WordGraph(text_window_size=4)
+    wg.add_text(corpus[0])
+    tracker = graphRanking.RankTracker(wg, tol=TOL)
+    # Reading again without a write does not resync the pending diff
+    wg.add_text(corpus[1])
+    tracker.top_k(3)
+    resync = tracker._resync_source
+    tracker._resync_source = lambda source: pytest.fail("diff synced twice")
+    tracker.top_k(3)
+    tracker._resync_source = resync
+    for text in corpus[1:]:
+        rebuilt = wordGraph.WordGraph(text_window_size=4)
+        rebuilt.add_text(corpus[0] + " " + text)
+        rebuilt.diff_from(wg)
+        tracker.attach(rebuilt)
+        rebuilt.clear_diff()
+        assert wg.ranking is None and rebuilt.ranking is tracker
+        wg = rebuilt
+        _check(wg, tracker)
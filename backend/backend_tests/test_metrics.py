@@ -0,0 +1,43 @@
+from backend.Graphs import wordGraph
+
+# The registry the graph code reports to
+metrics = wordGraph.metrics
+
+
+def test_nested_stages_are_timed_exclusively():
+    with metrics.trace() as trace:
+        with metrics.stage("edges"):
+            with metrics.stage("encode"):
+                pass
+            with metrics.stage("encode"):
+                pass
+    assert trace.stages["edges"][1] == 1
+    assert trace.stages["encode"][1] == 2
+    assert metrics.stage("edges") is metrics._NULL_TIMER
+
+
+def test_trace_counts_ingestion():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    with metrics.trace() as trace:
+        wg.add_text("The blue bird sings. The bird")
+        body = wg.jsonify_diff()
+    report = trace.to_dict()
+    assert {"tokenize", "edges", "json"} <= set(report["stages"])
+    assert report["counters"]["words_ingested"] == 6
+    assert report["counters"]["edges_added"] == len(wg._added_edges)
+    # "the" and "bird" were seen before their second occurrence
+    assert report["counters"]["embedding_cache_hits"] > 0
+    assert report["summaries"]['payload_size{type="diff"}'] == [len(body), 1]
+
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    registry.observe_stage("encode", 0.002)
+    registry.count("edges_added", 3)
+    registry.observe("payload_size", 120, {"type": "diff"})
+    text = registry.render({"graph_nodes": 7})
+    assert 'dreaming_hawk_stage_seconds_bucket{stage="encode",le="0.005"} 1' in text
+    assert 'dreaming_hawk_stage_seconds_count{stage="encode"} 1' in text
+    assert "dreaming_hawk_edges_added_total 3" in text
+    assert 'dreaming_hawk_payload_size_sum{type="diff"} 120' in text
+    assert "# TYPE dreaming_hawk_graph_nodes gauge" in text
@@ -0,0 +1,158 @@
+from backend.Graphs import frequencyGate, wordGraph, opLog
+import numpy as np
+import pytest
+
+
+def _state(wg):
+    return (
+        {n: wg.nodes[n]["data"].get_value() for n in wg.nodes},
+        sorted(
+            (u, v, k, round(d["weight"], 6), d["type"])
+            for u, v, k, d in wg.edges(keys=True, data=True)
+        ),
+        [token.word for token in wg.tokens],
+        list(wg.window),
+        wg.time,
+    )
+
+
+def _no_models(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("replay must not call the models")
+
+    monkeypatch.setattr(wordGraph.textUtils, "encode_batch", fail)
+    monkeypatch.setattr(wordGraph.textUtils, "encode_text", fail)
+    monkeypatch.setattr(wordGraph.textUtils, "lemmatize_text", fail)
+    monkeypatch.setattr(wordGraph.textUtils, "encode_in_context", fail)
+
+
+def test_recover_replays_without_models(tmp_path, monkeypatch):
+    wg = wordGraph.WordGraph(text_window_size=4)
+    log = opLog.OpLog(str(tmp_path))
+    log.attach(wg)
+    wg.add_text("The blue bird flies over the hills.\n\nBirds sing at dawn.")
+    wg.append_word("quietly")
+    wg.delete_span(2, 4)
+    wg.replace_span(0, 1, "a")
+    expected = _state(wg)
+    log.close()
+
+    _no_models(monkeypatch)
+    recovered = opLog.OpLog.recover(str(tmp_path))
+    assert _state(recovered.graph) == expected
+    recovered.close()
+
+
+def test_compaction_and_torn_tail(tmp_path):
+    wg = wordGraph.WordGraph(text_window_size=3)
+    log = opLog.OpLog(str(tmp_path), compact_every=5)
+    log.attach(wg)
+    wg.add_text("One fish two fish red fish blue fish.")
+    assert log.generation > 0
+    wg.add_text("Black fish blue fish old fish new fish.")
+    expected = _state(wg)
+    log.close()
+
+    # Simulate a crash halfway through writing a record
+    with open(tmp_path / f"ops.{log.generation}.log", "ab") as f:
+        f.write(b"\x04\xff\x00\x00\x00partial")
+    recovered = opLog.OpLog.recover(str(tmp_path), compact_every=5)
+    assert _state(recovered.graph) == expected
+    # Logging continues after the truncated tail
+    recovered.graph.add_text("Fish.")
+    expected = _state(recovered.graph)
+    recovered.close()
+    assert _state(opLog.OpLog.recover(str(tmp_path)).graph) == expected
+
+
+def test_recover_empty_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        opLog.OpLog.recover(str(tmp_path))
+
+
+def test_recover_keeps_the_frequency_gate(tmp_path, monkeypatch):
+    gate = frequencyGate.FrequencyGate(min_count=2, max_share=0.1, stopwords=["the"])
+    wg = wordGraph.WordGraph(text_window_size=4, gate=gate)
+    log = opLog.OpLog(str(tmp_path))
+    log.attach(wg)
+    wg.add_text("The bird sees the bird. The bird sings to the bird.")
+    expected = _state(wg)
+    log.close()
+
+    _no_models(monkeypatch)
+    recovered = opLog.OpLog.recover(str(tmp_path)).graph
+    assert recovered.gate.to_dict() == gate.to_dict()
+    assert _state(recovered) == expected
+
+
+def test_recover_contextual_embeddings(tmp_path, monkeypatch):
+    encode_text = wordGraph.textUtils.encode_text
+
+    def encode_in_context(sentences):
+        return [
+            [(word, encode_text(word) * (position + 1)) for position, word in enumerate(s.split())]
+            for s in sentences
+        ]
+
+    monkeypatch.setattr(wordGraph.textUtils, "encode_in_context", encode_in_context)
+    wg = wordGraph.WordGraph(text_window_size=3, contextual=True)
+    log = opLog.OpLog(str(tmp_path))
+    log.attach(wg)
+    wg.add_text("Owls hunt mice. Owls sleep by day.")
+    wg.replace_span(1, 2, "chase")
+    expected = _state(wg)
+    counts = dict(wg._context_counts)
+    log.close()
+
+    # The sentences are not encoded again, and the running means keep their counts
+    _no_models(monkeypatch)
+    recovered = opLog.OpLog.recover(str(tmp_path)).graph
+    assert _state(recovered) == expected
+    assert recovered._context_counts == counts
+    assert np.allclose(recovered.embedding_memo["owls"], wg.embedding_memo["owls"])
+
+
+def test_recover_drops_an_uncommitted_operation(tmp_path):
+    wg = wordGraph.WordGraph(text_window_size=3)
+    log = opLog.OpLog(str(tmp_path))
+    log.attach(wg)
+    wg.add_text("One fish two fish.")
+    expected = _state(wg)
+    # A crash partway through an operation leaves its first changes behind
+    log.record("_set_count", ("ghost", 1))
+    log.close()
+
+    recovered = opLog.OpLog.recover(str(tmp_path))
+    assert _state(recovered.graph) == expected
+    recovered.graph.add_text("Red fish.")
+    expected = _state(recovered.graph)
+    recovered.close()
+    assert _state(opLog.OpLog.recover(str(tmp_path)).graph) == expected
+
+
+def test_recover_after_an_operation_raises(tmp_path, monkeypatch):
+    put_edge = wordGraph.WordGraph._put_edge
+    failing = [True]
+
+    def flaky_put_edge(self, u, v, edge_type, weight):
+        put_edge(self, u, v, edge_type, weight)
+        if failing[0] and (u, v) == ("a", "storm"):
+            raise RuntimeError("edge store failed")
+
+    monkeypatch.setattr(wordGraph.WordGraph, "_put_edge", flaky_put_edge)
+    wg = wordGraph.WordGraph(text_window_size=3)
+    log = opLog.OpLog(str(tmp_path))
+    log.attach(wg)
+    wg.add_text("Calm seas at dawn.")
+    with pytest.raises(RuntimeError):
+        wg.add_text("A storm rolls in.")
+    failing[0] = False
+    wg.add_text("Boats return.")
+    expected = _state(wg)
+    log.close()
+
+    # The change that raised would raise again if it were replayed
+    failing[0] = True
+    recovered = opLog.OpLog.recover(str(tmp_path))
+    assert _state(recovered.graph) == expected
+    recovered.close()
@@ -0,0 +1,159 @@
+from backend import sessionManager
+import os
+import threading
+import pytest
+
+
+def test_spill_and_rehydrate(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path))
+    wg = sessions.get("alice")
+    wg.add_text("The blue bird flies and sings.")
+    sessions.touch("alice")
+    edges = set(wg.edges(keys=True))
+    sessions.spill("alice")
+    assert sessions.resident_sessions() == []
+    assert "alice" in sessions
+    restored = sessions.get("alice")
+    assert set(restored.edges(keys=True)) == edges
+    assert restored.get_window() == wg.get_window()
+    assert not (tmp_path / "alice.graph").exists()
+
+
+def test_memory_cap_spills_least_recently_used(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), max_memory_bytes=1)
+    for session_id in ["a", "b", "c"]:
+        sessions.get(session_id).add_text("hello world")
+        sessions.touch(session_id)
+    # Only the session just written stays resident under a tiny cap
+    assert sessions.resident_sessions() == ["c"]
+    assert (tmp_path / "a.graph").exists() and (tmp_path / "b.graph").exists()
+
+
+def test_leased_sessions_are_not_spilled(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), max_memory_bytes=1)
+    with sessions.lease("a") as wg:
+        wg.add_text("hello world")
+        sessions.touch("a")
+        # Another request's cap enforcement and idle eviction pass it over
+        sessions.get("b").add_text("hello world")
+        sessions.touch("b")
+        assert sessions.evict_idle(now=float("inf")) == ["b"]
+        sessions.spill("a")
+        wg.add_text("still here")
+        assert sessions.get("a") is wg
+    sessions.spill("a")
+    assert sessions.resident_sessions() == []
+    assert sessions.get("a").get_word_node_data("here").get_value() == 1
+
+
+def test_release_hook_sees_every_graph_leaving_memory(tmp_path):
+    released = []
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), on_release=released.append)
+    for session_id in ["a", "b", "c"]:
+        sessions.get(session_id)
+    sessions.spill("a")
+    sessions.reset("b")
+    sessions.drop("c")
+    sessions.flush()
+    assert released == ["a", "b", "c", "b"]
+
+
+def test_idle_eviction(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), idle_seconds=10)
+    sessions.get("a")
+    sessions.get("b")
+    assert sessions.evict_idle(now=0) == []
+    spilled = sessions.evict_idle(now=float("inf"))
+    assert spilled == ["a", "b"]
+
+
+def test_spills_are_written_outside_the_lock(tmp_path, monkeypatch):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), idle_seconds=10)
+    sessions.get("a").add_text("The blue bird sings.")
+    sessions.get("b")
+    writing, finish = threading.Event(), threading.Event()
+    dump = sessions._dump
+
+    def slow_dump(graph, path):
+        writing.set()
+        finish.wait(5)
+        dump(graph, path)
+
+    monkeypatch.setattr(sessions, "_dump", slow_dump)
+    spiller = threading.Thread(target=sessions.spill, args=("a",))
+    spiller.start()
+    assert writing.wait(5)
+    # Other sessions are served while "a" is being written
+    assert sessions.get("b") is not None and sessions.resident_sessions() == ["b"]
+    assert "a" in sessions
+    # A request for "a" waits for the write and rehydrates it
+    restored = []
+    reader = threading.Thread(target=lambda: restored.append(sessions.get("a")))
+    reader.start()
+    reader.join(0.2)
+    assert restored == []
+    finish.set()
+    spiller.join(5)
+    reader.join(5)
+    assert restored[0].get_word_node_data("bird").get_value() == 1
+    assert not (tmp_path / "a.graph").exists()
+
+
+def test_failed_spills_stay_resident(tmp_path, monkeypatch):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path))
+    wg = sessions.get("a")
+
+    def failing_dump(graph, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sessions, "_dump", failing_dump)
+    with pytest.raises(OSError):
+        sessions.flush()
+    assert sessions.get("a") is wg
+
+def test_invalid_session_id(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        sessions.get("../etc/passwd")
+
+
+def test_lookup_without_creating(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path))
+    with pytest.raises(KeyError):
+        sessions.get("ghost", create=False)
+    with pytest.raises(KeyError):
+        with sessions.lease("ghost", create=False):
+            pass
+    assert "ghost" not in sessions
+    sessions.get("alice").add_text("hello world")
+    sessions.spill("alice")
+    assert sessions.get("alice", create=False).get_word_node_data("hello").get_value() == 1
+
+
+def test_logged_sessions_survive_a_crash(tmp_path):
+    sessions = sessionManager.SessionManager(spill_dir=str(tmp_path), log_operations=True)
+    wg = sessions.get("alice")
+    wg.add_text("The blue bird flies and sings.")
+    sessions.touch("alice")
+    sessions.spill("alice")
+    wg = sessions.get("alice")
+    wg.delete_span(1, 2)
+    edges = set(wg.edges(keys=True))
+    window = wg.get_window()
+
+    # A new manager on the same directory, as after a restart, with nothing
+    # flushed or spilled by the one that crashed
+    restarted = sessionManager.SessionManager(spill_dir=str(tmp_path), log_operations=True)
+    assert "alice" in restarted
+    recovered = restarted.get("alice", create=False)
+    assert recovered is not wg
+    assert set(recovered.edges(keys=True)) == edges
+    assert recovered.get_window() == window
+    # It keeps logging where the crashed process stopped
+    recovered.add_text("Again.")
+    edges = set(recovered.edges(keys=True))
+    again = sessionManager.SessionManager(spill_dir=str(tmp_path), log_operations=True)
+    assert set(again.get("alice", create=False).edges(keys=True)) == edges
+    restarted.drop("alice")
+    assert "alice" not in restarted
+    assert not os.listdir(tmp_path)
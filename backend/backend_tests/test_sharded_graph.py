@@ -0,0 +1,97 @@
+import networkx as nx
+import pytest
+
+from backend.Graphs import graphQueries, shardedGraph, wordGraph
+
+DOCUMENTS = [
+    "red fish blue fish. one fish two fish.",
+    "the old fish swam past the red boat.",
+    "blue boats and red boats sail at dawn. the fish watch them.",
+    "two old men fish from one blue boat.",
+    "dawn comes and the red sky turns blue.",
+]
+
+
+def _single_graph():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    for text in DOCUMENTS:
+        wg.add_text(text.rstrip() + "\n\n", reset_window=True)
+    return wg
+
+
+def _edges(edges):
+    return sorted((u, v, data["type"], round(data["weight"], 6)) for u, v, data in edges)
+
+
+@pytest.fixture(scope="module")
+def graphs():
+    with shardedGraph.ShardedWordGraph(shards=3, text_window_size=3) as sharded:
+        sharded.add_documents(DOCUMENTS[:2])
+        for text in DOCUMENTS[2:]:
+            sharded.add_text(text)
+        yield _single_graph(), sharded
+
+
+def test_shards_hold_the_same_graph(graphs):
+    single, sharded = graphs
+    stats = sharded.stats()
+    assert len({shard["pid"] for shard in stats}) == 3
+    assert sharded.number_of_nodes() == single.number_of_nodes()
+    assert sharded.number_of_edges() == single.number_of_edges()
+    for word, attributes in single.nodes(data=True):
+        assert shardedGraph.shard_of(word, 3) in range(3)
+        assert sharded.node(word).get_value() == attributes["data"].get_value()
+        assert sorted(sharded.successors(word)) == sorted(single.successors(word))
+    assert sharded.node("whale") is None
+    owned = sharded._call_all("subgraph", set(single.nodes), "all", 0.0)
+    edges = [(e["source"], e["target"], e) for _, part in owned for e in part]
+    assert _edges(edges) == _edges(single.edges(data=True))
+
+
+def test_propagate_matches_a_single_graph(graphs):
+    single, sharded = graphs
+    for start in ("red", "fish", "dawn"):
+        for fluid, threshold in ((1.0, 0.5), (2.0, 0.3)):
+            assert sharded.propagate(start, fluid, threshold) == single.propagate(
+                start, fluid, threshold
+            )
+    with pytest.raises(nx.NetworkXError):
+        sharded.propagate("whale", 1.0)
+
+
+def test_ego_network_matches_a_single_graph(graphs):
+    single, sharded = graphs
+    for hops, edge_type in ((1, "all"), (2, "temporal"), (2, "semantic")):
+        expected = graphQueries.ego_network(single, "boat", hops=hops, edge_type=edge_type)
+        found = sharded.ego_network("boat", hops=hops, edge_type=edge_type)
+        assert [n["id"] for n in found["nodes"]] == [n["id"] for n in expected["nodes"]]
+        key = lambda e: (e["source"], e["target"], e["type"], round(e["weight"], 6))
+        assert sorted(map(key, found["edges"])) == sorted(map(key, expected["edges"]))
+    assert sharded.ego_network("whale") == {"nodes": [], "edges": []}
+
+
+def test_worker_errors_are_raised():
+    with shardedGraph.ShardedWordGraph(shards=2) as sharded:
+        with pytest.raises(shardedGraph.ShardWorkerError):
+            sharded.successors("whale")
+        sharded.add_text("still serving after an error")
+        assert sharded.node("serving").get_value() == 1
+
+
+def test_slices_stay_serialisable_without_growing():
+    shards = [shardedGraph.GraphShard(index, 2, {"text_window_size": 3}) for index in range(2)]
+    for text in DOCUMENTS:
+        for index, part in shards[0].build([text])[0].items():
+            shards[index].merge([part])
+    for shard in shards:
+        graph = shard.graph
+        assert not graph._view_dirty and not graph._lemma_dirty_words
+        # Words owned elsewhere are there with a count of zero
+        for word, data in graph.nodes(data="data"):
+            owned = shardedGraph.shard_of(word, 2) == shard.index
+            assert (data.get_value() > 0) == owned
+        graph.jsonify()
+        view = graph.snapshot()
+        assert set(view.nodes) == set(graph.nodes)
+        assert graph.lemma_graph.number_of_nodes() > 0
+    assert sum(shard.stats()["nodes"] for shard in shards) == _single_graph().number_of_nodes()
@@ -1,4 +1,6 @@
 from backend import textUtils
+import sys
+import threading
 import numpy as np
 
 
@@ -47,3 +49,95 @@ def test_text_workhorse2():
     assert text2_info["sentence_ends"] == [3]
     assert text2_info["word_starts"] == [0]
     assert text2_info["sentence_ending_words"] == [0]
+
+
+def test_paragraph_ending_words():
+    text = "First one. Still first.\n\nSecond para here.\n\n\nThird"
+    text_info = textUtils.extract_all_text_info(text)
+    assert text_info["paragraph_ending_words"] == [3, 6]
+
+
+def test_set_encoder_replaces_model(monkeypatch):
+    class Fixed:
+        def encode(self, sentences, **kwargs):
+            if isinstance(sentences, str):
+                return np.ones(3)
+            return np.ones((len(sentences), 3))
+
+    monkeypatch.setattr(textUtils, "_model", textUtils._model)
+    textUtils.set_encoder(Fixed())
+    assert np.array_equal(textUtils.encode_text("owl"), np.ones(3))
+    assert np.array_equal(textUtils.encode_batch(["owl", "hawk"])["hawk"], np.ones(3))
+
+
+class Subwords:
+    """Splits words into two-letter subwords; a token's vector is [start, 1]."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def tokenizer(self, sentences, return_offsets_mapping=False, max_length=None, **kwargs):
+        spans = []
+        for sentence in sentences:
+            tokens = [(0, 0)]
+            for match in textUtils._WORD_PATTERN.finditer(sentence):
+                tokens += [(i, min(i + 2, match.end())) for i in range(match.start(), match.end(), 2)]
+            spans.append((tokens[: max_length - 1] if max_length else tokens) + [(0, 0)])
+        return {"offset_mapping": spans}
+
+    def encode(self, sentences, output_value=None, **kwargs):
+        self.calls += 1
+        spans = self.tokenizer(sentences, max_length=getattr(self, "max_seq_length", None))
+        return [np.array([[start, 1.0] for start, _ in tokens]) for tokens in spans["offset_mapping"]]
+
+
+def test_encode_in_context_pools_subwords(monkeypatch):
+    monkeypatch.setattr(textUtils, "_model", textUtils._model)
+    monkeypatch.setattr(textUtils, "_context_cache", textUtils._context_cache.copy())
+    model = Subwords()
+    textUtils.set_encoder(model)
+    [words] = textUtils.encode_in_context(["Owls hunt"])
+    # "owls" is "ow" + "ls" (starts 0 and 2), "hunt" is "hu" + "nt" (5 and 7)
+    assert [w for w, _ in words] == ["owls", "hunt"]
+    assert np.allclose(words[0][1], [1, 1]) and np.allclose(words[1][1], [6, 1])
+    textUtils.encode_in_context(["owls hunt", "owls sleep"])
+    assert model.calls == 2
+
+    model.max_seq_length = 5
+    textUtils.set_encoder(model)
+    [words] = textUtils.encode_in_context(["owls hunt"])
+    # Only "ow", "ls" and "hu" fit, so "hunt" is pooled from its first half
+    # and a third word would have no vector at all
+    assert np.allclose(words[1][1], [5, 1])
+    [words] = textUtils.encode_in_context(["owl is up"])
+    assert words[2][1] is None
+
+
+def test_context_cache_is_shared_between_threads(monkeypatch):
+    monkeypatch.setattr(textUtils, "_model", textUtils._model)
+    monkeypatch.setattr(textUtils, "_context_cache", textUtils._context_cache.copy())
+    monkeypatch.setattr(textUtils, "_CONTEXT_CACHE_SIZE", 4)
+    textUtils.set_encoder(Subwords())
+    errors = []
+
+    def encode(worker):
+        try:
+            for i in range(200):
+                sentences = [f"owl{worker} hunts{i % 7}", f"mice{i % 5} hide"]
+                for sentence, words in zip(sentences, textUtils.encode_in_context(sentences)):
+                    assert [w for w, _ in words] == textUtils.split_text(sentence)
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads as often as possible to interleave lookups and evictions
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    workers = [threading.Thread(target=encode, args=(i,)) for i in range(6)]
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == [] and len(textUtils._context_cache) <= 4
@@ -0,0 +1,57 @@
+import asyncio
+
+from backend import updateScheduler
+
+
+def test_newer_messages_supersede_pending_ones():
+    async def run():
+        scheduler = updateScheduler.UpdateScheduler(frame_interval=0.0)
+        for seq in range(3):
+            scheduler.submit({"seq": seq})
+        message = await scheduler.next()
+        assert message == {"seq": 2}
+        assert scheduler.dropped == 2
+        scheduler.submit({"seq": 3})
+        assert await scheduler.next() == {"seq": 3}
+        assert scheduler.dropped == 0
+        assert (scheduler.received, scheduler.superseded) == (4, 2)
+        scheduler.close()
+        assert await scheduler.next() is None
+
+    asyncio.run(run())
+
+
+def test_frames_respect_the_budget():
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = updateScheduler.UpdateScheduler(frame_interval=0.1, clock=loop.time)
+        scheduler.submit({"seq": 0})
+        await scheduler.next()
+        scheduler.sent()
+        sent = loop.time()
+        scheduler.submit({"seq": 1})
+        # Arrives while the first message waits for the frame budget
+        loop.call_later(0.05, scheduler.submit, {"seq": 2})
+        assert await scheduler.next() == {"seq": 2}
+        assert loop.time() - sent >= 0.1
+
+    asyncio.run(run())
+
+
+def test_debounce_is_capped_by_max_delay():
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = updateScheduler.UpdateScheduler(
+            frame_interval=0.0, debounce=0.05, max_delay=0.12, clock=loop.time
+        )
+        start = loop.time()
+        # A message every 30 ms never leaves a 50 ms pause
+        for i in range(10):
+            loop.call_later(0.03 * i, scheduler.submit, {"seq": i})
+        await asyncio.sleep(0)
+        message = await scheduler.next()
+        assert loop.time() - start >= 0.12
+        # Handed out while the typing went on
+        assert message["seq"] < 9
+
+    asyncio.run(run())
@@ -1,4 +1,11 @@
-from backend.Graphs import wordGraph
+import json
+import threading
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from backend.Graphs import frequencyGate, wordGraph
 
 text = "Hello, my name is Thomas. I like to eat apples, bananas, oranges. Apples. Bananas. Oranges."
 g = wordGraph.WordGraph(text_window_size=3)
@@ -69,3 +76,314 @@ def test_add_sentence():
     g.add_text("song.")
     assert g.get_sentence() == []
     assert g.has_edge("sings", "song")
+
+
+def test_append_word():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    diff = wg.append_word("Hello")
+    assert [n["id"] for n in diff["added_nodes"]] == ["hello"]
+    assert diff["added_edges"] == []
+    diff = wg.append_word("world", ends_sentence=True)
+    assert [n["id"] for n in diff["added_nodes"]] == ["world"]
+    assert wg.has_edge("hello", "world")
+    assert wg.get_window() == ["hello", "world"]
+    assert wg.get_sentence() == []
+    # The graph-level diff still accumulates every appended word.
+    assert wg._added_nodes == {"hello", "world"}
+
+
+def test_append_word_matches_add_text():
+    text = "The blue bird flies and sings. The bird sings."
+    by_text = wordGraph.WordGraph(text_window_size=3)
+    by_text.add_text(text)
+    by_word = wordGraph.WordGraph(text_window_size=3)
+    for word in ["the", "blue", "bird", "flies", "and", "sings"]:
+        by_word.append_word(word, ends_sentence=word == "sings")
+    for word in ["the", "bird", "sings"]:
+        by_word.append_word(word, ends_sentence=word == "sings")
+    assert set(by_text.edges(keys=True)) == set(by_word.edges(keys=True))
+    assert by_text.get_window() == by_word.get_window()
+
+
+def _graph_state(wg):
+    nodes = {n: wg.nodes[n]["data"].get_value() for n in wg.nodes()}
+    edges = {(u, v, d["type"], round(float(d["weight"]), 6)) for u, v, d in wg.edges(data=True)}
+    return nodes, edges
+
+
+def test_delete_span_undoes_exactly_the_span():
+    reference = wordGraph.WordGraph(text_window_size=3)
+    reference.add_text("the cat sat on the mat")
+    wg = wordGraph.WordGraph(text_window_size=3)
+    wg.add_text("the cat sat on the mat")
+    wg.add_text("the dog ran")
+    wg.delete_span(6, 9)
+    assert _graph_state(wg) == _graph_state(reference)
+    assert wg.get_window() == reference.get_window()
+    assert wg.get_sentence() == reference.get_sentence()
+
+
+def test_delete_text_removes_latest_occurrence():
+    wg = wordGraph.WordGraph(text_window_size=2)
+    wg.add_text("red fish blue fish")
+    wg.delete_text("fish")
+    assert [t.word for t in wg.tokens] == ["red", "fish", "blue"]
+    assert wg.get_word_node_data("fish").get_value() == 1
+    # The first "fish" keeps its temporal edges, the deleted one's are gone
+    assert wg._has_edge_with_type("red", "fish", "temporal")
+    assert wg._has_edge_with_type("fish", "blue", "temporal")
+    assert not wg._has_edge_with_type("blue", "fish", "temporal")
+    assert wg.get_window() == ["fish", "blue"]
+
+
+def test_replace_span_in_middle():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    wg.add_text("one two three four")
+    wg.replace_span(1, 2, "five")
+    assert [t.word for t in wg.tokens] == ["one", "five", "three", "four"]
+    assert not wg.has_node("two")
+    assert wg._has_edge_with_type("one", "five", "temporal")
+    # The window and open containers take in a span inserted within reach
+    wg = wordGraph.WordGraph(text_window_size=5)
+    wg.add_text("alpha beta gamma delta epsilon zeta")
+    wg.replace_span(3, 4, "omega")
+    assert wg.get_window() == ["beta", "gamma", "omega", "epsilon", "zeta"]
+    assert wg.get_sentence() == ["alpha", "beta", "gamma", "omega", "epsilon", "zeta"]
+    assert wg.get_paragraph() == wg.get_sentence()
+
+
+def test_backspace_reopens_only_the_sentences_it_reaches():
+    wg = wordGraph.WordGraph(text_window_size=2, semantic_threshold=-1.0)
+    for word in ["red", "fish", "blue", "fish", "one", "two"]:
+        wg.append_word(word, ends_sentence=word == "fish")
+    assert wg.get_sentence() == ["one", "two"]
+    wg.delete_span(3, 6)
+    assert wg.get_sentence() == ["blue"]
+    assert wg.get_paragraph() == ["red", "fish", "blue"]
+    assert wg.get_window() == ["fish", "blue"]
+    # Only the first sentence is still merged into the paragraph
+    assert set(wg._paragraph_vocab) == {"red", "fish"}
+    incremental = (wg.get_sentence(), wg.get_paragraph(), dict(wg._paragraph_vocab))
+    wg._rebuild_tail_context()
+    assert (wg.get_sentence(), wg.get_paragraph(), dict(wg._paragraph_vocab)) == incremental
+
+
+def test_token_sequence_blocks():
+    seq = wordGraph.TokenSequence(block_size=4)
+    for i in range(20):
+        seq.append(wordGraph.Token(str(i)))
+    removed = seq.delete(3, 13)
+    assert [t.word for t in removed] == [str(i) for i in range(3, 13)]
+    assert [t.word for t in seq] == ["0", "1", "2"] + [str(i) for i in range(13, 20)]
+    seq.insert(3, [wordGraph.Token("x"), wordGraph.Token("y")])
+    assert seq[3].word == "x" and seq[-1].word == "19"
+    assert [t.word for t in seq.tail(2)] == ["18", "19"]
+    assert seq.rfind(["x", "y", "13"]) == 3
+    assert len(seq) == 12
+
+
+def test_paragraph_edges_are_incremental():
+    # A window of one word and a negative threshold isolates sentence and
+    # paragraph edges from window edges and from the embedding model.
+    wg = wordGraph.WordGraph(text_window_size=1, semantic_threshold=-1.0)
+    wg.add_text("alpha beta. gamma delta.\n\nepsilon zeta.")
+    assert wg._has_edge_with_type("alpha", "delta", "semantic")
+    assert wg._has_edge_with_type("gamma", "beta", "semantic")
+    assert not wg._has_edge_with_type("alpha", "epsilon", "semantic")
+    # The last paragraph stays open until a blank line closes it
+    assert wg.get_paragraph() == ["epsilon", "zeta"]
+    wg.add_text("eta.\n\ntheta")
+    assert wg._has_edge_with_type("eta", "epsilon", "semantic")
+    assert wg.get_paragraph() == ["theta"]
+
+
+def _history_state(wg):
+    return (
+        {n: wg.nodes[n]["data"].get_value() for n in wg.nodes},
+        sorted(wg.edges(keys=True, data="weight")),
+        [token.word for token in wg.tokens],
+        wg.get_window(),
+        wg.get_time(),
+    )
+
+
+def test_checkpoints_undo_redo_and_rollback():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    wg.add_text("The blue bird sings.")
+    wg.checkpoint("start")
+    start = _history_state(wg)
+    wg.add_text("Red fish swim fast.")
+    wg.checkpoint()
+    middle = _history_state(wg)
+    wg.delete_span(1, 3)
+    wg.add_text("Green")
+    tip = _history_state(wg)
+
+    assert wg.undo()
+    assert _history_state(wg) == middle
+    assert wg.undo()
+    assert _history_state(wg) == start
+    assert not wg.undo()
+    assert wg.redo() and wg.redo()
+    assert _history_state(wg) == tip
+    assert not wg.redo()
+
+    wg.rollback("start")
+    assert _history_state(wg) == start
+    # A change after rolling back discards the redo steps, and the graph
+    # carries on exactly as if the undone text had never been added
+    wg.add_text("Owls hoot.")
+    assert not wg.redo()
+    fresh = wordGraph.WordGraph(text_window_size=3)
+    fresh.add_text("The blue bird sings.")
+    fresh.add_text("Owls hoot.")
+    assert _history_state(wg)[:3] == _history_state(fresh)[:3]
+
+
+def test_snapshot_views_are_isolated_from_writers():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    with wg.writer():
+        wg.add_text("The blue bird sings.")
+    before = wg.snapshot()
+    before_edges = sorted(before.edges(keys=True, data="weight"))
+    assert before_edges == sorted(wg.edges(keys=True, data="weight"))
+    assert before.version == wg.version
+
+    wg.add_text("The red bird")
+    # Unpublished changes stay invisible, and old views never change
+    assert wg.snapshot() is before
+    with wg.writer():
+        wg.delete_span(0, 2)
+    after = wg.snapshot()
+    assert sorted(before.edges(keys=True, data="weight")) == before_edges
+    assert before.nodes["the"]["data"].get_value() == 1
+    assert sorted(after.edges(keys=True, data="weight")) == sorted(
+        wg.edges(keys=True, data="weight")
+    )
+    assert after.propagate("bird", 1.0) == wg.propagate("bird", 1.0)
+
+
+def test_views_are_published_lazily():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    published = []
+    publish = wg.publish
+    wg.publish = lambda: published.append(wg.version) or publish()
+    for text in ("The blue bird sings.", "Owls hoot.", "The red bird"):
+        with wg.writer():
+            wg.add_text(text)
+    # Nobody read the batches, so none of them was published
+    assert published == []
+    view = wg.snapshot()
+    assert published == [wg.version] and view.version == wg.version
+    assert set(view.nodes) == set(wg.nodes)
+    assert wg.snapshot() is view
+
+    # A reader during a batch after an unread one gets the previous view
+    # without waiting, and the running batch publishes when it ends
+    with wg.writer():
+        wg.add_text("Owls hunt.")
+    read = []
+    with wg.writer():
+        wg.add_text("Hawks hunt.")
+        reader = threading.Thread(target=lambda: read.append(wg.snapshot()))
+        reader.start()
+        reader.join(timeout=5)
+        assert read == [view]
+    assert len(published) == 2
+    assert wg.snapshot().version == wg.version
+    assert "hawks" in wg.snapshot().nodes and "hawks" not in view.nodes
+
+def test_lemma_graph_follows_additions_and_deletions():
+    wg = wordGraph.WordGraph(text_window_size=3, semantic_threshold=-1.0)
+    wg.add_text("Birds fly. The bird flies.")
+    lemmas = wg.get_lemma_graph()
+    assert lemmas.nodes["bird"]["data"].count == 2
+    assert lemmas.nodes["bird"]["data"].value == 2
+    # birds/fly and bird/fly land on the same lemma edge
+    assert lemmas["bird"]["fly"]["count"] == 2
+    with pytest.raises(nx.NetworkXError):
+        lemmas.add_edge("bird", "owl")
+
+    wg.clear_diff()
+    wg.delete_text("The bird flies.")
+    payload = json.loads(wg.jsonify_diff())["payload"]
+    assert {n["id"]: n["data"]["count"] for n in payload["lemma_nodes"]}["bird"] == 1
+    removed = {n["id"] for n in payload["removed_lemma_nodes"]}
+    assert "the" in removed and "bird" not in removed
+    assert lemmas["bird"]["fly"]["count"] == 1
+    assert not lemmas.has_node("the")
+
+    fresh = wordGraph.WordGraph(text_window_size=3, semantic_threshold=-1.0)
+    fresh.add_text("Birds fly.")
+
+    def lemma_edges(graph):
+        # Lemma edges are undirected, so either orientation may be listed
+        return {
+            frozenset((e.pop("source"), e.pop("target"))): e
+            for e in json.loads(graph.jsonify())["payload"]["lemma_edges"]
+        }
+
+    assert lemma_edges(wg) == lemma_edges(fresh)
+
+
+def test_diff_lists_each_edge_once_in_its_final_state():
+    wg = wordGraph.WordGraph(text_window_size=3)
+    wg.add_text("The bird sings. The bird sings. The bird sings.")
+    # Repeated pairs bump the same edges many times
+    assert len(wg._updated_edges) > len(set(wg._updated_edges))
+    payload = json.loads(wg.jsonify_diff())["payload"]
+    added = [(e["source"], e["target"], e["key"]) for e in payload["added_edges"]]
+    assert len(added) == len(set(added)) == wg.number_of_edges()
+    # Every edge is new, so its updates are folded into the added entry
+    assert payload["updated_edges"] == []
+    assert payload["updated_nodes"] == []
+    assert {(e["source"], e["target"], e["key"]): e["weight"] for e in payload["added_edges"]} == {
+        (u, v, k): d["weight"] for u, v, k, d in wg.edges(keys=True, data=True)
+    }
+
+
+def test_contextual_embeddings_are_running_means(monkeypatch):
+    contexts = {
+        "owls hunt": [("owls", np.array([1.0, 0.0])), ("hunt", np.array([0.0, 1.0]))],
+        "owls sleep": [("owls", np.array([3.0, 0.0])), ("sleep", None)],
+    }
+    calls = []
+
+    def encode_in_context(sentences):
+        calls.append(sentences)
+        return [contexts[s] for s in sentences]
+
+    monkeypatch.setattr(wordGraph.textUtils, "encode_in_context", encode_in_context)
+    wg = wordGraph.WordGraph(text_window_size=3, contextual=True)
+    wg.embedding_memo["sleep"] = np.array([0.0, 2.0])
+    wg.add_text("Owls hunt. Owls sleep.")
+    # One call for the whole text, before any word is linked
+    assert calls == [["owls hunt", "owls sleep"]]
+    assert np.allclose(wg.embedding_memo["owls"], [2.0, 0.0])
+    # Cut off by the model, so the vector encoded on its own is kept
+    assert np.allclose(wg.embedding_memo["sleep"], [0.0, 2.0])
+    assert wg["owls"]["hunt"]
+
+
+def test_frequency_gate_counts_but_does_not_link_saturated_words():
+    gate = frequencyGate.FrequencyGate(min_count=None, stopwords=frequencyGate.FUNCTION_WORDS)
+    wg = wordGraph.WordGraph(text_window_size=4, gate=gate)
+    wg.add_text("The owl and the hawk hunt.\n\nThe owl sleeps.")
+    assert wg.nodes["the"]["data"].get_value() == 3
+    assert wg.degree("the") == wg.degree("and") == 0
+    # Gated tokens leave gaps in the window without shifting the weights
+    ungated = wordGraph.WordGraph(text_window_size=4)
+    ungated.add_text("The owl and the hawk hunt.\n\nThe owl sleeps.")
+    assert wg["owl"]["hawk"] == ungated["owl"]["hawk"]
+
+    # Past min_count and max_share, only every keep_every-th occurrence links
+    gate = frequencyGate.FrequencyGate(min_count=2, max_share=0.2, keep_every=2)
+    wg = wordGraph.WordGraph(text_window_size=2, gate=gate)
+    wg.add_text("owl a owl b owl c owl")
+    linked = [token.linked for token in wg.tokens]
+    assert linked == [True, True, True, True, False, True, True]
+    # Deleting the tail undoes exactly what the gated text added
+    wg.delete_span(5, 7)
+    fresh = wordGraph.WordGraph(text_window_size=2, gate=gate)
+    fresh.add_text("owl a owl b owl")
+    assert sorted(wg.edges(keys=True)) == sorted(fresh.edges(keys=True))
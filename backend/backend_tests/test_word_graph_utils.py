@@ -0,0 +1,61 @@
+import os
+
+import matplotlib
+
+# Rendering is tested headlessly
+matplotlib.use("Agg")
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from backend.Graphs import wordGraphUtils
+
+text = "Owls hunt at night. Hawks hunt by day. Both birds sleep in old trees."
+
+
+def _edge_count(wg, edge_type: str) -> int:
+    return sum(1 for _, _, d in wg.edges(data=True) if d["type"] == edge_type)
+
+
+def test_renderer_updates_artists_in_place():
+    final = wordGraphUtils.WordGraph(text_window_size=4)
+    final.add_text(text)
+    pos = wordGraphUtils._precompute_layout(final)
+
+    fig = Figure(figsize=(4, 3))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    renderer = wordGraphUtils.WordGraphRenderer(ax, pos)
+    semantic, temporal, heads, scatter = renderer.artists()[:4]
+    collections = len(ax.collections)
+
+    wg = wordGraphUtils.WordGraph(text_window_size=4)
+    frames = 0
+    for frame_graph in wg.add_text(text, yield_frames=True, frame_step=3, copy_frames=False):
+        renderer.apply_diff(frame_graph._diff_payload())
+        frame_graph.clear_diff()
+        canvas.draw()
+        frames += 1
+        # The same artists are kept and only their data changes
+        assert renderer.artists()[:4] == [semantic, temporal, heads, scatter]
+        assert len(ax.collections) == collections
+        assert len(scatter.get_offsets()) == frame_graph.number_of_nodes()
+        assert len(temporal.get_segments()) == _edge_count(frame_graph, "temporal")
+        assert len(heads.get_paths()) == len(temporal.get_segments())
+        assert set(renderer._labels) == set(frame_graph.nodes)
+    assert frames > 2
+    # Words after the last full frame
+    renderer.apply_diff(wg._diff_payload())
+    assert len(scatter.get_offsets()) == final.number_of_nodes()
+    assert len(temporal.get_segments()) == _edge_count(final, "temporal")
+
+
+def test_render_graph_building_writes_frames(tmp_path):
+    text_path = tmp_path / "text.txt"
+    text_path.write_text(text)
+    output = tmp_path / "frames"
+    frames = wordGraphUtils.renderGraphBuilding(
+        str(text_path), window_size=4, frame_step=5, output=str(output), dpi=20
+    )
+    assert frames > 1
+    assert sorted(os.listdir(output)) == [f"frame_{i:05d}.png" for i in range(frames)]
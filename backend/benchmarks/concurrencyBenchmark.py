@@ -0,0 +1,111 @@
+"""
+Benchmark readers and a writer sharing one WordGraph under contention.
+
+One writer thread keeps adding sentences while reader threads serialise the
+graph and run subgraph queries. Three read paths are compared:
+
+* ``snapshot``: readers use the latest published ``GraphView`` (no locking)
+* ``locked``: readers hold the graph's write lock and read the live graph
+* ``unsafe``: readers read the live graph with no coordination, which is
+  what the routes did before views; errors are counted
+
+Run from ``backend/``:
+
+    python benchmarks/concurrencyBenchmark.py
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textUtils
+from Graphs import graphQueries
+from Graphs.wordGraph import WordGraph
+
+_letters = random.Random(1)
+VOCABULARY = sorted(
+    {"".join(_letters.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(6)) for _ in range(1500)}
+)
+
+
+def make_paragraph(rng: random.Random, sentences: int = 3, words: int = 10) -> str:
+    return (
+        " ".join(
+            " ".join(rng.choice(VOCABULARY) for _ in range(words)) + "."
+            for _ in range(sentences)
+        )
+        + "\n\n"
+    )
+
+
+def read(graph) -> None:
+    graph.jsonify()
+    graphQueries.top_nodes(graph, 50)
+
+
+def run(mode: str, readers: int, seconds: float, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    wg = WordGraph(text_window_size=10)
+    wg.embedding_memo.update(textUtils.encode_batch(VOCABULARY))
+    with wg.writer():
+        for _ in range(40):
+            wg.add_text(make_paragraph(rng))
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        while not stop.is_set():
+            with wg.writer():
+                wg.add_text(make_paragraph(rng))
+            with lock:
+                counts["writes"] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                if mode == "snapshot":
+                    read(wg.snapshot())
+                elif mode == "locked":
+                    with wg.write_lock:
+                        read(wg)
+                else:
+                    read(wg)
+                key = "reads"
+            except RuntimeError:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader) for _ in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in counts.items()} | {
+        "nodes": wg.number_of_nodes(),
+        "edges": wg.number_of_edges(),
+    }
+
+
+def main():
+    print(f"{'mode':>9} {'readers':>8} {'writes/s':>9} {'reads/s':>8} {'errors/s':>9} {'edges':>7}")
+    for readers in (1, 4):
+        for mode in ("snapshot", "locked", "unsafe"):
+            result = run(mode, readers, seconds=3.0)
+            print(
+                f"{mode:>9} {readers:>8} {result['writes']:>9.1f} {result['reads']:>8.1f} "
+                f"{result['errors']:>9.1f} {result['edges']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Reproducible benchmark suite for the ingestion and query hot paths.
+
+Runs offline: the sentence encoder is replaced by the deterministic
+``StubEncoder`` and the text comes from ``syntheticCorpus``, so two runs of the
+same code on the same machine measure the same work. Every case is timed
+several times on a fresh graph (restored from a pickle, so setup is not
+timed) and the results are written as JSON that a later run can be compared
+against. Embeddings are warmed before timing, since the stub's cost says
+nothing about the real model's. Run from ``backend/``:
+
+    python benchmarks/hotPathBenchmark.py --output baseline.json
+    python benchmarks/hotPathBenchmark.py --baseline baseline.json
+
+``--texts`` also runs the gated ingestion case on real text files, e.g.
+``--texts ../COPYING.txt``, whose words are warmed the same way.
+
+With ``--baseline`` the run exits with status 1 when a case's fastest run is
+slower than the baseline's by more than ``--tolerance``.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textUtils
+from Graphs.frequencyGate import FUNCTION_WORDS, FrequencyGate
+from Graphs.wordGraph import WordGraph
+from stubEncoder import StubEncoder
+from syntheticCorpus import make_corpus, make_vocabulary
+
+SIZES = (1000, 4000, 16000)
+QUICK_SIZES = (500, 2000)
+WINDOWS = (5, 10, 30)
+SENTENCE_LENGTHS = (25, 100, 400)
+WS_SIZES = (100, 400, 1600)
+# Starting fluid for propagate; at 1.0 a walk over a large graph takes seconds
+PROPAGATE_FLUID = 0.8
+
+
+class Suite:
+    def __init__(self, sizes, windows, repeat: int, seed: int = 0, texts=()):
+        self.sizes = sizes
+        self.windows = windows
+        self.repeat = repeat
+        self.seed = seed
+        self.vocabulary = make_vocabulary()
+        self.encoder = StubEncoder()
+        textUtils.set_encoder(self.encoder)
+        self.embeddings = textUtils.encode_batch(self.vocabulary)
+        # file name -> contents, for the cases that also run on real text
+        self.texts = {}
+        for path in texts:
+            with open(path) as f:
+                text = self.texts[os.path.basename(path)] = f.read()
+            words = textUtils.extract_all_text_info(text)["words"]
+            self.embeddings.update(textUtils.encode_batch(words))
+        self.results = []
+        # Kept so progress still shows while the app's output is silenced
+        self.out = sys.stdout
+        self._corpora = {}
+        self._built = {}
+
+    def corpus(self, words: int) -> str:
+        if words not in self._corpora:
+            self._corpora[words] = make_corpus(
+                words, seed=self.seed, vocabulary=self.vocabulary
+            )
+        return self._corpora[words]
+
+    def new_graph(self, window: int = 10) -> WordGraph:
+        graph = WordGraph(text_window_size=window)
+        graph.embedding_memo.update(self.embeddings)
+        return graph
+
+    def built_graph(self, words: int, window: int = 10) -> WordGraph:
+        """A fresh copy of the graph of a corpus, built once per size."""
+        key = (words, window)
+        if key not in self._built:
+            graph = self.new_graph(window)
+            graph.add_text(self.corpus(words))
+            graph.clear_diff()
+            self._built[key] = pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL)
+        return pickle.loads(self._built[key])
+
+    def measure(self, name: str, params: dict, run, setup=lambda: None, **extra):
+        """
+        Time ``run(setup())`` ``repeat`` times with the garbage collector
+        paused, as ``timeit`` does. ``run`` may return a dict of extra figures
+        (sizes, counts) recorded with the last repetition.
+        """
+        times = []
+        for _ in range(self.repeat):
+            state = setup()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                figures = run(state)
+                times.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        result = {
+            "name": name,
+            "params": params,
+            "median": statistics.median(times),
+            "min": min(times),
+            "times": times,
+            **extra,
+            **(figures or {}),
+        }
+        self.results.append(result)
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<22} {label:<28} {result['median'] * 1000:>10.2f} ms", file=self.out)
+        return result
+
+    def run_all(self) -> list[dict]:
+        self.text_info()
+        self.add_text()
+        self.cold_add_text()
+        self.gated_add_text()
+        self.semantic_update()
+        self.delete_text()
+        self.propagate()
+        self.serialise()
+        self.websocket()
+        return self.results
+
+    def text_info(self):
+        for words in self.sizes:
+            text = self.corpus(words)
+            self.measure(
+                "extract_all_text_info",
+                {"words": words},
+                lambda _: {"tokens": len(textUtils.extract_all_text_info(text)["words"])},
+            )
+
+    def add_text(self):
+        for words in self.sizes:
+            text = self.corpus(words)
+            for window in self.windows:
+
+                def run(graph):
+                    graph.add_text(text)
+                    return {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+
+                self.measure(
+                    "add_text",
+                    {"words": words, "window": window},
+                    run,
+                    setup=lambda: self.new_graph(window),
+                )
+
+    def cold_add_text(self):
+        """
+        Ingestion with nothing encoded yet, per word and in context. The
+        stub's time says little about the model's; the number of sequences
+        sent to the encoder is the figure to compare.
+        """
+        for words in self.sizes:
+            text = self.corpus(words)
+            for contextual in (False, True):
+
+                def setup():
+                    textUtils._context_cache.clear()
+                    return WordGraph(text_window_size=10, contextual=contextual)
+
+                def run(graph):
+                    calls, encoded = self.encoder.calls, self.encoder.encoded
+                    graph.add_text(text)
+                    return {
+                        "encoder_calls": self.encoder.calls - calls,
+                        "sequences": self.encoder.encoded - encoded,
+                    }
+
+                self.measure(
+                    "cold_add_text",
+                    {"words": words, "encoding": "context" if contextual else "word"},
+                    run,
+                    setup=setup,
+                )
+
+    def gated_add_text(self):
+        """Ingestion with and without a frequency gate on saturated words."""
+        gates = {
+            "off": None,
+            "skip": FrequencyGate(),
+            "keep_every_8": FrequencyGate(keep_every=8),
+            "stopwords": FrequencyGate(min_count=None, stopwords=FUNCTION_WORDS),
+        }
+        corpora = [({"words": words}, self.corpus(words)) for words in self.sizes]
+        corpora += [({"text": name}, text) for name, text in self.texts.items()]
+        for params, text in corpora:
+            for name, gate in gates.items():
+
+                def setup():
+                    graph = self.new_graph(window=30)
+                    graph.gate = gate
+                    return graph
+
+                def run(graph):
+                    graph.add_text(text)
+                    return {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+
+                self.measure(
+                    "gated_add_text", {**params, "gate": name}, run, setup=setup
+                )
+
+    def semantic_update(self):
+        vocabulary = self.vocabulary
+
+        def open_container(length: int, closed_sentences: int):
+            # Fill the paragraph with closed sentences of 10 words, then leave
+            # a sentence of *length* words open
+            graph = self.new_graph(window=10)
+            position = 0
+            for _ in range(closed_sentences):
+                for i in range(10):
+                    graph._ingest_word(vocabulary[position % 500], ends_sentence=i == 9)
+                    position += 1
+            for _ in range(length):
+                graph._ingest_word(vocabulary[position % 500])
+                position += 1
+            return graph
+
+        for length in SENTENCE_LENGTHS:
+            self.measure(
+                "semantic_update",
+                {"mode": "sentence", "length": length},
+                lambda graph: graph.semantic_update("sentence"),
+                setup=lambda: open_container(length, 0),
+            )
+            self.measure(
+                "semantic_update",
+                {"mode": "paragraph", "length": length},
+                lambda graph: graph.semantic_update("paragraph"),
+                setup=lambda: open_container(10, length // 10),
+            )
+
+    def delete_text(self):
+        for words in self.sizes:
+            paragraphs = self.corpus(words).strip().split("\n\n")
+            for position, paragraph in (
+                ("tail", paragraphs[-1]),
+                ("middle", paragraphs[len(paragraphs) // 2]),
+            ):
+
+                def run(graph):
+                    graph.delete_text(paragraph)
+                    return {"deleted": len(textUtils.split_text(paragraph))}
+
+                self.measure(
+                    "delete_text",
+                    {"words": words, "position": position},
+                    run,
+                    setup=lambda: self.built_graph(words),
+                )
+
+    def propagate(self):
+        for words in self.sizes:
+            graph = self.built_graph(words)
+            starts = sorted(
+                graph.nodes, key=lambda n: -graph.nodes[n]["data"].get_value()
+            )[:10]
+
+            def run(_):
+                return {
+                    "reached": sum(
+                        graph.propagate(start, PROPAGATE_FLUID)[0] for start in starts
+                    )
+                }
+
+            self.measure(
+                "propagate",
+                {"words": words, "starts": len(starts), "fluid": PROPAGATE_FLUID},
+                run,
+            )
+
+    def serialise(self):
+        for words in self.sizes:
+            graph = self.built_graph(words)
+            self.measure(
+                "jsonify",
+                {"words": words},
+                lambda _: {"bytes": len(graph.jsonify())},
+            )
+            paragraph = make_corpus(60, seed=self.seed + 1, vocabulary=self.vocabulary)
+
+            def setup():
+                graph = self.built_graph(words)
+                graph.add_text(paragraph)
+                return graph
+
+            self.measure(
+                "jsonify_diff",
+                {"words": words},
+                lambda graph: {"bytes": len(graph.jsonify_diff())},
+                setup=setup,
+            )
+
+    def websocket(self):
+        try:
+            from fastapi.testclient import TestClient
+
+            import app
+        except ImportError as e:
+            print(f"Skipping the /ws round trip: {e}")
+            return
+        # Time the update itself, not the wait for the next frame
+        app.WS_FRAME_BUDGET_MS = 0
+        client = TestClient(app.app)
+        for words in WS_SIZES:
+            message = json.dumps({"text": self.corpus(words), "mode": "replace"})
+            with client.websocket_connect("/ws") as websocket:
+
+                def run(_):
+                    websocket.send_text(message)
+                    return {"bytes": len(websocket.receive_text())}
+
+                # The app prints every diff; keep that out of the report
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    self.measure("ws_round_trip", {"words": words}, run)
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "networkx": nx.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> bool:
+    """
+    Print how each case's fastest run compares with the baseline's; True if
+    nothing regressed. The minimum is the least noisy statistic on a busy
+    machine, since noise only ever adds time.
+    """
+    previous = {
+        (r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]
+    }
+    ok = True
+    print(f"\n{'case':<52} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for result in results:
+        key = (result["name"], json.dumps(result["params"], sort_keys=True))
+        if key not in previous:
+            continue
+        ratio = result["min"] / previous[key]["min"]
+        flag = ""
+        if ratio > tolerance:
+            flag, ok = "  REGRESSION", False
+        label = result["name"] + " " + " ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(
+            f"{label:<52} {previous[key]['min'] * 1000:>8.2f}ms "
+            f"{result['min'] * 1000:>8.2f}ms {ratio:>6.2f}x{flag}"
+        )
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", help="corpus sizes in words")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(WINDOWS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small corpora, 3 repeats")
+    parser.add_argument("--texts", nargs="+", default=[], help="text files for the gated case")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.2)
+    args = parser.parse_args(argv)
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    repeat = 3 if args.quick else args.repeat
+    suite = Suite(tuple(sizes), tuple(args.windows), repeat, texts=args.texts)
+    results = suite.run_all()
+    report = {
+        "environment": environment(),
+        "config": {
+            "sizes": list(sizes),
+            "windows": list(args.windows),
+            "repeat": repeat,
+            "texts": args.texts,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark paragraph-level semantic linking on synthetic multi-paragraph texts.
+
+Compares the incremental paragraph merge done by ``WordGraph`` against the
+all-pairs pass over every paragraph token that it replaces. Run from
+``backend/``:
+
+    python benchmarks/paragraphBenchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textUtils
+from Graphs.wordGraph import WordGraph
+
+VOCABULARY = (
+    "mind brain conscious experience physical state explain function "
+    "problem theory qualia zombie neuron process world subject feel red "
+    "color see know argument property reduce emerge body thought"
+).split()
+
+
+class QuadraticParagraphGraph(WordGraph):
+    """
+    Reference implementation: links every pair of paragraph tokens when the
+    paragraph closes.
+    """
+
+    def _merge_into_paragraph(self, words, occurrences):
+        return None
+
+    def semantic_update(self, mode: str):
+        if mode == "paragraph":
+            tokens = self.paragraph
+            to_encode = [tok for tok in tokens if tok not in self.embedding_memo]
+            if to_encode:
+                self.embedding_memo.update(textUtils.encode_batch(to_encode))
+            for i in range(len(tokens)):
+                for j in range(i + 1, len(tokens)):
+                    weight = textUtils.cosine_similarity(
+                        self.embedding_memo[tokens[i]], self.embedding_memo[tokens[j]]
+                    )
+                    self.add_semantic_edge(tokens[i], tokens[j], weight=weight)
+        super().semantic_update(mode)
+
+
+def make_text(paragraphs: int, sentences: int, words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(
+            " ".join(rng.choice(VOCABULARY) for _ in range(words)) + "."
+            for _ in range(sentences)
+        )
+        for _ in range(paragraphs)
+    )
+
+
+def time_add_text(graph_class, text: str, window_size: int) -> tuple[float, int]:
+    graph = graph_class(text_window_size=window_size)
+    # Warm the embedding cache so only graph work is measured
+    graph.embedding_memo.update(textUtils.encode_batch(VOCABULARY))
+    start = time.perf_counter()
+    graph.add_text(text)
+    return time.perf_counter() - start, graph.number_of_edges()
+
+
+def main():
+    print(f"{'paragraphs':>10} {'sentences':>10} {'incremental':>12} {'quadratic':>10} {'edges':>12}")
+    for paragraphs, sentences in [(4, 4), (8, 8), (8, 16), (16, 32)]:
+        text = make_text(paragraphs, sentences, words=10)
+        incremental, edges = time_add_text(WordGraph, text, window_size=10)
+        quadratic, reference_edges = time_add_text(
+            QuadraticParagraphGraph, text, window_size=10
+        )
+        print(
+            f"{paragraphs:>10} {sentences:>10} {incremental:>11.3f}s {quadratic:>9.3f}s "
+            f"{edges:>5}/{reference_edges:<6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
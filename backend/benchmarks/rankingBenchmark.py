@@ -0,0 +1,72 @@
+"""
+Benchmark incremental PageRank against full recomputes while text streams in.
+
+After every added sentence the tracker's scores are refreshed and compared
+with a full power-iteration recompute and with ``nx.pagerank``. Run from
+``backend/``:
+
+    python benchmarks/rankingBenchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textUtils
+from Graphs.graphRanking import RankTracker, pagerank_reference
+from Graphs.wordGraph import WordGraph
+
+_letters = random.Random(1)
+VOCABULARY = sorted(
+    {"".join(_letters.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(6)) for _ in range(6000)}
+)
+
+
+def make_sentence(rng: random.Random, words: int = 10) -> str:
+    # Skewed word choice so some words matter more than others
+    return " ".join(
+        VOCABULARY[int(len(VOCABULARY) * rng.random() ** 3)] for _ in range(words)
+    ) + ".\n\n"
+
+
+def main(sentences: int = 800, k: int = 20):
+    rng = random.Random(0)
+    wg = WordGraph(text_window_size=10)
+    wg.embedding_memo.update(textUtils.encode_batch(VOCABULARY))
+    tracker = RankTracker(wg)
+    incremental = full = networkx = 0.0
+    for i in range(1, sentences + 1):
+        wg.add_text(make_sentence(rng))
+        start = time.perf_counter()
+        tracker.top_k(k)
+        wg.clear_diff()
+        incremental += time.perf_counter() - start
+        if i % 200:
+            continue
+        start = time.perf_counter()
+        reference = pagerank_reference(wg)
+        full += time.perf_counter() - start
+        start = time.perf_counter()
+        nx_scores = nx.pagerank(wg, weight="weight")
+        networkx += time.perf_counter() - start
+        scores = tracker.pagerank()
+        error = max(abs(scores[n] - reference[n]) for n in reference)
+        top = {n for n, _ in tracker.top_k(k)}
+        top_reference = set(sorted(reference, key=reference.get)[-k:])
+        top_nx = set(sorted(nx_scores, key=nx_scores.get)[-k:])
+        print(
+            f"{i:>5} sentences {wg.number_of_nodes():>5} nodes {wg.number_of_edges():>7} edges | "
+            f"incremental {incremental / i * 1000:7.2f} ms/update, "
+            f"full {full / (i // 200) * 1000:7.1f} ms, nx {networkx / (i // 200) * 1000:7.1f} ms | "
+            f"max error {error:.1e}, top-{k} overlap {len(top & top_reference)}/{k} "
+            f"(nx {len(top & top_nx)}/{k})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark a ShardedWordGraph against a single WordGraph.
+
+Ingests the same synthetic documents into one WordGraph and into sharded
+graphs with an increasing number of worker processes, then times
+``propagate`` and ``ego_network`` on the most frequent words. Shards only
+speed ingestion up when the machine has a core per worker. Run from
+``backend/``:
+
+    python benchmarks/shardBenchmark.py --shards 1 2 4 --documents 32
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textUtils
+from Graphs import graphQueries
+from Graphs.shardedGraph import ShardedWordGraph
+from Graphs.wordGraph import WordGraph
+from stubEncoder import StubEncoder
+from syntheticCorpus import make_corpus, make_vocabulary
+
+
+def time_queries(graph, words: list[str], ego_network) -> tuple[float, float]:
+    """Mean milliseconds per ``propagate`` and per two-hop ego network."""
+    started = time.perf_counter()
+    for word in words:
+        graph.propagate(word, 1.0)
+    propagate_ms = 1000 * (time.perf_counter() - started) / len(words)
+    started = time.perf_counter()
+    for word in words:
+        ego_network(word)
+    return propagate_ms, 1000 * (time.perf_counter() - started) / len(words)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--documents", type=int, default=32)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=5)
+    args = parser.parse_args(argv)
+    encoder = StubEncoder()
+    textUtils.set_encoder(encoder)
+    vocabulary = make_vocabulary()
+    documents = [
+        make_corpus(args.words, seed=i, vocabulary=vocabulary) for i in range(args.documents)
+    ]
+    total_words = args.documents * args.words
+
+    started = time.perf_counter()
+    single = WordGraph(text_window_size=args.window)
+    for text in documents:
+        single.add_text(text.rstrip() + "\n\n", reset_window=True)
+    ingest = time.perf_counter() - started
+    top = sorted(single.nodes, key=lambda n: -single.nodes[n]["data"].get_value())
+    words = top[: args.queries]
+    propagate_ms, ego_ms = time_queries(
+        single, words, lambda word: graphQueries.ego_network(single, word, hops=2)
+    )
+    print(
+        f"{'shards':>6} {'words/s':>9} {'propagate ms':>13} {'ego ms':>8} "
+        f"{'edges':>8}  nodes/edges per shard"
+    )
+    print(
+        f"{'single':>6} {total_words / ingest:>9.0f} {propagate_ms:>13.2f} {ego_ms:>8.2f} "
+        f"{single.number_of_edges():>8}"
+    )
+
+    for shards in args.shards:
+        with ShardedWordGraph(shards, encoder=encoder, text_window_size=args.window) as sharded:
+            started = time.perf_counter()
+            sharded.add_documents(documents)
+            ingest = time.perf_counter() - started
+            propagate_ms, ego_ms = time_queries(
+                sharded, words, lambda word: sharded.ego_network(word, hops=2)
+            )
+            stats = sharded.stats()
+            layout = " ".join(f"{s['nodes']}/{s['edges']}" for s in stats)
+            print(
+                f"{shards:>6} {total_words / ingest:>9.0f} {propagate_ms:>13.2f} {ego_ms:>8.2f} "
+                f"{sum(s['edges'] for s in stats):>8}  {layout}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
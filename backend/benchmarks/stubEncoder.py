@@ -0,0 +1,97 @@
+"""
+Deterministic stand-in for the sentence encoder, so benchmarks run offline
+and give the same graphs on every machine.
+
+Each text gets a fixed pseudo-random vector derived from a hash of the text,
+pulled towards one of a few topic directions. Texts that share a topic score
+about 0.6 against each other and unrelated texts about 0, so a semantic
+threshold of 0.5 keeps roughly ``1 / topics`` of the word pairs, like the
+real model does on ordinary prose.
+
+It also mimics the tokenizer and the ``token_embeddings`` output that
+contextual encoding uses: words are split into subwords of up to four
+characters, and each subword's vector is its word's vector shifted towards
+the sentence's mean, so a word's pooled vector depends on its context.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_SUBWORD_LENGTH = 4
+
+
+class StubEncoder:
+    """
+    Drop-in for ``SentenceTransformer.encode``; install it with
+    ``textUtils.set_encoder(StubEncoder())``.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 384,
+        topics: int = 20,
+        topic_weight: float = 1.25,
+        context_weight: float = 0.3,
+        max_seq_length: int = 256,
+    ):
+        self.dimensions = dimensions
+        self.topic_weight = topic_weight
+        self.context_weight = context_weight
+        self.max_seq_length = max_seq_length
+        rng = np.random.default_rng(0)
+        topic_vectors = rng.normal(size=(topics, dimensions))
+        self._topics = topic_vectors / np.linalg.norm(topic_vectors, axis=1, keepdims=True)
+        self.calls = 0
+        self.encoded = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        seed = int.from_bytes(digest, "little")
+        rng = np.random.default_rng(seed)
+        noise = rng.normal(size=self.dimensions) / np.sqrt(self.dimensions)
+        topic = self._topics[seed % len(self._topics)]
+        return (self.topic_weight * topic + noise).astype(np.float32)
+
+    def _spans(self, sentence: str, max_length: int | None = None) -> list[tuple[int, int]]:
+        spans = [(0, 0)]
+        for match in _WORD.finditer(sentence):
+            for start in range(match.start(), match.end(), _SUBWORD_LENGTH):
+                spans.append((start, min(start + _SUBWORD_LENGTH, match.end())))
+        limit = (max_length or self.max_seq_length) - 1
+        return spans[:limit] + [(0, 0)]
+
+    def tokenizer(self, sentences, return_offsets_mapping=False, max_length=None, **kwargs):
+        return {"offset_mapping": [self._spans(s, max_length) for s in sentences]}
+
+    def _token_embeddings(self, sentence: str) -> np.ndarray:
+        spans = self._spans(sentence)
+        words = {m.start(): m.group() for m in _WORD.finditer(sentence)}
+        if not words:
+            return np.zeros((len(spans), self.dimensions), dtype=np.float32)
+        vectors = {start: self._vector(word) for start, word in words.items()}
+        context = self.context_weight * np.mean(list(vectors.values()), axis=0)
+        starts = sorted(vectors)
+        rows = []
+        for start, end in spans:
+            if end <= start:
+                rows.append(context)
+                continue
+            owner = starts[np.searchsorted(starts, start, side="right") - 1]
+            rows.append(vectors[owner] + context)
+        return np.stack(rows).astype(np.float32)
+
+    def encode(self, sentences, output_value: str = "sentence_embedding", **kwargs):
+        self.calls += 1
+        if output_value == "token_embeddings":
+            self.encoded += len(sentences)
+            return [self._token_embeddings(sentence) for sentence in sentences]
+        if isinstance(sentences, str):
+            self.encoded += 1
+            return self._vector(sentences)
+        self.encoded += len(sentences)
+        if not sentences:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.stack([self._vector(text) for text in sentences])
@@ -0,0 +1,55 @@
+"""
+Synthetic, reproducible corpora for benchmarks.
+
+Words are made of syllables so they look enough like English for the
+lemmatizer, and are drawn from a Zipf-like distribution so a few words are
+very frequent, as in real text. Sentences and paragraphs vary in length.
+"""
+
+import random
+
+_SYLLABLES = [
+    onset + vowel + coda
+    for onset in ("b", "c", "d", "f", "g", "l", "m", "n", "p", "r", "s", "t", "v")
+    for vowel in ("a", "e", "i", "o", "u")
+    for coda in ("", "n", "r", "s", "t")
+]
+
+
+def make_vocabulary(size: int = 5000, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    words = {}
+    while len(words) < size:
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3)))
+        words.setdefault(word, None)
+    return list(words)
+
+
+def make_corpus(
+    words: int,
+    seed: int = 0,
+    vocabulary: list[str] | None = None,
+    sentence_length: tuple[int, int] = (6, 18),
+    paragraph_length: tuple[int, int] = (2, 6),
+    zipf_exponent: float = 1.1,
+) -> str:
+    """
+    About *words* words of text, split into sentences and paragraphs. The same
+    arguments always give the same text.
+    """
+    rng = random.Random(seed)
+    vocabulary = vocabulary or make_vocabulary()
+    weights = [1 / (rank + 1) ** zipf_exponent for rank in range(len(vocabulary))]
+    drawn = rng.choices(vocabulary, weights=weights, k=words)
+    paragraphs, sentences, position = [], [], 0
+    paragraph_size = rng.randint(*paragraph_length)
+    while position < len(drawn):
+        length = rng.randint(*sentence_length)
+        sentence = drawn[position : position + length]
+        position += length
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        if len(sentences) == paragraph_size or position >= len(drawn):
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+            paragraph_size = rng.randint(*paragraph_length)
+    return "\n\n".join(paragraphs) + "\n"
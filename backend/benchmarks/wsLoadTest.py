@@ -0,0 +1,289 @@
+"""
+Load test for the ``/ws`` endpoint with simulated typing clients.
+
+Starts ``app.py`` in a local server process with the ``StubEncoder``, then
+connects N clients that each type a synthetic document at a realistic
+cadence. Like ``App.jsx``, a client sends ``{"text": <whole document>,
+"mode": "add"}`` every time a word is finished. The report gives update
+latency percentiles, payload sizes, and the server's CPU and memory sampled
+over time. Everything runs on localhost, so no network access or model
+download is needed. Run from ``backend/``:
+
+    python benchmarks/wsLoadTest.py --clients 1 4 16 --duration 20
+
+Latency is the time from sending a message to receiving the first diff that
+covers it. Each message carries a ``seq`` that the server acknowledges after
+the diff; the server may skip messages a newer one superseded, and those
+count as covered by the newer message's diff.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+import websockets
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+from syntheticCorpus import make_corpus, make_vocabulary
+
+
+def serve(port: int) -> None:
+    """Run the app with the stub encoder; this is the server process."""
+    import uvicorn
+
+    import textUtils
+    from stubEncoder import StubEncoder
+
+    textUtils.set_encoder(StubEncoder())
+    import app
+
+    uvicorn.run(app.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(port: int, spill_dir: str) -> subprocess.Popen:
+    env = dict(os.environ, SESSION_SPILL_DIR=spill_dir)
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port)],
+        cwd=BACKEND,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start within 60 s")
+
+
+class ProcessSampler:
+    """
+    Samples a process's CPU use and resident memory once per ``interval``,
+    from psutil when it is installed and ``/proc`` otherwise.
+    """
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        try:
+            import psutil
+
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _read(self) -> tuple[float, int]:
+        """Total CPU seconds and resident bytes."""
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system, self._process.memory_info().rss
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / self._ticks
+        with open(f"/proc/{self.pid}/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+
+    async def run(self, stop: asyncio.Event) -> None:
+        start = time.monotonic()
+        last_time, (last_cpu, _) = start, self._read()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            now = time.monotonic()
+            cpu, rss = self._read()
+            self.samples.append(
+                {
+                    "t": round(now - start, 2),
+                    "cpu_percent": round(100 * (cpu - last_cpu) / (now - last_time), 1),
+                    "rss_mb": round(rss / 2**20, 1),
+                }
+            )
+            last_time, last_cpu = now, cpu
+
+
+async def typist(
+    port: int,
+    document: str,
+    words_per_minute: float,
+    duration: float,
+    rng: random.Random,
+    stats: dict,
+) -> None:
+    """
+    Types *document* word by word, sending the whole text after each word,
+    until the document or the time runs out; then waits for the replies
+    still in flight.
+    """
+    url = f"ws://127.0.0.1:{port}/ws?session_id={uuid.uuid4().hex}"
+    # (seq, send time) of messages no diff has covered yet, oldest first
+    pending = []
+    async with websockets.connect(url, max_size=None) as websocket:
+
+        async def receive():
+            diff_received = None
+            async for message in websocket:
+                received = time.perf_counter()
+                reply = json.loads(message)
+                if reply["type"] in ("diff", "full"):
+                    diff_received = received
+                    stats["payload_bytes"].append(len(message.encode("utf-8")))
+                elif reply["type"] == "ack":
+                    stats["superseded"] += reply["superseded"]
+                    while pending and pending[0][0] <= reply["seq"]:
+                        stats["latencies"].append(diff_received - pending.pop(0)[1])
+
+        receiver = asyncio.create_task(receive())
+        # Each word with the space or newlines that follow it
+        words = re.findall(r"\S+\s*", document)
+        # Average word plus its space is about 6 characters
+        seconds_per_character = 60 / (words_per_minute * 6)
+        deadline = time.monotonic() + duration
+        typed = []
+        for word in words:
+            if time.monotonic() >= deadline:
+                break
+            typing = len(word) * seconds_per_character
+            await asyncio.sleep(typing * rng.uniform(0.5, 1.5))
+            typed.append(word)
+            seq = len(typed)
+            pending.append((seq, time.perf_counter()))
+            await websocket.send(
+                json.dumps({"text": "".join(typed), "mode": "add", "seq": seq})
+            )
+            stats["sent"] += 1
+        drain_until = time.monotonic() + max(30.0, duration)
+        while pending and time.monotonic() < drain_until:
+            await asyncio.sleep(0.05)
+        stats["unanswered"] += len(pending)
+        receiver.cancel()
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_level(
+    port: int, server_pid: int, clients: int, duration: float, words_per_minute: float
+) -> dict:
+    vocabulary = make_vocabulary()
+    stats = {"latencies": [], "payload_bytes": [], "sent": 0, "superseded": 0, "unanswered": 0}
+    sampler = ProcessSampler(server_pid)
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop))
+    started = time.monotonic()
+    await asyncio.gather(
+        *(
+            typist(
+                port,
+                make_corpus(4000, seed=i, vocabulary=vocabulary),
+                words_per_minute,
+                duration,
+                random.Random(i),
+                stats,
+            )
+            for i in range(clients)
+        )
+    )
+    elapsed = time.monotonic() - started
+    stop.set()
+    await sampling
+    latencies = [t * 1000 for t in stats["latencies"]]
+    payloads = stats["payload_bytes"]
+    cpu = [s["cpu_percent"] for s in sampler.samples]
+    rss = [s["rss_mb"] for s in sampler.samples]
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "sent": stats["sent"],
+        "answered": len(latencies),
+        "superseded": stats["superseded"],
+        "unanswered": stats["unanswered"],
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=float("nan")),
+        },
+        "payload_bytes": {
+            "mean": statistics.fmean(payloads) if payloads else float("nan"),
+            "p95": percentile(payloads, 95),
+            "total": sum(payloads),
+        },
+        "server": {
+            "cpu_percent_mean": statistics.fmean(cpu) if cpu else float("nan"),
+            "cpu_percent_max": max(cpu, default=float("nan")),
+            "rss_mb_max": max(rss, default=float("nan")),
+            "samples": sampler.samples,
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of typing per level")
+    parser.add_argument("--wpm", type=float, default=60.0, help="typing speed per client")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default="ws-load-results.json")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.serve:
+        serve(args.port)
+        return 0
+    with tempfile.TemporaryDirectory() as spill_dir:
+        server = start_server(args.port, spill_dir)
+        try:
+            results = []
+            print(
+                f"{'clients':>7} {'sent':>6} {'skipped':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'KB/msg':>7} {'cpu %':>6} {'rss MB':>7}"
+            )
+            for clients in args.clients:
+                result = asyncio.run(
+                    run_level(args.port, server.pid, clients, args.duration, args.wpm)
+                )
+                results.append(result)
+                latency, server_stats = result["latency_ms"], result["server"]
+                print(
+                    f"{clients:>7} {result['sent']:>6} {result['superseded']:>7} "
+                    f"{latency['p50']:>8.1f} "
+                    f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+                    f"{result['payload_bytes']['mean'] / 1024:>7.1f} "
+                    f"{server_stats['cpu_percent_mean']:>6.0f} {server_stats['rss_mb_max']:>7.0f}"
+                )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    with open(args.output, "w") as f:
+        json.dump({"config": vars(args), "results": results}, f, indent=2)
+    print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
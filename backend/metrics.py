@@ -0,0 +1,270 @@
+"""
+Low-overhead timers and counters for the ingestion hot path, rendered in the
+Prometheus text format.
+
+Stages (``tokenize``, ``lemmatize``, ``encode``, ``edges``, ``layout`` and
+``json``) are timed exclusively: time spent in a stage nested inside another
+counts only for the inner one, so the stage totals add up to the time spent
+in instrumented code.
+Collection is off unless enabled, with ``HOT_PATH_METRICS=1`` or ``enable()``.
+A ``trace()`` block collects the same figures for one request whether or not
+global collection is on. When neither is active a probe costs a function
+call and two attribute checks.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "dreaming_hawk"
+STAGES = ("tokenize", "lemmatize", "encode", "edges", "layout", "json")
+# Upper bounds, in seconds, of the per-call stage histogram buckets
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_HELP = {
+    "stage_seconds": "Time spent in each hot-path stage, excluding nested stages.",
+    "embedding_cache_hits": "Words whose embedding was already memoised.",
+    "embedding_cache_misses": "Words sent to the encoder.",
+    "lemma_cache_hits": "Words whose lemmas were already memoised.",
+    "lemma_cache_misses": "Words sent to the lemmatizer.",
+    "context_cache_hits": "Sentences whose contextual word vectors were cached.",
+    "context_cache_misses": "Sentences sent to the encoder for contextual word vectors.",
+    "texts_encoded": "Texts encoded by the sentence encoder.",
+    "words_ingested": "Word occurrences added to a graph.",
+    "occurrences_gated": "Word occurrences kept from creating edges by a frequency gate.",
+    "edges_added": "Edges added to a graph.",
+    "edges_updated": "Edge weights changed in a graph.",
+    "edges_removed": "Edges removed from a graph.",
+    "ws_messages_superseded": "WebSocket updates dropped for a newer one.",
+    "payload_size": "Size of serialised graph payloads, in characters.",
+}
+
+
+def _key(name: str, labels: dict | None) -> tuple:
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def _format_labels(labels, extra: tuple = ()) -> str:
+    pairs = tuple(labels) + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    """
+    Process-wide stage histograms, counters and summaries (a sum and a count,
+    e.g. payload sizes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            # stage -> [bucket counts..., +Inf count], [sum of seconds]
+            self.stages = {}
+            self.counters = {}
+            # (name, labels) -> [sum, count]
+            self.summaries = {}
+        return None
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [[0] * (len(BUCKETS) + 1), 0.0]
+            buckets = entry[0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            entry[1] += seconds
+        return None
+
+    def count(self, name: str, amount: float = 1, labels: dict | None = None) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        return None
+
+    def observe(self, name: str, value: float, labels: dict | None = None) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            entry = self.summaries.setdefault(key, [0.0, 0])
+            entry[0] += value
+            entry[1] += 1
+        return None
+
+    def render(self, gauges: dict | None = None) -> str:
+        """
+        The registry in the Prometheus text exposition format. *gauges* maps
+        a metric name to its current value, or to ``(help, value)``.
+        """
+        lines = []
+
+        def header(name: str, kind: str, help_text: str | None = None):
+            text = help_text or _HELP.get(name)
+            if text:
+                lines.append(f"# HELP {PREFIX}_{name} {text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        with self._lock:
+            stages = {stage: (list(b), s) for stage, (b, s) in self.stages.items()}
+            counters = dict(self.counters)
+            summaries = {key: tuple(entry) for key, entry in self.summaries.items()}
+        if stages:
+            header("stage_seconds", "histogram")
+            for stage, (buckets, total) in sorted(stages.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), buckets):
+                    cumulative += count
+                    labels = _format_labels((("stage", stage), ("le", bound)))
+                    lines.append(f"{PREFIX}_stage_seconds_bucket{labels} {cumulative}")
+                labels = _format_labels((("stage", stage),))
+                lines.append(f"{PREFIX}_stage_seconds_sum{labels} {total}")
+                lines.append(f"{PREFIX}_stage_seconds_count{labels} {cumulative}")
+        for name in sorted({name for name, _ in counters}):
+            header(name, "counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{PREFIX}_{name}_total{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in summaries}):
+            header(name, "summary")
+            for (summary, labels), (total, count) in sorted(summaries.items()):
+                if summary == name:
+                    lines.append(f"{PREFIX}_{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{PREFIX}_{name}_count{_format_labels(labels)} {count}")
+        for name, value in (gauges or {}).items():
+            help_text, value = value if isinstance(value, tuple) else (None, value)
+            header(name, "gauge", help_text)
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class Trace:
+    """Stage times and counters collected for a single request."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.summaries = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {
+                stage: {"seconds": seconds, "calls": calls}
+                for stage, (seconds, calls) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "summaries": dict(self.summaries),
+        }
+
+
+class _Local(threading.local):
+    def __init__(self):
+        self.trace = None
+        # Open stage timers, innermost last
+        self.stack = []
+
+
+registry = Registry()
+enabled = os.environ.get("HOT_PATH_METRICS", "").lower() in ("1", "true", "yes")
+_local = _Local()
+
+
+def enable(on: bool = True) -> None:
+    global enabled
+    enabled = on
+    return None
+
+
+def active() -> bool:
+    """Whether probes currently record anything; guards costly measurements."""
+    return enabled or _local.trace is not None
+
+
+class _StageTimer:
+    __slots__ = ("name", "start", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        _local.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        seconds = elapsed - self.children
+        if enabled:
+            registry.observe_stage(self.name, seconds)
+        trace = _local.trace
+        if trace is not None:
+            entry = trace.stages.setdefault(self.name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name: str):
+    """Context manager timing a block as one call of *name*."""
+    if not enabled and _local.trace is None:
+        return _NULL_TIMER
+    return _StageTimer(name)
+
+
+def count(name: str, amount: float = 1, labels: dict | None = None) -> None:
+    if enabled:
+        registry.count(name, amount, labels)
+    trace = _local.trace
+    if trace is not None:
+        key = name if not labels else name + _format_labels(sorted(labels.items()))
+        trace.counters[key] = trace.counters.get(key, 0) + amount
+    return None
+
+
+def observe(name: str, value: float, labels: dict | None = None) -> None:
+    if enabled:
+        registry.observe(name, value, labels)
+    trace = _local.trace
+    if trace is not None:
+        key = name if not labels else name + _format_labels(sorted(labels.items()))
+        entry = trace.summaries.setdefault(key, [0.0, 0])
+        entry[0] += value
+        entry[1] += 1
+    return None
+
+
+@contextmanager
+def trace():
+    """Collect the figures of the enclosed work, e.g. one request, into a Trace."""
+    current = Trace()
+    previous, _local.trace = _local.trace, current
+    try:
+        yield current
+    finally:
+        _local.trace = previous
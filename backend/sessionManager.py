@@ -0,0 +1,395 @@
+import os
+import sys
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Add this directory to the system path to find the Graphs package
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Graphs.opLog import OpLog
+from Graphs.wordGraph import WordGraph
+
+_SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Rough per-item costs used to keep the resident sessions under a memory cap
+_NODE_BYTES = 600
+_EDGE_BYTES = 400
+_TOKEN_BYTES = 200
+
+
+def estimate_graph_bytes(graph: WordGraph) -> int:
+    """
+    Cheap O(1) estimate of the memory held by a WordGraph.
+    """
+    embedding_bytes = 0
+    if graph.embedding_memo:
+        sample = next(iter(graph.embedding_memo.values()))
+        embedding_bytes = len(graph.embedding_memo) * (sample.nbytes + 100)
+    return (
+        graph.number_of_nodes() * _NODE_BYTES
+        + graph.number_of_edges() * _EDGE_BYTES
+        + len(graph.tokens) * _TOKEN_BYTES
+        + embedding_bytes
+    )
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class SessionManager:
+    """
+    Registry of WordGraph sessions keyed by session ID.
+
+    Resident graphs are kept in LRU order. When their estimated size exceeds
+    ``max_memory_bytes``, or a session has been idle for ``idle_seconds``, the
+    least recently used graphs are spilled to ``spill_dir`` as compressed
+    pickles and rehydrated on their next access. Spilled graphs are taken out
+    of the registry under its lock but written without it, so requests for
+    other sessions never wait on disk; a request for a session that is being
+    spilled waits for the write and rehydrates it. A session leased with
+    ``lease`` is pinned in memory until the lease ends, so a request never
+    writes to a graph that another request has spilled. ``on_release`` is
+    called with a session's ID whenever its graph leaves memory or is
+    replaced, so caches of it can be dropped.
+
+    With ``log_operations`` every change to a session is written ahead to an
+    operation log in ``spill_dir`` instead, so sessions also survive a crash
+    of the server: a session is spilled by closing its log and rehydrated,
+    after a spill or a restart, by recovering the graph from it.
+    """
+
+    def __init__(
+        self,
+        spill_dir: str | None = None,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        idle_seconds: float = 600.0,
+        text_window_size: int = 30,
+        semantic_threshold: float = 0.5,
+        contextual: bool = False,
+        log_operations: bool = False,
+        on_release=None,
+    ):
+        if spill_dir is None:
+            spill_dir = os.path.join(tempfile.gettempdir(), "dreaming-hawk-sessions")
+        os.makedirs(spill_dir, exist_ok=True)
+        self.spill_dir = spill_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_seconds = idle_seconds
+        self.text_window_size = text_window_size
+        self.semantic_threshold = semantic_threshold
+        self.contextual = contextual
+        self.log_operations = log_operations
+        self.on_release = on_release
+        # session_id -> [graph, last access time, estimated bytes, leases]
+        self._sessions = OrderedDict()
+        # session_id -> Event set once the session has been written out
+        self._spilling = {}
+        self._lock = threading.RLock()
+
+    def _new_graph(self) -> WordGraph:
+        return WordGraph(
+            text_window_size=self.text_window_size,
+            semantic_threshold=self.semantic_threshold,
+            contextual=self.contextual,
+        )
+
+    def _spill_path(self, session_id: str) -> str:
+        if not _SESSION_ID_PATTERN.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.spill_dir, session_id + ".graph")
+
+    def _log_dir(self, session_id: str) -> str:
+        return os.path.splitext(self._spill_path(session_id))[0] + ".oplog"
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return (
+                session_id in self._sessions
+                or session_id in self._spilling
+                or os.path.exists(self._spill_path(session_id))
+                or os.path.exists(self._log_dir(session_id))
+            )
+
+    def resident_sessions(self) -> list[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry[2] for entry in self._sessions.values())
+
+    def resident_graphs(self) -> list[WordGraph]:
+        with self._lock:
+            return [entry[0] for entry in self._sessions.values()]
+
+    def get(self, session_id: str, create: bool = True) -> WordGraph:
+        """
+        Return the graph for *session_id*, rehydrating it from disk or creating
+        it if needed, and mark it as most recently used. With ``create=False``
+        an unknown session raises KeyError instead.
+        """
+        return self._acquire(session_id, create)[0]
+
+    def _acquire(self, session_id: str, create: bool, lease: bool = False) -> list:
+        with self._settled(session_id):
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                graph = self._restore(session_id)
+                if graph is None:
+                    if not create:
+                        raise KeyError(f"Unknown session: {session_id!r}")
+                    graph = self._new_graph()
+                    self._start_log(session_id, graph)
+                entry = [graph, 0.0, 0, 0]
+                self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            entry[1] = time.monotonic()
+            entry[3] += lease
+            victims = self._idle_victims(entry[1])
+        self._store(victims)
+        return entry
+
+    @contextmanager
+    def _settled(self, session_id: str):
+        """
+        Context holding the lock while *session_id* is not being spilled,
+        waiting without the lock for a spill in progress to finish.
+        """
+        while True:
+            with self._lock:
+                pending = self._spilling.get(session_id)
+                if pending is None:
+                    yield
+                    return None
+            pending.wait()
+
+    def _restore(self, session_id: str) -> WordGraph | None:
+        """
+        Bring a session that is not resident back from disk, or return None
+        if there is nothing stored for it.
+        """
+        log_dir = self._log_dir(session_id)
+        if self.log_operations and os.path.exists(log_dir):
+            try:
+                return OpLog.recover(log_dir).graph
+            except FileNotFoundError:
+                # Created but never written to before a crash
+                shutil.rmtree(log_dir, ignore_errors=True)
+        path = self._spill_path(session_id)
+        if not os.path.exists(path):
+            return None
+        graph = self._load(path)
+        os.remove(path)
+        self._start_log(session_id, graph)
+        return graph
+
+    def _start_log(self, session_id: str, graph: WordGraph) -> None:
+        if not self.log_operations:
+            return None
+        oplog = OpLog(self._log_dir(session_id))
+        oplog.reset(graph)
+        # A graph that already holds text starts its log from a snapshot
+        if graph.number_of_nodes() or len(graph.tokens):
+            oplog.compact()
+        return None
+
+    @contextmanager
+    def lease(self, session_id: str, create: bool = True):
+        """
+        Context yielding the graph for *session_id*, as ``get`` does, pinned
+        in memory until the block exits.
+        """
+        entry = self._acquire(session_id, create, lease=True)
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[3] -= 1
+
+    def touch(self, session_id: str) -> None:
+        """
+        Refresh a session's size estimate after it was mutated and enforce
+        the memory cap.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] = time.monotonic()
+            entry[2] = estimate_graph_bytes(entry[0])
+            victims = self._enforce_memory_cap(keep=session_id)
+        self._store(victims)
+        return None
+
+    def reset(self, session_id: str) -> WordGraph:
+        """
+        Replace a session's graph with an empty one.
+        """
+        path = self._spill_path(session_id)
+        with self._settled(session_id):
+            if os.path.exists(path):
+                os.remove(path)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = [None, 0.0, 0, 0]
+            else:
+                self._close_log(entry[0])
+            graph = self._new_graph()
+            self._start_log(session_id, graph)
+            # Updated in place so that leases on the session carry over
+            entry[0:3] = [graph, time.monotonic(), 0]
+            self._sessions.move_to_end(session_id)
+            self._released(session_id)
+            return entry[0]
+
+    def drop(self, session_id: str) -> None:
+        """
+        Forget a session entirely, in memory and on disk.
+        """
+        path = self._spill_path(session_id)
+        with self._settled(session_id):
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._close_log(entry[0])
+            if os.path.exists(path):
+                os.remove(path)
+            shutil.rmtree(self._log_dir(session_id), ignore_errors=True)
+            self._released(session_id)
+        return None
+
+    def spill(self, session_id: str) -> None:
+        """
+        Write a resident session to disk and release it from memory, unless
+        it is leased.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[3]:
+                return None
+            victims = [self._take(session_id)]
+        self._store(victims)
+        return None
+
+    def _take(self, session_id: str) -> tuple:
+        """
+        Take a resident session out of the registry to be spilled by
+        ``_store`` once the lock is released. Call with the lock held.
+        """
+        self._spilling[session_id] = threading.Event()
+        return session_id, self._sessions.pop(session_id)
+
+    def _store(self, victims: list) -> None:
+        """
+        Write out sessions taken by ``_take``. Call without the lock, so the
+        pickling, compression and writes block nobody but requests for these
+        sessions. A session that fails to be written stays resident.
+        """
+        error = None
+        for session_id, entry in victims:
+            graph = entry[0]
+            stored = False
+            try:
+                if graph.oplog is not None:
+                    # Everything is in the log already
+                    self._close_log(graph)
+                else:
+                    self._dump(graph, self._spill_path(session_id))
+                stored = True
+            except Exception as e:
+                error = error or e
+            finally:
+                with self._lock:
+                    if stored:
+                        self._released(session_id)
+                    else:
+                        self._sessions[session_id] = entry
+                    self._spilling.pop(session_id).set()
+        if error is not None:
+            raise error
+        return None
+
+    @staticmethod
+    def _close_log(graph: WordGraph) -> None:
+        if graph.oplog is not None:
+            # Wait for an in-flight writer, which commits to the log
+            with graph.write_lock:
+                graph.oplog.close()
+        return None
+
+    def _released(self, session_id: str) -> None:
+        if self.on_release is not None:
+            self.on_release(session_id)
+        return None
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """
+        Spill every session idle for longer than ``idle_seconds`` that is not
+        leased. Sessions are in access order, so this stops at the first
+        active one.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            victims = self._idle_victims(now)
+        self._store(victims)
+        return [session_id for session_id, _ in victims]
+
+    def _idle_victims(self, now: float) -> list:
+        victims = []
+        for session_id, entry in list(self._sessions.items()):
+            if now - entry[1] <= self.idle_seconds:
+                break
+            if entry[3]:
+                continue
+            victims.append(self._take(session_id))
+        return victims
+
+    def _enforce_memory_cap(self, keep: str | None = None) -> list:
+        total = self.resident_bytes()
+        victims = []
+        for session_id in list(self._sessions):
+            if total <= self.max_memory_bytes:
+                break
+            entry = self._sessions[session_id]
+            if session_id == keep or entry[3]:
+                continue
+            total -= entry[2]
+            victims.append(self._take(session_id))
+        return victims
+
+    def flush(self) -> None:
+        """
+        Spill every resident session, leased or not, e.g. on shutdown.
+        """
+        with self._lock:
+            victims = [self._take(session_id) for session_id in list(self._sessions)]
+        self._store(victims)
+        return None
+
+    @staticmethod
+    def _dump(graph: WordGraph, path: str) -> None:
+        # Wait for an in-flight writer so the pickle is never torn
+        with graph.write_lock:
+            graph.clear_diff()
+            payload = zlib.compress(
+                pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        # Write then rename so a crash never leaves a truncated session behind
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return None
+
+    @staticmethod
+    def _load(path: str) -> WordGraph:
+        with open(path, "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
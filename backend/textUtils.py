@@ -1,21 +1,59 @@
+import bisect
+import os
+import sys
+import threading
+from collections import OrderedDict
 import regex as re
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import nltk
 from nltk.corpus import wordnet
 from nltk import pos_tag, word_tokenize
 from nltk.stem import WordNetLemmatizer
 
+# Imported the same way whether this module is loaded as ``textUtils`` or
+# ``backend.textUtils``, so there is a single metrics registry
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+
 # Pre-compiled regex patterns for efficiency
 # Words are sequences of alphanumerics; we purposefully **exclude** apostrophes / hyphens so
 # that ``rock'n'roll`` -> ``rock``, ``n``, ``roll`` and "don't" -> "dont".
 _WORD_PATTERN = re.compile(r"[\p{L}\p{N}]+", re.UNICODE)
 _SENTENCE_SPLIT_PATTERN = re.compile(r"[.!?]+")
 _PARAGRAPH_SPLIT_PATTERN = re.compile(r"\n\s*\n")
-_model = SentenceTransformer("all-MiniLM-L6-v2")
+# Loaded on first use, so importing this module stays cheap and offline
+_model = None
+# Contextual word vectors of recently encoded sentences, least recent first.
+# Requests encode from worker threads, so the cache is only touched under
+# its lock; the model runs outside it.
+_CONTEXT_CACHE_SIZE = 4096
+_context_cache = OrderedDict()
+_context_lock = threading.Lock()
 _lemmatizer = WordNetLemmatizer()
 
 
+def _get_model():
+    """The sentence encoder, loaded the first time it is needed."""
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+
+        _model = SentenceTransformer("all-MiniLM-L6-v2")
+    return _model
+
+
+def set_encoder(encoder) -> None:
+    """
+    Replace the sentence encoder, e.g. with a deterministic stub for offline
+    benchmarks. Anything with SentenceTransformer's ``encode`` will do.
+    """
+    global _model
+    _model = encoder
+    with _context_lock:
+        _context_cache.clear()
+    return None
+
+
 def _clean_tokens(tokens: list[str]):
     """Helper – remove apostrophes / hyphens that may slip through and drop empties."""
     return [re.sub(r"[-']", "", t) for t in tokens if t]
@@ -46,10 +84,85 @@ def split_text(text: str, mode: str = "words"):
 
 
 def encode_batch(words: list[str]) -> dict[str, np.ndarray]:
-    vecs = _model.encode(words)
+    with metrics.stage("encode"):
+        vecs = _get_model().encode(words)
+    metrics.count("texts_encoded", len(words))
     return dict(zip(words, vecs))
 
 
+def _token_embeddings(sentences: list[str]):
+    """
+    The character span and output vector of every model token, per sentence,
+    from one batched pass of the encoder. Special tokens have empty spans.
+    """
+    model = _get_model()
+    spans = model.tokenizer(
+        sentences,
+        return_offsets_mapping=True,
+        truncation=True,
+        max_length=getattr(model, "max_seq_length", None),
+    )["offset_mapping"]
+    outputs = model.encode(sentences, output_value="token_embeddings")
+    # SentenceTransformer returns one tensor per sentence, padding removed
+    vectors = [
+        np.asarray(output.cpu() if hasattr(output, "cpu") else output) for output in outputs
+    ]
+    return list(zip(spans, vectors))
+
+
+def _pool_words(sentence: str, spans, vectors: np.ndarray):
+    """
+    The words of *sentence* with the mean of the token vectors over each
+    word's subword span; None for words the model cut off.
+    """
+    matches = list(_WORD_PATTERN.finditer(sentence))
+    starts = [m.start() for m in matches]
+    sums = np.zeros((len(matches), vectors.shape[1]), dtype=np.float64)
+    counts = np.zeros(len(matches))
+    for (start, end), vector in zip(spans, vectors):
+        if end <= start:
+            continue
+        i = bisect.bisect_right(starts, start) - 1
+        if i >= 0 and start < matches[i].end():
+            sums[i] += vector
+            counts[i] += 1
+    return [
+        (m.group(), (sums[i] / counts[i]).astype(vectors.dtype) if counts[i] else None)
+        for i, m in enumerate(matches)
+    ]
+
+
+def encode_in_context(sentences: list[str]) -> list[list[tuple]]:
+    """
+    Contextual vectors for the words of each sentence. Every sentence goes
+    through the model once, instead of once per word, and a word's vector is
+    the mean of the token embeddings over its subword span.
+
+    Returns, per sentence, ``(word, vector)`` for each word in the order of
+    ``split_text(sentence)``; the vector is None where the sentence was
+    longer than the model's input limit. Recent sentences are cached.
+    """
+    sentences = [sentence.lower() for sentence in sentences]
+    with _context_lock:
+        found = {s: _context_cache[s] for s in sentences if s in _context_cache}
+    missing = list(dict.fromkeys(s for s in sentences if s not in found))
+    metrics.count("context_cache_hits", len(sentences) - len(missing))
+    if missing:
+        metrics.count("context_cache_misses", len(missing))
+        with metrics.stage("encode"):
+            tokens = _token_embeddings(missing)
+            for sentence, (spans, vectors) in zip(missing, tokens):
+                found[sentence] = _pool_words(sentence, spans, vectors)
+        metrics.count("texts_encoded", len(missing))
+    with _context_lock:
+        for sentence in sentences:
+            _context_cache[sentence] = found[sentence]
+            _context_cache.move_to_end(sentence)
+        while len(_context_cache) > _CONTEXT_CACHE_SIZE:
+            _context_cache.popitem(last=False)
+    return [found[sentence] for sentence in sentences]
+
+
 def parse_text(file_path: str, mode: str = "words"):
     """
     Read a text file and delegate tokenisation to ``split_text`` so that the
@@ -73,13 +186,21 @@ def parse_text(file_path: str, mode: str = "words"):
 
 
 def encode_text(text: str):
-    return _model.encode(text)
+    with metrics.stage("encode"):
+        embedding = _get_model().encode(text)
+    metrics.count("texts_encoded")
+    return embedding
 
 
 def extract_all_text_info(text: str):
     """
     Workhorse text function that returns all necessary text information to build the word graph
     """
+    with metrics.stage("tokenize"):
+        return _extract_all_text_info(text)
+
+
+def _extract_all_text_info(text: str):
     sentences = split_text(text, mode="sentences")
     paragraphs = split_text(text, mode="paragraphs")
     words = split_text(text, mode="words")
@@ -100,6 +221,16 @@ def extract_all_text_info(text: str):
             search_from += 1
         ending_words.append(search_from - 1)
 
+    # Index of the last word before each paragraph break
+    word_positions = [m.start() for m in _WORD_PATTERN.finditer(text)]
+    paragraph_ending_words = []
+    for match in _PARAGRAPH_SPLIT_PATTERN.finditer(text):
+        last_word = bisect.bisect_left(word_positions, match.start()) - 1
+        if last_word >= 0 and (
+            not paragraph_ending_words or paragraph_ending_words[-1] != last_word
+        ):
+            paragraph_ending_words.append(last_word)
+
     result_dict = {
         "words": words,
         "paragraphs": paragraphs,
@@ -107,6 +238,7 @@ def extract_all_text_info(text: str):
         "sentence_ends": sentence_ends,
         "word_starts": word_starts,
         "sentence_ending_words": ending_words,
+        "paragraph_ending_words": paragraph_ending_words,
     }
     return result_dict
 
@@ -123,12 +255,18 @@ def cosine_similarity(vec1: list[float], vec2: list[float]):
     return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
 
+def cosine_similarities(vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity between *vec* and every row of *matrix* in one pass."""
+    return (matrix @ vec) / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(vec))
+
+
 def lemmatize_text(text: str):
-    tokens = word_tokenize(text)
-    tagged = pos_tag(tokens)
-    lemmatized = [
-        _lemmatizer.lemmatize(word, get_wordnet_pos(pos)) for word, pos in tagged
-    ]
+    with metrics.stage("lemmatize"):
+        tokens = word_tokenize(text)
+        tagged = pos_tag(tokens)
+        lemmatized = [
+            _lemmatizer.lemmatize(word, get_wordnet_pos(pos)) for word, pos in tagged
+        ]
     return lemmatized
 
 
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+
+class UpdateScheduler:
+    """
+    Coalesces the updates arriving on one connection.
+
+    Every message from the editor carries the whole text, so once a newer
+    message has arrived an older one that has not been processed yet is
+    obsolete: only the newest pending message is kept, and the ones it
+    replaced are counted as superseded. ``next()`` hands the pending message
+    to the worker once the debounce window has passed and the frame budget
+    allows another frame.
+
+    ``frame_interval`` is the least time, in seconds, between sending one
+    frame and handing out the message for the next; call ``sent()`` when a
+    frame has gone out. ``debounce`` waits for the typist to pause, but never
+    holds a message back longer than ``max_delay`` after the first one it
+    replaced arrived.
+    """
+
+    def __init__(
+        self,
+        frame_interval: float = 0.05,
+        debounce: float = 0.0,
+        max_delay: float = 0.25,
+        clock=time.monotonic,
+    ):
+        self.frame_interval = frame_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._clock = clock
+        self._pending = None
+        self._first_arrival = 0.0
+        self._last_arrival = 0.0
+        self._next_frame = 0.0
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._replaced = 0
+        self.received = 0
+        self.superseded = 0
+        # Messages superseded by the one handed out last
+        self.dropped = 0
+
+    def submit(self, message) -> None:
+        now = self._clock()
+        if self._pending is None:
+            self._first_arrival = now
+        else:
+            self._replaced += 1
+            self.superseded += 1
+        self._pending = message
+        self._last_arrival = now
+        self.received += 1
+        self._wakeup.set()
+        return None
+
+    def close(self) -> None:
+        """Stop handing out messages; a pending one is discarded."""
+        self._closed = True
+        self._wakeup.set()
+        return None
+
+    def _ready_at(self) -> float:
+        quiet = min(self._last_arrival + self.debounce, self._first_arrival + self.max_delay)
+        return max(quiet, self._next_frame)
+
+    async def next(self):
+        """The newest pending message once it is due, or None after ``close()``."""
+        while True:
+            if self._closed:
+                return None
+            if self._pending is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._ready_at() - self._clock()
+            if delay <= 0:
+                message, self._pending = self._pending, None
+                self.dropped, self._replaced = self._replaced, 0
+                return message
+            # A message arriving meanwhile may move the deadline
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def sent(self) -> None:
+        """Record that a frame went out, starting the next frame interval."""
+        self._next_frame = self._clock() + self.frame_interval
+        return None
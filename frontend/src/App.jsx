@@ -20,6 +20,15 @@ const getPositionFromLemma = (lemma) => {
     return { x, y };
 };
 
+const getSessionId = () => {
+    let sessionId = localStorage.getItem("sessionId");
+    if (!sessionId) {
+        sessionId = crypto.randomUUID().replace(/-/g, "");
+        localStorage.setItem("sessionId", sessionId);
+    }
+    return sessionId;
+};
+
 function App() {
     const [text, setText] = useState("");
     const [currentWord, setCurrentWord] = useState("");
@@ -28,7 +37,9 @@ function App() {
     const ws = useRef(null);
 
     useEffect(() => {
-        ws.current = new WebSocket("ws://localhost:8000/ws");
+        ws.current = new WebSocket(
+            `ws://localhost:8000/ws?session_id=${getSessionId()}`
+        );
         ws.current.onopen = () => console.log("WebSocket connected");
         ws.current.onclose = () => console.log("WebSocket disconnected");
 
@@ -65,11 +76,12 @@ function App() {
 
             const newNodes = incomingNodes.map((node) => {
                 const lemma = node.data.lemmatized?.[0] || node.data.word;
-                const position = getPositionFromLemma(lemma);
+                const position = node.position || getPositionFromLemma(lemma);
                 return {
                     id: node.id.toString(),
                     data: { label: `${node.data.word} (${node.data.value})` },
                     position,
+                    serverPositioned: Boolean(node.position),
                 };
             });
 
@@ -86,19 +98,36 @@ function App() {
             setNodes(newNodes);
             setEdges(newEdges);
         } else if (message.type === "diff") {
-            const { added_nodes, updated_nodes, added_edges, updated_edges } =
-                message.payload;
+            const {
+                added_nodes,
+                updated_nodes,
+                added_edges,
+                updated_edges,
+                removed_nodes = [],
+                removed_edges = [],
+                moved_nodes = [],
+            } = message.payload;
+            const removedNodeIds = new Set(
+                removed_nodes.map((node) => node.id.toString())
+            );
+            const removedEdgeIds = new Set(
+                removed_edges.map(
+                    (link) => `${link.source}-${link.target}-${link.key}`
+                )
+            );
 
             const nodeUpdates = [...added_nodes, ...updated_nodes].map(
                 (node) => {
                     const lemma = node.data.lemmatized?.[0] || node.data.word;
-                    const position = getPositionFromLemma(lemma);
+                    const position =
+                        node.position || getPositionFromLemma(lemma);
                     return {
                         id: node.id.toString(),
                         data: {
                             label: `${node.data.word} (${node.data.value})`,
                         },
                         position,
+                        serverPositioned: Boolean(node.position),
                     };
                 }
             );
@@ -117,13 +146,35 @@ function App() {
             );
 
             setNodes((currentNodes) => {
-                const nodeMap = new Map(currentNodes.map((n) => [n.id, n]));
+                const nodeMap = new Map(
+                    currentNodes
+                        .filter((n) => !removedNodeIds.has(n.id))
+                        .map((n) => [n.id, n])
+                );
                 nodeUpdates.forEach((n) => nodeMap.set(n.id, n));
+                moved_nodes.forEach((moved) => {
+                    const node = nodeMap.get(moved.id.toString());
+                    if (node) {
+                        nodeMap.set(node.id, {
+                            ...node,
+                            position: moved.position,
+                        });
+                    }
+                });
                 return Array.from(nodeMap.values());
             });
 
             setEdges((currentEdges) => {
-                const edgeMap = new Map(currentEdges.map((e) => [e.id, e]));
+                const edgeMap = new Map(
+                    currentEdges
+                        .filter(
+                            (e) =>
+                                !removedEdgeIds.has(e.id) &&
+                                !removedNodeIds.has(e.source) &&
+                                !removedNodeIds.has(e.target)
+                        )
+                        .map((e) => [e.id, e])
+                );
                 edgeUpdates.forEach((e) => edgeMap.set(e.id, e));
                 return Array.from(edgeMap.values());
             });
@@ -82,6 +82,14 @@ const GraphComponent = ({ nodes, edges, onNodesChange, onEdgesChange }) => {
   }, []);
 
   useEffect(() => {
+    // The backend lays the graph out incrementally; only fall back to ELK
+    // when some nodes arrived without a server position.
+    const graphNodes = nodes.filter((node) => node.id !== "current-word");
+    if (graphNodes.every((node) => node.serverPositioned)) {
+      setLayoutedNodes(nodes);
+      setLayoutedEdges(edges);
+      return;
+    }
     // Apply layout when nodes or edges change
     getLayoutedElements(nodes, edges).then(({ nodes: layoutedNodes, edges: layoutedEdges }) => {
       setLayoutedNodes(layoutedNodes);